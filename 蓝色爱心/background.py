@@ -0,0 +1,50 @@
+import pygame
+
+# 预渲染的渐变背景
+# 渐变在运行过程中不会变化，只在第一次使用、窗口尺寸改变或调色板改变时
+# 重新生成一次，之后每帧只需一次整屏 blit。
+
+class GradientBackground:
+    def __init__(self, top_color, bottom_color=(0, 0, 0), band_height=2):
+        self.top_color = tuple(top_color)
+        self.bottom_color = tuple(bottom_color)
+        self.band_height = band_height  # 每条色带的高度（像素）
+        self._surface = None
+        self._size = None
+        self.rebuilds = 0
+
+    def set_palette(self, top_color, bottom_color=(0, 0, 0)):
+        top_color = tuple(top_color)
+        bottom_color = tuple(bottom_color)
+        if (top_color, bottom_color) != (self.top_color, self.bottom_color):
+            self.top_color = top_color
+            self.bottom_color = bottom_color
+            self._surface = None
+
+    def color_at(self, y, height):
+        # 从顶部颜色到底部颜色的线性渐变
+        t = y / height
+        return tuple(int(top + (bottom - top) * t)
+                     for top, bottom in zip(self.top_color, self.bottom_color))
+
+    def _build(self, target):
+        width, height = target.get_size()
+
+        # 先画一条 1 像素宽的色带，再拉伸到整个窗口宽度
+        strip = pygame.Surface((1, height))
+        for y in range(0, height, self.band_height):
+            strip.fill(self.color_at(y, height), (0, y, 1, self.band_height))
+
+        surface = pygame.transform.scale(strip, (width, height))
+        self._surface = surface.convert(target)
+        self._size = (width, height)
+        self.rebuilds += 1
+
+    def get(self, target):
+        # 窗口尺寸变化（例如可调整大小的窗口）时自动重建
+        if self._surface is None or self._size != target.get_size():
+            self._build(target)
+        return self._surface
+
+    def draw(self, target):
+        target.blit(self.get(target), (0, 0))
\ No newline at end of file
@@ -0,0 +1,909 @@
+import argparse
+import contextlib
+import importlib
+import json
+import math
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import time
+
+# 无界面基准测试
+# 用固定的随机种子和粒子数量运行各个版本 N 帧，分别测量每帧的更新和绘制耗时，
+# 以 JSON 输出 p50/p95/p99、每秒处理的粒子数和峰值内存，便于比较不同版本。
+# pygame 版本使用 SDL 的 dummy 视频驱动；tkinter 版本在虚拟显示（Xvfb）下运行。
+# 每个版本在独立的子进程中运行，峰值内存互不影响。
+
+PYGAME_VARIANTS = ("blue_heart_particles", "enhanced_blue_heart")
+TKINTER_VARIANTS = ("tkinter_blue_heart", "enhanced_tkinter_heart")
+VARIANTS = PYGAME_VARIANTS + TKINTER_VARIANTS
+
+# tkinter 版本的渲染方式
+TK_RENDER_MODES = ("items", "framebuffer", "bloom")
+
+# 基准测试中固定的鼠标位置（屏幕中心附近）
+MOUSE_POS = (400, 300)
+
+# 空间索引基准测试的粒子数量，以及每帧粒子随机移动的最大距离（像素）
+SPATIAL_SIZES = (1000, 10000, 100000)
+SPATIAL_JITTER = 2.0
+
+# 分块光栅化基准测试：输出分辨率、粒子数量和默认帧数（4K 下每帧耗时较长）
+TILED_SIZE = (3840, 2160)
+TILED_PARTICLES = 20000
+TILED_FRAMES = 10
+
+# 批量提交画布命令的基准测试：粒子数量
+TK_BATCH_SIZES = (5000, 10000)
+
+# 飘落基准测试：粒子数量（按 F 键后约七成粒子同时飘落）
+FALLING_SIZES = (5000, 10000)
+
+# 泛光合成基准测试：分辨率、粒子数量和默认帧数
+BLOOM_SIZE = (800, 600)
+BLOOM_SIZES = (1000, 5000, 20000, 50000)
+BLOOM_FRAMES = 30
+
+# 粒子创建基准测试：每轮创建的粒子数和默认轮数
+CREATION_PARTICLES = 20000
+CREATION_ROUNDS = 10
+
+# 完整版本测试的默认帧数
+FRAMES = 300
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def percentile(sorted_values, q):
+    # 线性插值的百分位数
+    if not sorted_values:
+        return 0.0
+    pos = (len(sorted_values) - 1) * q / 100
+    lower = int(pos)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (pos - lower)
+
+
+def summarize(seconds):
+    values = sorted(t * 1000 for t in seconds)
+    return {
+        "mean_ms": sum(values) / len(values) if values else 0.0,
+        "p50_ms": percentile(values, 50),
+        "p95_ms": percentile(values, 95),
+        "p99_ms": percentile(values, 99),
+        "max_ms": values[-1] if values else 0.0,
+    }
+
+
+def peak_rss_bytes():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 为单位，macOS 以字节为单位
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def setup_pygame_variant(name, seed, particle_count):
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    import pygame
+    import heart_simulation
+
+    module = importlib.import_module(name)
+    module.init_display()
+
+    if name == "enhanced_blue_heart":
+        simulation = heart_simulation.EnhancedHeartSimulation(
+            module.WIDTH, module.HEIGHT, seed=seed, particle_count=particle_count)
+
+        def update():
+            simulation.step(MOUSE_POS)
+    else:
+        simulation = heart_simulation.BasicHeartSimulation(
+            module.WIDTH, module.HEIGHT, seed=seed, particle_count=particle_count)
+        update = simulation.step
+
+    def render():
+        module.render_frame(simulation)
+        pygame.display.flip()
+
+    def stats():
+        result = {}
+        cache = getattr(module, "sprite_cache", None) or getattr(module, "glow_cache", None)
+        if cache is not None:
+            result["sprite_cache"] = cache.stats()
+        # 轨迹环形缓冲区的实际内存占用
+        trail_groups = [particles for particles in simulation.particle_groups if particles.track_trails]
+        if trail_groups:
+            memory = [particles.trail_memory() for particles in trail_groups]
+            result["trail_memory"] = {
+                "bytes": sum(m["bytes"] for m in memory),
+                "bytes_per_point": memory[0]["bytes_per_point"],
+            }
+        return result
+
+    return update, render, simulation.__len__, stats, pygame.quit
+
+
+def fit_tk_particles(release, particles, count, create_more):
+    # 把粒子列表调整为恰好 count 个，多余粒子的画布元素一并释放
+    while len(particles) < count:
+        particles.extend(create_more())
+    for particle in particles[count:]:
+        release(*[item for item in (particle.id, particle.glow_id, particle.outer_glow_id) if item])
+    del particles[count:]
+
+
+def release_nothing(*items):
+    # 单图像渲染模式下粒子没有画布元素
+    pass
+
+
+def particle_object_bytes(particles):
+    # 每个粒子对象本身（含 __dict__，不含属性值）的平均字节数
+    if not particles:
+        return 0
+    total = 0
+    for particle in particles:
+        total += sys.getsizeof(particle)
+        if hasattr(particle, "__dict__"):
+            total += sys.getsizeof(particle.__dict__)
+    return total / len(particles)
+
+
+def setup_tkinter_variant(name, seed, particle_count, render_mode="items"):
+    import tkinter as tk
+    import random_stream
+
+    random_stream.seed(seed)
+    module = importlib.import_module(name)
+    root = tk.Tk()
+    root.geometry(f"{module.WIDTH}x{module.HEIGHT}")
+
+    if name == "tkinter_blue_heart":
+        canvas = tk.Canvas(root, width=module.WIDTH, height=module.HEIGHT,
+                           bg=module.BACKGROUND_COLOR, highlightthickness=0)
+        canvas.pack(fill="both", expand=True)
+        # 与 main() 相同，按当前窗口大小创建飘落粒子的批量模拟
+        module.falling = module.create_falling()
+        if render_mode in ("framebuffer", "bloom"):
+            from tk_framebuffer import TkFramebufferRenderer, TkBloomRenderer
+            renderer_class = TkBloomRenderer if render_mode == "bloom" else TkFramebufferRenderer
+            renderer = renderer_class(canvas, module.WIDTH, module.HEIGHT)
+            particle_canvas, release, batch = None, release_nothing, None
+        else:
+            from tk_batch import CanvasBatch
+            renderer = None
+            # 与 main() 相同，按 BATCH_CANVAS_UPDATES 决定是否批量提交画布命令
+            batch = CanvasBatch(canvas) if module.BATCH_CANVAS_UPDATES else None
+            particle_canvas, release = batch or canvas, canvas.delete
+
+        def create_more():
+            return module.create_heart_particles(particle_canvas, module.WIDTH // 2, module.HEIGHT // 2, 10)
+
+        particles = create_more()
+        if particle_count:
+            fit_tk_particles(release, particles, particle_count, create_more)
+        state = {"wind_direction": 0}
+
+        def update():
+            state["wind_direction"] = module.step_particles(particles, state["wind_direction"])
+
+        def count():
+            return len(particles)
+
+        def stats():
+            return {"particle_object_bytes": particle_object_bytes(particles)}
+    else:
+        app = module.HeartApp(root, start=False, render_mode=render_mode)
+        app.mouse_x, app.mouse_y = MOUSE_POS
+        release = app.pool.release if app.pool is not None else release_nothing
+        if particle_count:
+            background_count = min(len(app.background_particles), particle_count // 10)
+            fit_tk_particles(release, app.background_particles, background_count, list)
+            app.max_background_particles = background_count
+
+            def create_more():
+                return module.create_heart_particles(
+                    app.particle_canvas, module.WIDTH // 2, module.HEIGHT // 2, 10, app.pool)
+
+            fit_tk_particles(release, app.heart_particles, particle_count - background_count, create_more)
+            app.all_particles = app.heart_particles + app.background_particles
+            app.apply_quality()
+        update = app.step
+        renderer = app.renderer
+        batch = app.canvas_batch
+        particles = app.active_particles  # step() 只在原列表上追加粒子
+
+        def count():
+            return len(app.all_particles)
+
+        def stats():
+            result = {"particle_object_bytes": particle_object_bytes(app.all_particles)}
+            if app.pool is not None:
+                result["canvas_pool"] = app.pool.stats()
+            return result
+
+    def render():
+        if renderer is not None:
+            renderer.draw(particles)
+        if batch is not None:
+            batch.flush()
+        # 画布重绘在空闲任务中完成
+        root.update_idletasks()
+    root.update()
+    return update, render, count, stats, root.destroy
+
+
+def run_variant(name, frames, particle_count, seed, warmup, tk_render="items"):
+    os.chdir(SCRIPT_DIR)
+    if SCRIPT_DIR not in sys.path:
+        sys.path.insert(0, SCRIPT_DIR)
+
+    if name in PYGAME_VARIANTS:
+        update, render, count, stats, close = setup_pygame_variant(name, seed, particle_count)
+    else:
+        update, render, count, stats, close = setup_tkinter_variant(name, seed, particle_count, tk_render)
+
+    for _ in range(warmup):
+        update()
+        render()
+
+    update_times = []
+    render_times = []
+    particle_counts = []  # 每帧的粒子数
+    clock = time.perf_counter
+    start = clock()
+    for _ in range(frames):
+        t0 = clock()
+        update()
+        t1 = clock()
+        render()
+        t2 = clock()
+        update_times.append(t1 - t0)
+        render_times.append(t2 - t1)
+        particle_counts.append(count())
+    wall_time = clock() - start
+    extra_stats = stats()
+    close()
+
+    busy_time = sum(update_times) + sum(render_times)
+    particle_frames = sum(particle_counts)
+    result = {
+        "variant": name,
+        "frames": frames,
+        "seed": seed,
+        # 粒子数随自适应补充和淘汰变化，分别报告最少、平均和最多（最少和最多为整数）
+        "particles": {
+            "min": min(particle_counts, default=0),
+            "mean": particle_frames / frames if frames else 0.0,
+            "max": max(particle_counts, default=0),
+        },
+        "update": summarize(update_times),
+        "render": summarize(render_times),
+        "frame": summarize([u + r for u, r in zip(update_times, render_times)]),
+        "particles_per_second": particle_frames / busy_time if busy_time else 0.0,
+        "wall_time_s": wall_time,
+        "peak_rss_bytes": peak_rss_bytes(),
+    }
+    result.update(extra_stats)
+    return result
+
+
+def run_spatial_benchmark(frames, seed, sizes=SPATIAL_SIZES):
+    # 比较鼠标吸引的半径查询：逐个计算距离（暴力）与均匀网格空间索引。
+    # 粒子均匀分布在窗口内，每帧随机移动一点；网格的耗时包含每帧更新索引，
+    # 另外单独记录只查询的耗时（同一帧内有多个查询时，更新的开销只付一次）
+    os.chdir(SCRIPT_DIR)
+    if SCRIPT_DIR not in sys.path:
+        sys.path.insert(0, SCRIPT_DIR)
+    import numpy as np
+    from particle_engine import ATTRACT_RADIUS
+    from spatial_grid import SpatialHash, UniformGrid
+
+    mx, my = MOUSE_POS
+    clock = time.perf_counter
+    results = []
+    for n in sizes:
+        rng = np.random.default_rng(seed)
+        xs = rng.uniform(0, 800, n)
+        ys = rng.uniform(0, 600, n)
+        grid = UniformGrid()
+        spatial_hash = SpatialHash()
+        timings = {"brute": [], "grid": [], "grid_query": [], "python_brute": [], "spatial_hash": []}
+        mismatches = 0
+        for _ in range(frames):
+            xs = xs + rng.uniform(-SPATIAL_JITTER, SPATIAL_JITTER, n)
+            ys = ys + rng.uniform(-SPATIAL_JITTER, SPATIAL_JITTER, n)
+
+            t0 = clock()
+            brute = np.flatnonzero(np.hypot(xs - mx, ys - my) < ATTRACT_RADIUS)
+            t1 = clock()
+            grid.update(xs, ys)
+            t2 = clock()
+            near = grid.query_radius(mx, my, ATTRACT_RADIUS)
+            t3 = clock()
+            timings["brute"].append(t1 - t0)
+            timings["grid"].append(t3 - t1)
+            timings["grid_query"].append(t3 - t2)
+
+            # tkinter 版本的纯 Python 路径
+            x_list = xs.tolist()
+            y_list = ys.tolist()
+            t0 = clock()
+            python_brute = [i for i, (x, y) in enumerate(zip(x_list, y_list))
+                            if math.hypot(x - mx, y - my) < ATTRACT_RADIUS]
+            t1 = clock()
+            spatial_hash.update(x_list, y_list)
+            python_near = spatial_hash.query_radius(mx, my, ATTRACT_RADIUS)
+            t2 = clock()
+            timings["python_brute"].append(t1 - t0)
+            timings["spatial_hash"].append(t2 - t1)
+
+            if not (np.array_equal(brute, near) and python_brute == python_near == brute.tolist()):
+                mismatches += 1
+
+        result = {"particles": n, "near": len(brute), "mismatches": mismatches}
+        for key, values in timings.items():
+            result[key] = summarize(values)
+        results.append(result)
+    return results
+
+
+class TclCommandCanvas:
+    # 没有显示时的替代画布：在 Tcl 解释器中注册一个什么也不做的画布命令，
+    # 方法与 tkinter.Canvas 一样每次调用一次 tk.call，只测量 Python 到 Tcl 的调用开销，不包含 Tk 的画布操作
+    def __init__(self, interpreter):
+        self.tk = interpreter
+        self._w = ".benchmark_canvas"
+        self._ids = 0
+        self.tk.eval("proc %s {args} {}" % self._w)
+
+    def __str__(self):
+        return self._w
+
+    def create_oval(self, *coords, **options):
+        self.tk.call(self._w, "create", "oval", *coords)
+        self._ids += 1
+        return self._ids
+
+    def move(self, item, dx, dy):
+        self.tk.call(self._w, "move", item, dx, dy)
+
+    def coords(self, item, *coords):
+        self.tk.call(self._w, "coords", item, *coords)
+
+    def itemconfigure(self, item, **options):
+        self.tk.call(self._w, "itemconfigure", item, *[value for pair in options.items() for value in pair])
+
+    def tag_raise(self, item):
+        self.tk.call(self._w, "raise", item)
+
+    def delete(self, *items):
+        self.tk.call(self._w, "delete", *items)
+
+    def update_idletasks(self):
+        pass
+
+
+def run_tk_batch_benchmark(frames, seed, warmup, sizes=TK_BATCH_SIZES):
+    # 比较画布元素模式下逐个调用画布方法与 CanvasBatch 批量提交的每帧耗时。
+    #   move   - 基础版粒子，每个粒子每帧两三次 move
+    #   attract - 增强版爱心粒子，鼠标在爱心中央的吸引模式，每个粒子每帧还有两三次 coords
+    # 有显示（或 Xvfb）时使用真实的 Tk 画布，耗时包含画布重绘；否则使用只计数的 Tcl 命令
+    os.chdir(SCRIPT_DIR)
+    if SCRIPT_DIR not in sys.path:
+        sys.path.insert(0, SCRIPT_DIR)
+    import tkinter as tk
+    import enhanced_tkinter_heart
+    import random_stream
+    import tkinter_blue_heart
+    from tk_batch import CanvasBatch
+
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        root = None
+    interpreter = tk.Tcl() if root is None else None
+
+    def new_canvas():
+        if root is None:
+            return TclCommandCanvas(interpreter)
+        canvas = tk.Canvas(root, width=800, height=600, bg="black", highlightthickness=0)
+        canvas.pack()
+        root.update()
+        return canvas
+
+    def create(case, target, count):
+        particles = []
+        while len(particles) < count:
+            if case == "move":
+                particles.extend(tkinter_blue_heart.create_heart_particles(target, 400, 300, 10))
+            else:
+                particles.extend(enhanced_tkinter_heart.create_heart_particles(target, 400, 300, 10))
+        del particles[count:]
+        return particles
+
+    mx, my = MOUSE_POS
+    clock = time.perf_counter
+    results = []
+    for case in ("move", "attract"):
+        for count in sizes:
+            result = {"case": case, "particles": count, "canvas": "tk" if root is not None else "tcl-noop"}
+            for mode in ("per_call", "batched"):
+                canvas = new_canvas()
+                batch = CanvasBatch(canvas) if mode == "batched" else None
+                random_stream.seed(seed)
+                particles = create(case, batch or canvas, count)
+                if batch is not None:
+                    batch.flush()
+                timings = []
+                for frame in range(warmup + frames):
+                    t0 = clock()
+                    for particle in particles:
+                        if case == "move":
+                            particle.update(0)
+                        else:
+                            particle.update(mx, my, True, 0)
+                    if batch is not None:
+                        batch.flush()
+                    canvas.update_idletasks()
+                    if frame >= warmup:
+                        timings.append(clock() - t0)
+                result[mode] = summarize(timings)
+                if batch is not None:
+                    result["commands_per_frame"] = batch.commands / batch.flushes
+                    result["tcl_calls_per_frame"] = batch.tcl_calls / batch.flushes
+                if root is not None:
+                    canvas.destroy()
+            result["speedup"] = result["per_call"]["mean_ms"] / result["batched"]["mean_ms"]
+            results.append(result)
+    if root is not None:
+        root.destroy()
+    return results
+
+
+def run_falling_benchmark(frames, seed, warmup, sizes=FALLING_SIZES):
+    # 比较按 F 键之后飘落粒子逐个在 Particle.update 中计算与 FallingParticles 整体推进的每个 tick 耗时。
+    # 画布元素通过 CanvasBatch 提交给只计数的 Tcl 命令，耗时包含记录和提交画布命令，不包含 Tk 的重绘
+    os.chdir(SCRIPT_DIR)
+    if SCRIPT_DIR not in sys.path:
+        sys.path.insert(0, SCRIPT_DIR)
+    import tkinter as tk
+    import enhanced_tkinter_heart
+    import random_stream
+    import tk_falling
+    import tkinter_blue_heart
+    from tk_batch import CanvasBatch
+
+    if tk_falling.np is None:
+        return [{"skipped": "numpy not installed"}]
+    interpreter = tk.Tcl()
+    basic_falling = tkinter_blue_heart.falling
+
+    def setup(module, target, count, batched):
+        particles = []
+        while len(particles) < count:
+            particles.extend(module.create_heart_particles(target, 400, 300, 10))
+        del particles[count:]
+        if module is tkinter_blue_heart:
+            module.falling = module.create_falling() if batched else None
+            module.trigger_fall(None, particles)
+            state = {"wind_direction": 0}
+
+            def tick():
+                state["wind_direction"] = module.step_particles(particles, state["wind_direction"])
+            return tick, module.falling
+
+        app = module.HeartApp(None)
+        app.heart_particles = app.all_particles = particles
+        app.active_particles = list(particles)
+        app.background_particles = []
+        app.max_background_particles = 0
+        if not batched:
+            app.falling = None
+        app.toggle_fall(None)
+        return app.step, app.falling
+
+    clock = time.perf_counter
+    results = []
+    for module in (tkinter_blue_heart, enhanced_tkinter_heart):
+        for count in sizes:
+            result = {"variant": module.__name__, "particles": count}
+            for mode in ("per_particle", "batched"):
+                batch = CanvasBatch(TclCommandCanvas(interpreter))
+                random_stream.seed(seed)
+                tick, falling = setup(module, batch, count, mode == "batched")
+                batch.flush()
+                timings = []
+                for frame in range(warmup + frames):
+                    t0 = clock()
+                    tick()
+                    batch.flush()
+                    if frame >= warmup:
+                        timings.append(clock() - t0)
+                result[mode] = summarize(timings)
+                if mode == "batched":
+                    result["falling"] = len(falling)
+            result["speedup"] = result["per_particle"]["mean_ms"] / result["batched"]["mean_ms"]
+            results.append(result)
+    tkinter_blue_heart.falling = basic_falling
+    return results
+
+
+def run_creation_benchmark(rounds, seed, count=CREATION_PARTICLES):
+    # 测量粒子创建的吞吐量（粒子/秒）：tkinter 版本逐个构造 Particle（不创建画布元素），
+    # pygame 版本批量生成 ParticleArrays；同时统计不同颜色的数量
+    os.chdir(SCRIPT_DIR)
+    if SCRIPT_DIR not in sys.path:
+        sys.path.insert(0, SCRIPT_DIR)
+    import enhanced_tkinter_heart
+    import heart_simulation
+    import random_stream
+    import tkinter_blue_heart
+
+    depth_layers = enhanced_tkinter_heart.DEPTH_LAYERS
+    cases = {
+        "tkinter_blue_heart": lambda i: tkinter_blue_heart.Particle(None, 400, 300, i % depth_layers),
+        "enhanced_tkinter_heart": lambda i: enhanced_tkinter_heart.Particle(None, 400, 300, True, i % depth_layers),
+        "enhanced_tkinter_background": lambda i: enhanced_tkinter_heart.Particle(None, 400, 300, False, i % 3),
+    }
+    clock = time.perf_counter
+    results = []
+    for name, create in cases.items():
+        random_stream.seed(seed)
+        timings = []
+        colors = set()
+        for _ in range(rounds):
+            t0 = clock()
+            particles = [create(i) for i in range(count)]
+            timings.append(clock() - t0)
+            colors.update(p.rgb for p in particles)
+        results.append({
+            "case": name,
+            "particles": count,
+            "round": summarize(timings),
+            "particles_per_s": count / min(timings),
+            "distinct_colors": len(colors),
+        })
+
+    simulation = heart_simulation.EnhancedHeartSimulation(800, 600, seed=seed)
+    xs = [400.0] * count
+    ys = [300.0] * count
+    timings = []
+    colors = set()
+    for _ in range(rounds):
+        particles = simulation.new_particle_arrays()
+        t0 = clock()
+        simulation.spawn_particles(particles, xs, ys)
+        timings.append(clock() - t0)
+        colors.update(map(tuple, particles.color[:particles.count].tolist()))
+    results.append({
+        "case": "heart_simulation",
+        "particles": count,
+        "round": summarize(timings),
+        "particles_per_s": count / min(timings),
+        "distinct_colors": len(colors),
+    })
+    return results
+
+
+def tiled_discs(rng, width, height, count):
+    # 与 tkinter 单图像模式相同的三层圆点（外发光、发光、本体）：一半粒子在爱心上，一半散布在背景中
+    import numpy as np
+    from heart_geometry import heart_points
+
+    scale = width / 800
+    heart_x, heart_y = heart_points(width / 2, height / 2, 10 * scale)
+    on_heart = rng.integers(0, len(heart_x), count // 2)
+    xs = np.concatenate([heart_x[on_heart] + rng.normal(0, 3 * scale, len(on_heart)),
+                         rng.uniform(0, width, count - len(on_heart))])
+    ys = np.concatenate([heart_y[on_heart] + rng.normal(0, 3 * scale, len(on_heart)),
+                         rng.uniform(0, height, count - len(on_heart))])
+    sizes = rng.uniform(1, 4, count) * scale
+    colors = rng.integers(0, 256, (count, 3))
+    alphas = rng.uniform(0.6, 1.0, count)
+    outer = np.flatnonzero(rng.random(count) < 0.4)
+    return [
+        (xs[outer], ys[outer], sizes[outer] * 2.0, colors[outer], alphas[outer] * 0.12),
+        (xs, ys, sizes * 1.5, colors, alphas * 0.25),
+        (xs, ys, sizes, colors, alphas),
+    ]
+
+
+def run_tiled_benchmark(frames, seed, max_workers, size=TILED_SIZE, particle_count=TILED_PARTICLES):
+    # 比较单进程 Framebuffer 与多进程分块光栅化在 1..max_workers 个进程下的吞吐量。
+    # 每帧的粒子位置都不同，计时包含加入圆点和合成整帧；检查分块结果与单进程逐字节一致
+    os.chdir(SCRIPT_DIR)
+    if SCRIPT_DIR not in sys.path:
+        sys.path.insert(0, SCRIPT_DIR)
+    import numpy as np
+    from framebuffer import Framebuffer
+    from tiled_framebuffer import TiledFramebuffer
+
+    width, height = size
+    rng = np.random.default_rng(seed)
+    scenes = [tiled_discs(rng, width, height, particle_count) for _ in range(frames)]
+    clock = time.perf_counter
+
+    def measure(framebuffer):
+        times = []
+        digests = []
+        for discs in scenes:
+            start = clock()
+            for batch in discs:
+                framebuffer.add_discs(*batch)
+            image = framebuffer.render()
+            times.append(clock() - start)
+            digests.append(hash(image.tobytes()))
+        return times, digests
+
+    baseline_times, expected = measure(Framebuffer(width, height))
+    baseline = summarize(baseline_times)
+    results = [{"renderer": "Framebuffer", "workers": 0, "frame": baseline,
+                "fps": 1000 / baseline["mean_ms"]}]
+    single = None
+    for workers in range(1, max_workers + 1):
+        framebuffer = TiledFramebuffer(width, height, workers=workers)
+        try:
+            times, digests = measure(framebuffer)
+            tiles = len(framebuffer.tiles)
+        finally:
+            framebuffer.close()
+        frame = summarize(times)
+        if single is None:
+            single = frame["mean_ms"]
+        results.append({
+            "renderer": "TiledFramebuffer",
+            "workers": workers,
+            "tiles": tiles,
+            "frame": frame,
+            "fps": 1000 / frame["mean_ms"],
+            "speedup": single / frame["mean_ms"],
+            "speedup_vs_framebuffer": baseline["mean_ms"] / frame["mean_ms"],
+            "identical": digests == expected,
+        })
+    return {"size": f"{width}x{height}", "particles": particle_count, "cpu_count": os.cpu_count(),
+            "results": results}
+
+
+def run_bloom_benchmark(frames, seed, size=BLOOM_SIZE, counts=BLOOM_SIZES):
+    # 比较发光逐个光栅化为圆（Framebuffer，与 tkinter 单图像模式相同）与泛光合成（BloomCompositor）的每帧耗时。
+    # 两者的输入都是 tiled_discs 的三层圆点，泛光合成把外发光和发光两层作为光源；计时包含加入圆点和合成整帧
+    os.chdir(SCRIPT_DIR)
+    if SCRIPT_DIR not in sys.path:
+        sys.path.insert(0, SCRIPT_DIR)
+    import numpy as np
+    from bloom import BloomCompositor
+    from framebuffer import Framebuffer
+
+    width, height = size
+    clock = time.perf_counter
+    results = []
+    for count in counts:
+        rng = np.random.default_rng(seed)
+        scenes = [tiled_discs(rng, width, height, count) for _ in range(frames)]
+        result = {"particles": count}
+        for name, renderer in (("glow_discs", Framebuffer(width, height)),
+                               ("bloom", BloomCompositor(width, height))):
+            times = []
+            for outer, glow, core in scenes:
+                start = clock()
+                if name == "bloom":
+                    renderer.add_glow(*outer)
+                    renderer.add_glow(*glow)
+                else:
+                    renderer.add_discs(*outer)
+                    renderer.add_discs(*glow)
+                renderer.add_discs(*core)
+                renderer.render()
+                times.append(clock() - start)
+            result[name] = summarize(times)
+        result["speedup"] = result["glow_discs"]["mean_ms"] / result["bloom"]["mean_ms"]
+        results.append(result)
+    return {"size": f"{width}x{height}", "results": results}
+
+
+class VirtualDisplay:
+    # 为 tkinter 版本启动一个 Xvfb 虚拟显示
+    def __init__(self, size="1024x768x24"):
+        self.size = size
+        self.process = None
+        self.display = None
+
+    def __enter__(self):
+        xvfb = shutil.which("Xvfb")
+        if xvfb is None:
+            return None
+        for number in range(99, 199):
+            if os.path.exists(f"/tmp/.X11-unix/X{number}") or os.path.exists(f"/tmp/.X{number}-lock"):
+                continue
+            self.process = subprocess.Popen(
+                [xvfb, f":{number}", "-screen", "0", self.size, "-nolisten", "tcp"],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            # 等待显示就绪
+            for _ in range(50):
+                if os.path.exists(f"/tmp/.X11-unix/X{number}"):
+                    self.display = f":{number}"
+                    return self.display
+                if self.process.poll() is not None:
+                    break
+                time.sleep(0.1)
+            self.__exit__(None, None, None)
+        return None
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            self.process.wait()
+        self.process = None
+
+
+def run_in_subprocess(name, args, display=None):
+    command = [
+        sys.executable, os.path.abspath(__file__), "--child", name,
+        "--frames", str(args.frames), "--particles", str(args.particles),
+        "--seed", str(args.seed), "--warmup", str(args.warmup),
+        "--tk-render", args.tk_render,
+    ]
+    env = dict(os.environ)
+    if display:
+        env["DISPLAY"] = display
+    result = subprocess.run(command, capture_output=True, text=True, env=env)
+    if result.returncode != 0:
+        return {"variant": name, "error": result.stderr.strip().splitlines()[-1:] or ["failed"]}
+    # 子进程最后一行输出为 JSON 结果（pygame 可能在前面打印欢迎信息）
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="蓝色爱心无界面基准测试")
+    parser.add_argument("variants", nargs="*", help="要测试的版本（默认全部）：" + ", ".join(VARIANTS))
+    parser.add_argument("--frames", type=int,
+                        help=f"测量的帧数（默认 {FRAMES}，--tiled 时为 {TILED_FRAMES}，--bloom 时为 {BLOOM_FRAMES}，"
+                             f"--creation 时为轮数 {CREATION_ROUNDS}）")
+    parser.add_argument("--particles", type=int, default=1000, help="固定的粒子数量")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--warmup", type=int, default=10, help="预热帧数（不计入结果）")
+    parser.add_argument("--tk-render", choices=TK_RENDER_MODES, default="items",
+                        help="tkinter 版本的渲染方式")
+    parser.add_argument("--spatial", action="store_true",
+                        help="只测试空间索引：暴力查询与均匀网格在 1k/10k/100k 粒子下的耗时")
+    parser.add_argument("--tiled", action="store_true",
+                        help="只测试多进程分块光栅化：4K 下 1 到 --workers 个进程的吞吐量")
+    parser.add_argument("--tk-batch", action="store_true",
+                        help="只测试画布元素模式下逐个调用与批量提交画布命令的耗时（5k 和 10k 粒子）")
+    parser.add_argument("--falling", action="store_true",
+                        help="只测试 tkinter 版本按 F 键后飘落粒子逐个计算与整体推进的每个 tick 耗时（5k 和 10k 粒子）")
+    parser.add_argument("--bloom", action="store_true",
+                        help="只测试发光逐个光栅化与泛光合成在 1k 到 50k 粒子下的每帧耗时")
+    parser.add_argument("--creation", action="store_true",
+                        help="只测试粒子创建的吞吐量（tkinter 的 Particle 和 pygame 的批量生成）")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="--tiled 测试的最大进程数（默认为 CPU 核数）")
+    parser.add_argument("--output", help="把 JSON 结果写入文件，默认输出到标准输出")
+    parser.add_argument("--child", choices=VARIANTS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    unknown = [name for name in args.variants if name not in VARIANTS]
+    if unknown:
+        parser.error("未知的版本: " + ", ".join(unknown))
+
+    if args.frames is None:
+        args.frames = (TILED_FRAMES if args.tiled else BLOOM_FRAMES if args.bloom
+                       else CREATION_ROUNDS if args.creation else FRAMES)
+
+    if args.child:
+        result = run_variant(args.child, args.frames, args.particles, args.seed, args.warmup, args.tk_render)
+        print(json.dumps(result))
+        return
+
+    if args.spatial:
+        report = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "frames": args.frames,
+            "seed": args.seed,
+            "spatial": run_spatial_benchmark(args.frames, args.seed),
+        }
+        write_report(report, args.output)
+        return
+
+    if args.tk_batch:
+        # 在当前进程中运行，没有显示时尝试启动 Xvfb
+        with contextlib.nullcontext() if os.environ.get("DISPLAY") else VirtualDisplay() as display:
+            if display:
+                os.environ["DISPLAY"] = display
+            results = run_tk_batch_benchmark(args.frames, args.seed, args.warmup)
+        report = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "frames": args.frames,
+            "seed": args.seed,
+            "tk_batch": results,
+        }
+        write_report(report, args.output)
+        return
+
+    if args.falling:
+        report = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "frames": args.frames,
+            "seed": args.seed,
+            "falling": run_falling_benchmark(args.frames, args.seed, args.warmup),
+        }
+        write_report(report, args.output)
+        return
+
+    if args.bloom:
+        report = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "frames": args.frames,
+            "seed": args.seed,
+            "bloom": run_bloom_benchmark(args.frames, args.seed),
+        }
+        write_report(report, args.output)
+        return
+
+    if args.creation:
+        report = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "rounds": args.frames,
+            "seed": args.seed,
+            "creation": run_creation_benchmark(args.frames, args.seed),
+        }
+        write_report(report, args.output)
+        return
+
+    if args.tiled:
+        report = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "frames": args.frames,
+            "seed": args.seed,
+            "tiled": run_tiled_benchmark(args.frames, args.seed, args.workers),
+        }
+        write_report(report, args.output)
+        return
+
+    results = []
+    for name in args.variants or VARIANTS:
+        if name in TKINTER_VARIANTS and not os.environ.get("DISPLAY"):
+            with VirtualDisplay() as display:
+                if display is None:
+                    results.append({"variant": name, "skipped": "no display and Xvfb not found"})
+                    continue
+                results.append(run_in_subprocess(name, args, display))
+        else:
+            results.append(run_in_subprocess(name, args))
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "frames": args.frames,
+        "particles": args.particles,
+        "seed": args.seed,
+        "tk_render": args.tk_render,
+        "results": results,
+    }
+    write_report(report, args.output)
+
+
+def write_report(report, output=None):
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,191 @@
+import math
+from functools import lru_cache
+
+import numpy as np
+
+from framebuffer import Framebuffer
+
+# 加法混合合成与单次泛光
+# 原来每个粒子的发光效果都要单独画一个半透明的圆（pygame 的发光精灵、tkinter 的发光椭圆），
+# 开销随粒子数和重叠面积线性增长。泛光合成把发光改为整帧处理：
+#   - add_discs(...)  粒子本体以加法混合累加到浮点缓冲区（Framebuffer 的抗锯齿印章）
+#   - add_glow(...)   每个粒子的发光只作为一个点光源，按双线性权重累加到缩小 GLOW_DOWNSAMPLE 倍的缓冲区，
+#                     亮度与原来的发光圆相同（颜色 x 不透明度 x 圆的面积）
+#   - render()        整帧只做一次可分离的高斯模糊（先横向后纵向），双线性放大后叠加到本体上，
+#                     再做色调映射，输出 uint8 图像
+# 发光的开销只取决于分辨率，与粒子数无关；粒子本体仍按粒子累加，但只有一两个像素大小。
+# 缓冲区按通道分开存放（3 x 高 x 宽），每个通道的行和列都是连续的内存，放大和模糊都是整行运算。
+# 输出用法：pygame 版本用 pygame.image.frombuffer 包装 render() 的结果（不复制），
+# 以 BLEND_ADD 叠加到背景上；tkinter 版本用 render_ppm() 推送到 PhotoImage。
+
+# 发光缓冲区相对于输出分辨率的缩小倍数
+GLOW_DOWNSAMPLE = 4
+
+# 发光的高斯模糊标准差（输出分辨率的像素）
+GLOW_SIGMA = 6.0
+
+# 发光的整体亮度
+GLOW_STRENGTH = 1.0
+
+# 色调映射：低于 TONE_KNEE 的亮度原样输出，超出部分平滑压缩到 255 以内（不再直接截断成一片白色）
+TONE_KNEE = 192.0
+
+
+@lru_cache(maxsize=16)
+def gaussian_kernel(sigma):
+    # 归一化的一维高斯核（半径 3 sigma）
+    radius = max(1, int(math.ceil(3 * sigma)))
+    offsets = np.arange(-radius, radius + 1)
+    kernel = np.exp(-0.5 * (offsets / sigma) ** 2)
+    return (kernel / kernel.sum()).astype(np.float32)
+
+
+def gaussian_blur(planes, sigma):
+    # 对 (3, 高, 宽) 的缓冲区做可分离的高斯模糊，缓冲区外视为 0
+    kernel = gaussian_kernel(round(sigma, 2)).tolist()
+    radius = len(kernel) // 2
+    channels, height, width = planes.shape
+    padded = np.zeros((channels, height, width + 2 * radius), dtype=np.float32)
+    padded[:, :, radius:radius + width] = planes
+    rows = padded[:, :, :width] * kernel[0]
+    for i, weight in enumerate(kernel[1:], 1):
+        rows += padded[:, :, i:i + width] * weight
+    padded = np.zeros((channels, height + 2 * radius, width), dtype=np.float32)
+    padded[:, radius:radius + height] = rows
+    blurred = padded[:, :height] * kernel[0]
+    for i, weight in enumerate(kernel[1:], 1):
+        blurred += padded[:, i:i + height] * weight
+    return blurred
+
+
+def upsample_add(target, planes, factor):
+    # 把 (3, 高, 宽) 的 planes 双线性放大 factor 倍后加到 target（(3, 高 * factor, 宽 * factor)）上，
+    # 像素中心对齐，边缘外取边缘值。放大后第 k 个子像素落在原像素与相邻像素之间固定的位置，
+    # 按 k 分组后每组都是整行的加权和：先纵向放大到中间缓冲区，再横向放大直接加到 target 上
+    channels, height, width = planes.shape
+    phases = [(k + 0.5) / factor - 0.5 for k in range(factor)]
+
+    padded = np.concatenate((planes[:, :1], planes, planes[:, -1:]), axis=1)
+    rows = np.empty((channels, height, factor, width), dtype=np.float32)
+    for k, offset in enumerate(phases):
+        neighbour = padded[:, :-2] if offset < 0 else padded[:, 2:]
+        np.multiply(padded[:, 1:-1], 1 - abs(offset), out=rows[:, :, k])
+        rows[:, :, k] += neighbour * abs(offset)
+    rows = rows.reshape(channels, height * factor, width)
+
+    padded = np.concatenate((rows[:, :, :1], rows, rows[:, :, -1:]), axis=2)
+    columns = target.reshape(channels, height * factor, width, factor)
+    for k, offset in enumerate(phases):
+        neighbour = padded[:, :, :-2] if offset < 0 else padded[:, :, 2:]
+        columns[..., k] += padded[:, :, 1:-1] * (1 - abs(offset)) + neighbour * abs(offset)
+    return target
+
+
+def tone_map(planes, knee=TONE_KNEE):
+    # 原地做色调映射：超过 knee 的部分按 x / (x + 余量) 压缩，结果小于 255
+    bright = planes > knee
+    if bright.any():
+        headroom = 255.0 - knee
+        over = planes[bright] - knee
+        planes[bright] = knee + headroom * over / (over + headroom)
+    return planes
+
+
+class BloomCompositor:
+    def __init__(self, width, height, background=(0, 0, 0), glow_sigma=GLOW_SIGMA,
+                 glow_strength=GLOW_STRENGTH, downsample=GLOW_DOWNSAMPLE):
+        self.width = width
+        self.height = height
+        self.background = np.asarray(background, dtype=np.float32)
+        self.glow_sigma = glow_sigma
+        self.glow_strength = glow_strength
+        self.downsample = downsample
+        self.glow_width = -(-width // downsample)
+        self.glow_height = -(-height // downsample)
+        # 本体缓冲区补齐到 downsample 的整数倍，放大后的发光可以直接叠加，输出时再裁掉多出的部分
+        self.cores = Framebuffer(self.glow_width * downsample, self.glow_height * downsample)
+        self._planes = np.empty((3, self.cores.height, self.cores.width), dtype=np.float32)
+        self._glow_indices = []
+        self._glow_weights = []
+        # 画质设置（由自适应画质调整），按比例缩放模糊半径。
+        # 这是发光半径比例唯一生效的地方：调用方按完整画质的半径加入光源，不要再缩放一次
+        self.glow_scale = 1.0
+
+        # 统计信息
+        self.frames = 0
+
+    def add_discs(self, xs, ys, radii, colors, intensities):
+        # 加入一批粒子本体（实心圆）；colors 为 0-255 的 RGB，intensities 为 0-1 的不透明度
+        self.cores.add_discs(xs, ys, radii, colors, intensities)
+
+    def add_glow(self, xs, ys, radii, colors, intensities):
+        # 加入一批发光光源，亮度与半径为 radii、不透明度为 intensities 的发光圆相同
+        xs = np.asarray(xs, dtype=np.float64)
+        if len(xs) == 0:
+            return
+        ys = np.asarray(ys, dtype=np.float64)
+        radii = np.broadcast_to(np.asarray(radii, dtype=np.float64), xs.shape)
+        colors = np.asarray(colors, dtype=np.float32).reshape(-1, 3)
+        intensities = np.broadcast_to(np.asarray(intensities, dtype=np.float64), xs.shape)
+        # 发光缓冲区的一个像素放大后覆盖 downsample^2 个输出像素
+        energy = (intensities * math.pi * radii * radii / (self.downsample * self.downsample)).astype(np.float32)
+        rgb = colors * energy[:, None]
+
+        # 双线性权重分到相邻的四个像素
+        gx = xs / self.downsample - 0.5
+        gy = ys / self.downsample - 0.5
+        x0 = np.floor(gx)
+        y0 = np.floor(gy)
+        fx = (gx - x0).astype(np.float32)
+        fy = (gy - y0).astype(np.float32)
+        x0 = x0.astype(np.int64)
+        y0 = y0.astype(np.int64)
+        for dy, wy in ((0, 1 - fy), (1, fy)):
+            for dx, wx in ((0, 1 - fx), (1, fx)):
+                cols = x0 + dx
+                rows = y0 + dy
+                valid = (rows >= 0) & (rows < self.glow_height) & (cols >= 0) & (cols < self.glow_width)
+                self._glow_indices.append((rows * self.glow_width + cols)[valid])
+                self._glow_weights.append((rgb * (wx * wy)[:, None])[valid])
+
+    def _add_glow(self, target):
+        # 累加发光光源，模糊后放大叠加到 target 上
+        size = self.glow_width * self.glow_height
+        planes = np.zeros((3, size), dtype=np.float32)
+        if self._glow_indices:
+            indices = np.concatenate(self._glow_indices)
+            weights = np.concatenate(self._glow_weights)
+            for channel in range(3):
+                planes[channel] = np.bincount(indices, weights[:, channel], minlength=size)
+        self._glow_indices = []
+        self._glow_weights = []
+        planes = planes.reshape(3, self.glow_height, self.glow_width)
+        planes = gaussian_blur(planes, self.glow_sigma * self.glow_scale / self.downsample)
+        if self.glow_strength != 1.0:
+            planes *= self.glow_strength
+        upsample_add(target, planes, self.downsample)
+
+    def render(self):
+        # 合成当前帧并清空待绘制列表，返回 (height, width, 3) 的 uint8 数组（连续存放）
+        planes = self._planes
+        planes[:] = self.background[:, None, None]
+        self.cores.accumulate(planes)
+        self._add_glow(planes)
+        tone_map(planes)
+        image = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        for channel in range(3):
+            image[:, :, channel] = planes[channel, :self.height, :self.width]
+        self.frames += 1
+        return image
+
+    def render_ppm(self):
+        # 以二进制 PPM（P6）格式输出，tkinter 的 PhotoImage 可以直接读取
+        header = f"P6 {self.width} {self.height} 255\n".encode("ascii")
+        return header + self.render().tobytes()
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "glow_size": (self.glow_width, self.glow_height),
+            "glow_sigma": self.glow_sigma * self.glow_scale,
+        }
\ No newline at end of file
@@ -1,122 +1,222 @@
 import pygame
 import sys
-import math
-import random
+import time
+import logging
 
-# 初始化Pygame
-pygame.init()
+from heart_simulation import BasicHeartSimulation
+from frame_scheduler import FixedTimestep
+from quality_governor import QualityGovernor, FULL_QUALITY
+from sprite_cache import SpriteCache
+from frame_profiler import FrameProfiler
+from dirty_rects import DirtyRegions
+from bloom import BloomCompositor
+from particle_engine import pool_totals
 
 # 设置窗口大小
 WIDTH, HEIGHT = 800, 600
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("蓝色粒子爱心")
+
+# 模拟频率（每秒 tick 数）和渲染帧率上限
+TICK_RATE = 60
+FPS = 60
+
+# 自适应画质：帧耗时超出预算时依次缩小发光半径、减少粒子
+ADAPTIVE_QUALITY = True
+QUALITY_FEATURES = ("glow_radius", "particle_count")
+
+# 脏矩形模式：只清除和推送粒子和文字覆盖的区域（见 dirty_rects.py），D 键切换
+DIRTY_RECTS = False
+
+# 泛光合成：粒子本体加法混合到浮点缓冲区，发光改为整帧一次高斯模糊（见 bloom.py），G 键切换；
+# 粒子多时比逐个绘制发光精灵快，与脏矩形模式互斥
+BLOOM = False
+
+# 性能剖析：P 键开关性能面板；设为文件名（.csv 或 .jsonl）时启动即开启，并把每帧各阶段耗时写入该文件
+PROFILE_TRACE = None
 
 # 颜色定义
 BLACK = (0, 0, 0)
-BLUE_LIGHT = (100, 180, 255)
-BLUE_MEDIUM = (50, 120, 220)
-BLUE_DARK = (20, 80, 180)
-
-# 粒子类
-class Particle:
-    def __init__(self, x, y):
-        self.x = x
-        self.y = y
-        self.size = random.randint(2, 5)
-        self.color = random.choice([BLUE_LIGHT, BLUE_MEDIUM, BLUE_DARK])
-        self.speed = random.uniform(0.5, 2)
-        self.angle = random.uniform(0, 2 * math.pi)
-        self.distance = random.randint(1, 3)
-        self.original_x = x
-        self.original_y = y
-        self.sin_offset = random.uniform(0, 2 * math.pi)
-        self.pulse_speed = random.uniform(0.02, 0.05)
-        self.time = 0
-
-    def update(self):
-        # 粒子围绕原始位置移动
-        self.time += 0.05
-        pulse = math.sin(self.time * self.pulse_speed + self.sin_offset) * 5
-        
-        # 计算新位置
-        self.x = self.original_x + math.cos(self.angle) * self.distance * pulse
-        self.y = self.original_y + math.sin(self.angle) * self.distance * pulse
-        
-        # 随机改变角度，使运动更自然
-        self.angle += random.uniform(-0.05, 0.05)
+WHITE = (255, 255, 255)
+
+# 窗口和性能面板的字体（在 init_display 中创建）
+screen = None
+font = None
+
+# 当前画质设置（由自适应画质调整）
+quality = FULL_QUALITY
+
+# 脏矩形模式下记录每帧覆盖的区域，整屏重画时为 None
+dirty_regions = None
+
+# 泛光合成模式下的合成器，逐个绘制时为 None
+compositor = None
+
+# 预渲染的发光精灵（只有少数几种尺寸和颜色，颜色不量化）
+glow_cache = SpriteCache(max_size=256, size_step=1, color_step=1, alpha_step=1)
+
+# 每帧各阶段的耗时统计（默认关闭）
+profiler = FrameProfiler()
+
+# 文字 Surface 的累计创建次数，性能面板据此统计每帧新建的 Surface
+text_surfaces = 0
+
+# 初始化Pygame并创建窗口
+def init_display():
+    global screen, font
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("蓝色粒子爱心")
+    font = pygame.font.SysFont(None, 20)
+    return screen
+
+def render_text(text):
+    global text_surfaces
+    text_surfaces += 1
+    return font.render(text, True, WHITE)
 
-    def draw(self):
+# 性能面板：各阶段最近一段时间的平均耗时和计数，显示在右上角
+def draw_profiler_overlay():
+    y = 10
+    for line in profiler.overlay_lines():
+        surface = render_text(line)
+        rect = screen.blit(surface, (WIDTH - surface.get_width() - 10, y))
+        if dirty_regions is not None:
+            dirty_regions.add_rect(rect)
+        y += surface.get_height()
+
+# 绘制所有粒子
+def draw_particles(particles, interpolation=1.0):
+    n = particles.count
+    xs, ys = particles.positions(interpolation)
+    glow_scale = 2 * quality["glow_scale"]
+    if dirty_regions is not None:
+        # 粒子本体和发光效果覆盖的范围
+        dirty_regions.add_discs(xs, ys, particles.size[:n] * max(glow_scale, 1))
+    xs = xs.tolist()
+    ys = ys.tolist()
+    sizes = particles.size[:n].astype(int).tolist()
+    colors = particles.color[:n].tolist()
+    for x, y, size, color in zip(xs, ys, sizes, colors):
         # 绘制粒子
-        pygame.draw.circle(screen, self.color, (int(self.x), int(self.y)), self.size)
+        pygame.draw.circle(screen, color, (int(x), int(y)), size)
         
         # 添加发光效果
-        glow_size = self.size * 2
-        glow_surface = pygame.Surface((glow_size * 2, glow_size * 2), pygame.SRCALPHA)
-        pygame.draw.circle(glow_surface, (*self.color[:3], 30), (glow_size, glow_size), glow_size)
-        screen.blit(glow_surface, (int(self.x - glow_size), int(self.y - glow_size)))
-
-# 创建爱心形状的粒子
-def create_heart_particles(center_x, center_y, size):
-    particles = []
-    for t in range(0, 628, 2):  # 0 到 2π，步长为0.02
-        t = t / 100
-        # 爱心参数方程
-        x = 16 * (math.sin(t) ** 3)
-        y = 13 * math.cos(t) - 5 * math.cos(2*t) - 2 * math.cos(3*t) - math.cos(4*t)
-        
-        # 缩放和定位
-        x = center_x + x * size
-        y = center_y - y * size  # 注意这里是减号，因为屏幕坐标系y轴向下
-        
-        # 在每个点周围添加多个粒子，使爱心更饱满
-        for _ in range(random.randint(1, 3)):
-            offset_x = random.uniform(-5, 5)
-            offset_y = random.uniform(-5, 5)
-            particles.append(Particle(x + offset_x, y + offset_y))
-    
-    return particles
+        glow_sprite, glow_size = glow_cache.get(size * glow_scale, color, 30)
+        screen.blit(glow_sprite, (int(x - glow_size), int(y - glow_size)))
 
-# 创建爱心粒子
-heart_particles = create_heart_particles(WIDTH // 2, HEIGHT // 2, 10)
+# 泛光合成：把所有粒子的本体和发光光源交给合成器，合成后整屏 blit
+# 发光光源按完整画质的半径计算亮度，降低画质时只缩小模糊半径
+def draw_bloom(particle_groups, interpolation=1.0):
+    compositor.glow_scale = quality["glow_scale"]
+    for particles in particle_groups:
+        n = particles.count
+        xs, ys = particles.positions(interpolation)
+        sizes = particles.size[:n].astype(int)
+        colors = particles.color[:n]
+        compositor.add_discs(xs, ys, sizes, colors, 1.0)
+        compositor.add_glow(xs, ys, sizes * 2, colors, 30 / 255)
+    image = compositor.render()
+    screen.blit(pygame.image.frombuffer(image, (WIDTH, HEIGHT), "RGB"), (0, 0))
 
-# 主循环
-clock = pygame.time.Clock()
-heart_beat = 0
-growing = True
+# 绘制一帧
+# interpolation 为模拟状态之间的插值比例
+def render_frame(simulation, interpolation=1.0):
+    # 泛光合成的输出覆盖整个窗口（背景为黑色），不需要清屏
+    if compositor is not None:
+        with profiler.span("particles"):
+            draw_bloom(simulation.particle_groups, interpolation)
+        return
 
-while True:
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            pygame.quit()
-            sys.exit()
-    
-    # 清屏
-    screen.fill(BLACK)
-    
-    # 爱心跳动效果
-    heart_beat += 0.03
-    pulse_factor = 1 + 0.1 * math.sin(heart_beat)
-    
-    # 更新爱心大小
-    if len(heart_particles) < 500 and random.random() < 0.1:
-        new_particle = create_heart_particles(WIDTH // 2, HEIGHT // 2, 10 * pulse_factor)
-        heart_particles.extend(new_particle[:5])  # 每次只添加几个粒子，避免突然变化
-    
-    # 更新和绘制所有粒子
-    for particle in heart_particles:
-        particle.update()
-        particle.draw()
+    # 清屏（脏矩形模式下只清除上一帧画过的区域）
+    with profiler.span("clear"):
+        if dirty_regions is not None:
+            dirty_regions.clear(screen, BLACK)
+        else:
+            screen.fill(BLACK)
     
-    # 添加一些随机飘动的粒子
-    if random.random() < 0.1:
-        x = random.randint(0, WIDTH)
-        y = random.randint(0, HEIGHT)
-        heart_particles.append(Particle(x, y))
+    # 绘制所有粒子
+    with profiler.span("particles"):
+        for particles in simulation.particle_groups:
+            draw_particles(particles, interpolation)
+
+# 更新显示：脏矩形模式下只推送变化的区域
+def present():
+    if dirty_regions is not None:
+        dirty_regions.present()
+    else:
+        pygame.display.flip()
+
+def toggle_dirty_rects():
+    global dirty_regions, compositor
+    dirty_regions = None if dirty_regions is not None else DirtyRegions((WIDTH, HEIGHT))
+    compositor = None
+
+def toggle_bloom():
+    global dirty_regions, compositor
+    compositor = None if compositor is not None else BloomCompositor(WIDTH, HEIGHT, background=BLACK)
+    dirty_regions = None
+
+def main():
+    global quality
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    init_display()
+    if DIRTY_RECTS:
+        toggle_dirty_rects()
+    if BLOOM:
+        toggle_bloom()
+    simulation = BasicHeartSimulation(WIDTH, HEIGHT)
+    governor = QualityGovernor(QUALITY_FEATURES, target_fps=FPS) if ADAPTIVE_QUALITY else None
     
-    # 限制粒子数量
-    if len(heart_particles) > 800:
-        heart_particles = heart_particles[:800]
+    # 主循环：模拟按固定频率推进，渲染帧率单独限制
+    clock = pygame.time.Clock()
+    scheduler = FixedTimestep(TICK_RATE)
+    if PROFILE_TRACE:
+        profiler.start_trace(PROFILE_TRACE)
     
-    # 更新显示
-    pygame.display.flip()
-    clock.tick(60) 
\ No newline at end of file
+    while True:
+        profiler.begin_frame()
+        with profiler.span("events"):
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    profiler.stop_trace()
+                    pygame.quit()
+                    sys.exit()
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_p:
+                    # 开关性能面板
+                    profiler.toggle()
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_d:
+                    # 切换脏矩形 / 整屏重画
+                    toggle_dirty_rects()
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_g:
+                    # 切换泛光合成 / 逐个绘制发光精灵
+                    toggle_bloom()
+        
+        frame_start = time.perf_counter()
+        with profiler.span("update"):
+            for _ in range(scheduler.advance()):
+                simulation.step()
+        render_frame(simulation, scheduler.interpolation)
+        if profiler.enabled:
+            with profiler.span("hud"):
+                draw_profiler_overlay()
+        
+        # 更新显示
+        with profiler.span("flip"):
+            present()
+        
+        # 按这一帧实际的计算耗时（不含等待）调整画质
+        if governor is not None and governor.record(time.perf_counter() - frame_start):
+            quality = governor.settings
+            simulation.particle_scale = quality["particle_scale"]
+        if profiler.enabled:
+            pools = pool_totals(simulation.particle_groups)
+            profiler.end_frame({
+                "particles": len(simulation),
+                "surfaces": profiler.delta("surfaces", glow_cache.misses + text_surfaces),
+                "occupancy": round(pools["occupancy"], 3),
+                "spawned": profiler.delta("spawned", pools["spawned"]),
+                "evicted": profiler.delta("evicted", pools["evicted"]),
+            })
+        clock.tick(FPS)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,63 @@
+# 画布元素池
+# 每次 create_oval / delete 都是一次 Tcl 往返，并且 Tk 要分配和释放画布元素，
+# 按空格重新生成几千个粒子时会明显卡顿。
+# 元素池把不再使用的椭圆隐藏起来留作备用，需要新椭圆时优先取出旧元素，
+# 只修改坐标和颜色，不再删除和重新创建。
+# 复用的元素会提到最上层，与新建的元素一样按创建顺序叠放（深度层的前后关系不会因为复用而颠倒）。
+
+# 复用元素时先恢复的默认样式，避免残留上一次的填充或轮廓
+DEFAULT_OVAL_OPTIONS = {"fill": "", "outline": "", "width": 1.0}
+
+
+class CanvasItemPool:
+    def __init__(self, canvas, max_free=None):
+        self.canvas = canvas
+        self.max_free = max_free  # 备用元素上限，None 表示不限
+        self._free = []
+        self.in_use = 0
+
+        # 统计信息
+        self.hits = 0  # 复用旧元素的次数
+        self.misses = 0  # 新建元素的次数
+
+    @property
+    def size(self):
+        # 元素池拥有的全部画布元素数量
+        return self.in_use + len(self._free)
+
+    def create_oval(self, x0, y0, x1, y1, **options):
+        # 与 canvas.create_oval 用法相同
+        self.in_use += 1
+        if self._free:
+            item = self._free.pop()
+            self.canvas.coords(item, x0, y0, x1, y1)
+            self.canvas.itemconfigure(item, state="normal", **{**DEFAULT_OVAL_OPTIONS, **options})
+            self.canvas.tag_raise(item)
+            self.hits += 1
+            return item
+
+        self.misses += 1
+        return self.canvas.create_oval(x0, y0, x1, y1, **options)
+
+    def release(self, *items):
+        # 归还元素；None 会被忽略，方便直接传入 outer_glow_id
+        for item in items:
+            if item is None:
+                continue
+            self.in_use -= 1
+            if self.max_free is not None and len(self._free) >= self.max_free:
+                self.canvas.delete(item)
+            else:
+                self.canvas.itemconfigure(item, state="hidden")
+                self._free.append(item)
+
+    def stats(self):
+        requests = self.hits + self.misses
+        return {
+            "size": self.size,
+            "in_use": self.in_use,
+            "free": len(self._free),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / requests if requests else 0.0,
+        }
\ No newline at end of file
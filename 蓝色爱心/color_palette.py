@@ -0,0 +1,103 @@
+import math
+from colorsys import hsv_to_rgb
+
+try:
+    import numpy as np
+except ImportError:  # tkinter 版本可以不安装 numpy，只使用逐个查表
+    np = None
+
+# 预先计算的 HSV 调色板
+# 粒子颜色都落在一小块 HSV 范围内（蓝色色相，饱和度和亮度随深度层和光照变化）。
+# 把色相、饱和度、亮度各自量化成固定的几档，启动时对每种组合调用一次 hsv_to_rgb，
+# 之后创建粒子只需计算下标、查表，不再逐个转换颜色、拼接颜色字符串。
+#
+#   - rgb[i]    : (r, g, b) 元组，单图像渲染模式和 pygame 版本使用
+#   - colors[i] : Tk 颜色字符串 "#rrggbb"，每种颜色只有一个字符串对象，所有粒子共用。
+#                 Tk 按名字缓存颜色，颜色名从十几万种减少到一两千种，分配和查找的颜色也随之减少
+#
+# 光照（法向量与光源方向的点积）只取决于随机的法向量，与粒子的其他属性无关，
+# 所以 light_factors() 预先对一组均匀分布的法向量算好光照系数，粒子随机取其中一个即可。
+
+# 色相范围和各通道的量化档数（饱和度和亮度的范围为 0 到 1）
+HUE_RANGE = (0.5, 0.7)
+HUE_STEPS = 16
+SATURATION_STEPS = 16
+VALUE_STEPS = 32
+
+# 预先计算光照系数的法向量网格：x、y 方向各 LIGHT_GRID 档，z 方向一半
+LIGHT_GRID = 16
+
+
+class Palette:
+    def __init__(self, hue_range=HUE_RANGE, hue_steps=HUE_STEPS, saturation_steps=SATURATION_STEPS,
+                 value_steps=VALUE_STEPS):
+        self.hue_min, self.hue_max = hue_range
+        self.hue_steps = hue_steps
+        self.saturation_steps = saturation_steps
+        self.value_steps = value_steps
+        # 把各通道的值换算为档位编号的比例
+        self.hue_scale = (hue_steps - 1) / (self.hue_max - self.hue_min)
+        self.saturation_scale = saturation_steps - 1
+        self.value_scale = value_steps - 1
+
+        # 按 (色相, 饱和度, 亮度) 编号展开为一维表
+        self.rgb = []
+        self.colors = []
+        for h in range(hue_steps):
+            hue = self.hue_min + h / self.hue_scale
+            for s in range(saturation_steps):
+                saturation = s / self.saturation_scale
+                for v in range(value_steps):
+                    r, g, b = hsv_to_rgb(hue, saturation, v / self.value_scale)
+                    rgb = (int(r * 255), int(g * 255), int(b * 255))
+                    self.rgb.append(rgb)
+                    self.colors.append("#%02x%02x%02x" % rgb)
+        self._rgb_array = None
+
+    def __len__(self):
+        return len(self.rgb)
+
+    def index(self, hue, saturation, value):
+        # 最接近的档位在表中的下标；超出范围的值取边界的档位
+        h = min(max(int((hue - self.hue_min) * self.hue_scale + 0.5), 0), self.hue_steps - 1)
+        s = min(max(int(saturation * self.saturation_scale + 0.5), 0), self.saturation_steps - 1)
+        v = min(max(int(value * self.value_scale + 0.5), 0), self.value_steps - 1)
+        return (h * self.saturation_steps + s) * self.value_steps + v
+
+    def lookup(self, hue, saturation, value):
+        # 返回 ((r, g, b), "#rrggbb")
+        i = self.index(hue, saturation, value)
+        return self.rgb[i], self.colors[i]
+
+    def indices(self, hues, saturations, values):
+        # index() 的 NumPy 版本，用于批量生成粒子
+        h = np.clip(np.rint((hues - self.hue_min) * self.hue_scale), 0, self.hue_steps - 1).astype(np.intp)
+        s = np.clip(np.rint(saturations * self.saturation_scale), 0, self.saturation_steps - 1).astype(np.intp)
+        v = np.clip(np.rint(values * self.value_scale), 0, self.value_steps - 1).astype(np.intp)
+        return (h * self.saturation_steps + s) * self.value_steps + v
+
+    def rgb_array(self):
+        # (len, 3) 的 uint8 数组，第一次使用时创建
+        if self._rgb_array is None:
+            self._rgb_array = np.array(self.rgb, dtype=np.uint8)
+        return self._rgb_array
+
+
+def light_factors(direction, intensity, grid=LIGHT_GRID):
+    # 对均匀分布在 [-1, 1] x [-1, 1] x [0.5, 1] 中的法向量（取网格中点）计算光照系数，
+    # 从中随机取一个与逐个随机生成法向量再计算的分布相同
+    factors = []
+    for i in range(grid):
+        nx = -1 + (i + 0.5) * 2 / grid
+        for j in range(grid):
+            ny = -1 + (j + 0.5) * 2 / grid
+            for k in range(grid // 2):
+                nz = 0.5 + (k + 0.5) * 0.5 / (grid // 2)
+                norm = math.sqrt(nx*nx + ny*ny + nz*nz)
+                light_dot = (nx*direction[0] + ny*direction[1] + nz*direction[2]) / norm
+                factors.append(max(0.2, min(1.0, 0.5 + light_dot * intensity)))
+    return factors
+
+
+# 各版本共用的调色板
+PALETTE = Palette()
\ No newline at end of file
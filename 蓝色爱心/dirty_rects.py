@@ -0,0 +1,135 @@
+import numpy as np
+import pygame
+
+# 脏矩形渲染
+# 爱心只占窗口的一部分，背景粒子也很稀疏，每帧整屏清除再 flip 大部分像素都没有变化。
+# 脏矩形模式下把窗口划分为边长 TILE_SIZE 的格子，记录每帧粒子、发光、轨迹和文字覆盖的格子：
+#   - clear()   只把上一帧画过的格子恢复为背景
+#   - present() 只把上一帧和这一帧覆盖的格子用 pygame.display.update(rects) 推送到屏幕，
+#               每行相邻的格子合并为一个矩形
+# 所有粒子每帧都在移动，仍然全部重画，节省的是清屏和推送到屏幕的像素。
+# 覆盖的面积超过 FULL_UPDATE_RATIO 时改为整屏清除和 pygame.display.flip()，逐块处理已经不划算。
+#
+# 格子由一批矩形的范围直接计算：在 (行数 + 1) x (列数 + 1) 的差分数组四个角上加减 1，
+# 两次累加后大于零的格子就是被覆盖的格子，不需要逐个矩形循环。
+
+# 格子边长（像素）
+TILE_SIZE = 16
+
+# 需要更新的面积占窗口的比例超过此值时整屏 flip
+FULL_UPDATE_RATIO = 0.5
+
+# 粒子范围的额外边距（像素）：精灵半径的量化和取整误差
+MARGIN = 2
+
+
+class DirtyRegions:
+    def __init__(self, size, tile_size=TILE_SIZE, full_update_ratio=FULL_UPDATE_RATIO):
+        self.width, self.height = size
+        self.tile_size = tile_size
+        self.full_update_ratio = full_update_ratio
+        self.columns = -(-self.width // tile_size)
+        self.rows = -(-self.height // tile_size)
+        self._corners = []  # 这一帧加入的矩形，每批为格子坐标 (r0, c0, r1, c1)
+        self.previous = np.ones((self.rows, self.columns), dtype=bool)  # 第一帧整屏绘制
+        self.full_clear = True
+
+        # 统计信息
+        self.frames = 0
+        self.full_updates = 0  # 整屏 flip 的帧数
+        self.dirty_ratio = 1.0  # 最近一帧需要更新的面积比例
+        self.rect_count = 0  # 最近一帧推送的矩形数
+
+    def clear(self, surface, background):
+        # 开始新的一帧：把上一帧画过的格子恢复为背景。background 为 Surface（整屏大小）或颜色
+        is_surface = isinstance(background, pygame.Surface)
+        if self.full_clear:
+            if is_surface:
+                surface.blit(background, (0, 0))
+            else:
+                surface.fill(background)
+        else:
+            for rect in self.tile_rects(self.previous):
+                if is_surface:
+                    surface.blit(background, rect, rect)
+                else:
+                    surface.fill(background, rect)
+        self._corners = []
+
+    def add_boxes(self, x0, y0, x1, y1):
+        # 加入一批矩形 [x0, x1) x [y0, y1)（像素坐标，NumPy 数组），超出窗口的部分忽略
+        size = self.tile_size
+        c0 = np.clip(np.floor(np.asarray(x0) / size), 0, self.columns).astype(np.intp)
+        r0 = np.clip(np.floor(np.asarray(y0) / size), 0, self.rows).astype(np.intp)
+        c1 = np.clip(np.ceil(np.asarray(x1) / size), 0, self.columns).astype(np.intp)
+        r1 = np.clip(np.ceil(np.asarray(y1) / size), 0, self.rows).astype(np.intp)
+        self._corners.append((r0, c0, r1, c1))
+
+    def add_discs(self, xs, ys, radii):
+        # 加入一批以 (x, y) 为中心、半径为 radii 的精灵
+        reach = radii + MARGIN
+        self.add_boxes(xs - reach, ys - reach, xs + reach, ys + reach)
+
+    def add_trails(self, xs, ys, trails, trail_counts, radii):
+        # 加入一批轨迹：每个粒子取当前位置和有效轨迹点（ordered_trails() 的结果）的外接矩形
+        max_trail = trails.shape[1]
+        valid = np.arange(max_trail) >= max_trail - trail_counts[:, None]
+        trail_xs = np.where(valid, trails[:, :, 0], xs[:, None])
+        trail_ys = np.where(valid, trails[:, :, 1], ys[:, None])
+        reach = radii + MARGIN
+        self.add_boxes(trail_xs.min(axis=1) - reach, trail_ys.min(axis=1) - reach,
+                       trail_xs.max(axis=1) + reach, trail_ys.max(axis=1) + reach)
+
+    def add_rect(self, rect):
+        # 加入一个 pygame.Rect（例如 blit 文字的返回值）
+        self.add_boxes(np.array([rect.left]), np.array([rect.top]), np.array([rect.right]), np.array([rect.bottom]))
+
+    def covered_tiles(self):
+        # 这一帧加入的矩形覆盖的格子
+        stride = self.columns + 1
+        cells = (self.rows + 1) * stride
+        marks = np.zeros(cells, dtype=np.int64)
+        for r0, c0, r1, c1 in self._corners:
+            marks += np.bincount(r0 * stride + c0, minlength=cells)
+            marks -= np.bincount(r0 * stride + c1, minlength=cells)
+            marks -= np.bincount(r1 * stride + c0, minlength=cells)
+            marks += np.bincount(r1 * stride + c1, minlength=cells)
+        marks = marks.reshape(self.rows + 1, stride).cumsum(axis=0).cumsum(axis=1)
+        return marks[:-1, :-1] > 0
+
+    def tile_rects(self, tiles):
+        # 每行相邻的格子合并为一个矩形
+        size = self.tile_size
+        padded = np.zeros((self.rows, self.columns + 2), dtype=np.int8)
+        padded[:, 1:-1] = tiles
+        edges = np.diff(padded, axis=1)
+        rows, starts = np.nonzero(edges == 1)
+        _, ends = np.nonzero(edges == -1)
+        return [pygame.Rect(start * size, row * size, (end - start) * size, size)
+                for row, start, end in zip(rows.tolist(), starts.tolist(), ends.tolist())]
+
+    def present(self):
+        # 把这一帧的变化推送到屏幕：上一帧覆盖的格子已被清除，这一帧覆盖的格子有新内容
+        current = self.covered_tiles()
+        changed = current | self.previous
+        self.dirty_ratio = float(changed.mean())
+        if self.dirty_ratio > self.full_update_ratio:
+            pygame.display.flip()
+            self.full_updates += 1
+            self.rect_count = 1
+        else:
+            rects = self.tile_rects(changed)
+            pygame.display.update(rects)
+            self.rect_count = len(rects)
+        # 这一帧覆盖的面积很大时，下一帧直接整屏清除
+        self.full_clear = float(current.mean()) > self.full_update_ratio
+        self.previous = current
+        self.frames += 1
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "full_updates": self.full_updates,
+            "dirty_ratio": self.dirty_ratio,
+            "rects": self.rect_count,
+        }
\ No newline at end of file
@@ -1,243 +1,372 @@
 import pygame
+import numpy as np
 import sys
-import math
-import random
-import colorsys
+import time
+import logging
 
-# 初始化Pygame
-pygame.init()
+from heart_simulation import EnhancedHeartSimulation
+from frame_scheduler import FixedTimestep
+from quality_governor import QualityGovernor, FULL_QUALITY
+from background import GradientBackground
+from sprite_cache import SpriteCache
+from frame_profiler import FrameProfiler
+from dirty_rects import DirtyRegions
+from bloom import BloomCompositor
+from particle_engine import pool_totals
 
 # 设置窗口大小
 WIDTH, HEIGHT = 800, 600
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("增强版蓝色粒子爱心")
+
+# 模拟频率（每秒 tick 数）和渲染帧率上限
+TICK_RATE = 60
+FPS = 60
+
+# 自适应画质：帧耗时超出预算时依次缩短轨迹、缩小发光半径、减少粒子
+ADAPTIVE_QUALITY = True
+QUALITY_FEATURES = ("trail_length", "glow_radius", "particle_count")
+
+# 脏矩形模式：只清除和推送粒子、轨迹和文字覆盖的区域（见 dirty_rects.py），D 键切换
+DIRTY_RECTS = False
+
+# 泛光合成：粒子本体和轨迹加法混合到浮点缓冲区，发光改为整帧一次高斯模糊（见 bloom.py），G 键切换；
+# 粒子多时比逐个绘制发光精灵快，与脏矩形模式互斥
+BLOOM = False
+
+# 性能剖析：P 键开关性能面板；设为文件名（.csv 或 .jsonl）时启动即开启，并把每帧各阶段耗时写入该文件
+PROFILE_TRACE = None
 
 # 颜色定义
 BLACK = (0, 0, 0)
 WHITE = (255, 255, 255)
 
-# 粒子类
-class Particle:
-    def __init__(self, x, y):
-        self.x = x
-        self.y = y
-        self.size = random.uniform(1.5, 4.5)
-        self.original_size = self.size
-        # 使用HSV色彩空间创建更丰富的蓝色渐变
-        hue = random.uniform(0.55, 0.65)  # 蓝色范围的色相
-        saturation = random.uniform(0.7, 1.0)
-        value = random.uniform(0.7, 1.0)
-        r, g, b = colorsys.hsv_to_rgb(hue, saturation, value)
-        self.color = (int(r * 255), int(g * 255), int(b * 255))
-        self.alpha = random.randint(150, 255)
-        
-        self.speed = random.uniform(0.2, 1.5)
-        self.angle = random.uniform(0, 2 * math.pi)
-        self.distance = random.uniform(1, 4)
-        self.original_x = x
-        self.original_y = y
-        self.sin_offset = random.uniform(0, 2 * math.pi)
-        self.pulse_speed = random.uniform(0.01, 0.04)
-        self.time = random.uniform(0, 100)  # 随机初始时间使粒子不同步
-        
-        # 粒子生命周期
-        self.life = random.uniform(0.7, 1.0)
-        self.fade_speed = random.uniform(0.001, 0.005)
-        
-        # 轨迹点
-        self.trail = []
-        self.trail_length = random.randint(3, 8)
+# 窗口和字体（在 init_display 中创建）
+screen = None
+font = None
 
-    def update(self, mouse_pos=None, attract=False):
-        # 更新时间
-        self.time += 0.05
-        
-        # 基础脉动
-        pulse = math.sin(self.time * self.pulse_speed + self.sin_offset) * 5
-        
-        # 计算新位置
-        self.x = self.original_x + math.cos(self.angle) * self.distance * pulse
-        self.y = self.original_y + math.sin(self.angle) * self.distance * pulse
-        
-        # 鼠标交互 - 吸引或排斥粒子
-        if mouse_pos and attract:
-            dx = mouse_pos[0] - self.x
-            dy = mouse_pos[1] - self.y
-            distance = max(math.sqrt(dx*dx + dy*dy), 0.1)
-            
-            if distance < 150:  # 只影响鼠标附近的粒子
-                force = 0.5 / distance
-                self.x += dx * force
-                self.y += dy * force
-                
-                # 增加粒子大小
-                self.size = min(self.original_size * 1.5, self.original_size + 2)
-            else:
-                # 恢复原始大小
-                self.size = max(self.size - 0.1, self.original_size)
-        
-        # 随机改变角度，使运动更自然
-        self.angle += random.uniform(-0.03, 0.03)
-        
-        # 更新粒子生命周期
-        self.life -= self.fade_speed
-        if self.life <= 0:
-            self.life = random.uniform(0.7, 1.0)
-            # 重置位置
-            self.original_x += random.uniform(-1, 1)
-            self.original_y += random.uniform(-1, 1)
-        
-        # 添加轨迹点
-        self.trail.append((self.x, self.y))
-        if len(self.trail) > self.trail_length:
-            self.trail.pop(0)
-
-    def draw(self):
-        # 绘制轨迹
-        if len(self.trail) > 1:
-            for i in range(len(self.trail) - 1):
-                alpha = int(i / len(self.trail) * self.alpha * 0.5)
-                trail_color = (*self.color, alpha)
-                trail_size = self.size * (i / len(self.trail))
-                
-                # 创建轨迹表面
-                trail_surface = pygame.Surface((int(trail_size * 2), int(trail_size * 2)), pygame.SRCALPHA)
-                pygame.draw.circle(trail_surface, trail_color, 
-                                  (int(trail_size), int(trail_size)), 
-                                  max(1, int(trail_size)))
-                
-                screen.blit(trail_surface, 
-                           (int(self.trail[i][0] - trail_size), 
-                            int(self.trail[i][1] - trail_size)))
-        
-        # 绘制粒子
-        particle_color = (*self.color, int(self.alpha * self.life))
-        particle_surface = pygame.Surface((int(self.size * 2), int(self.size * 2)), pygame.SRCALPHA)
-        pygame.draw.circle(particle_surface, particle_color, 
-                          (int(self.size), int(self.size)), 
-                          int(self.size))
+# 界面状态
+attract_mode = False
+batched_blits = True  # 是否使用 Surface.blits 批量绘制
+quality = FULL_QUALITY  # 当前画质设置（由自适应画质调整）
+dirty_regions = None  # 脏矩形模式下记录每帧覆盖的区域，整屏重画时为 None
+compositor = None  # 泛光合成模式下的合成器，逐个绘制时为 None
+
+# 预渲染的粒子、发光和轨迹精灵
+sprite_cache = SpriteCache()
+
+# 渐变背景：预渲染到缓存的 Surface，窗口尺寸或调色板变化时才重建
+gradient_background = GradientBackground(top_color=(0, 10, 30), bottom_color=BLACK)
+
+# 每帧各阶段的耗时统计（默认关闭）
+profiler = FrameProfiler()
+
+# 文字 Surface 的累计创建次数，性能面板据此统计每帧新建的 Surface
+text_surfaces = 0
+
+# 初始化Pygame并创建窗口
+def init_display():
+    global screen, font
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("增强版蓝色粒子爱心")
+    font = pygame.font.SysFont(None, 24)
+    return screen
+
+def render_text(text):
+    global text_surfaces
+    text_surfaces += 1
+    return font.render(text, True, WHITE)
+
+# 性能面板：各阶段最近一段时间的平均耗时和计数，显示在右上角
+def draw_profiler_overlay():
+    y = 40
+    for line in profiler.overlay_lines():
+        surface = render_text(line)
+        blit_text(surface, (WIDTH - surface.get_width() - 10, y))
+        y += surface.get_height()
+
+def blit_text(surface, position):
+    rect = screen.blit(surface, position)
+    if dirty_regions is not None:
+        dirty_regions.add_rect(rect)
+
+# 脏矩形模式：记录一组粒子的本体、发光和轨迹覆盖的范围
+# xs、ys 为插值后的位置，trails、trail_counts 为 ordered_trails() 的结果
+def mark_dirty_particles(xs, ys, sizes, glow_scale, trails, trail_counts):
+    dirty_regions.add_discs(xs, ys, sizes * max(glow_scale, 1))
+    # 轨迹精灵不大于粒子本体
+    dirty_regions.add_trails(xs, ys, trails, trail_counts, sizes)
+
+# 绘制所有粒子
+def draw_particles(particles, interpolation=1.0):
+    n = particles.count
+    xs, ys = particles.positions(interpolation)
+    trails, trail_counts = particles.ordered_trails()
+    glow_scale = 3 * quality["glow_scale"]
+    if dirty_regions is not None:
+        mark_dirty_particles(xs, ys, particles.size[:n], glow_scale, trails, trail_counts)
+    xs = xs.tolist()
+    ys = ys.tolist()
+    sizes = particles.size[:n].tolist()
+    colors = [tuple(c) for c in particles.color[:n].tolist()]
+    alphas = particles.alpha[:n].tolist()
+    lives = particles.life[:n].tolist()
+    trails = trails.reshape(n, -1).tolist()  # 每个粒子一行 [x0, y0, x1, y1, ...]
+    trail_counts = trail_counts.tolist()
+    max_trail = particles.max_trail
+    trail_scale = quality["trail_scale"]
+    for x, y, size, color, alpha, life, trail, trail_count in zip(
+            xs, ys, sizes, colors, alphas, lives, trails, trail_counts):
+        # 绘制轨迹（降低画质时只画最新的一段）；有效轨迹点在末尾，从第 first 个点开始
+        if trail_count > 1:
+            first = max_trail - trail_count
+            for i in range(trail_count - 1 - int((trail_count - 1) * trail_scale), trail_count - 1):
+                trail_alpha = int(i / trail_count * alpha * 0.5)
+                trail_size = size * (i / trail_count)
+                trail_sprite, offset = sprite_cache.get(trail_size, color, trail_alpha, min_radius=1)
+                j = 2 * (first + i)
+                screen.blit(trail_sprite, 
+                           (int(trail[j] - offset), 
+                            int(trail[j + 1] - offset)))
         
-        # 添加发光效果
-        glow_size = self.size * 3
-        glow_surface = pygame.Surface((int(glow_size * 2), int(glow_size * 2)), pygame.SRCALPHA)
-        glow_color = (*self.color, int(30 * self.life))
-        pygame.draw.circle(glow_surface, glow_color, 
-                          (int(glow_size), int(glow_size)), 
-                          int(glow_size))
+        # 粒子本体和发光效果使用缓存的精灵
+        particle_sprite, offset = sprite_cache.get(size, color, int(alpha * life))
+        glow_sprite, glow_offset = sprite_cache.get(size * glow_scale, color, int(30 * life))
         
         # 绘制到屏幕
-        screen.blit(glow_surface, (int(self.x - glow_size), int(self.y - glow_size)))
-        screen.blit(particle_surface, (int(self.x - self.size), int(self.y - self.size)))
+        screen.blit(glow_sprite, (int(x - glow_offset), int(y - glow_offset)))
+        screen.blit(particle_sprite, (int(x - offset), int(y - offset)))
 
-# 创建爱心形状的粒子
-def create_heart_particles(center_x, center_y, size, density=1):
-    particles = []
-    step = max(1, int(3 / density))  # 根据密度调整步长
-    
-    for t in range(0, 628, step):  # 0 到 2π
-        t = t / 100
-        # 爱心参数方程
-        x = 16 * (math.sin(t) ** 3)
-        y = 13 * math.cos(t) - 5 * math.cos(2*t) - 2 * math.cos(3*t) - math.cos(4*t)
-        
-        # 缩放和定位
-        x = center_x + x * size
-        y = center_y - y * size  # 注意这里是减号，因为屏幕坐标系y轴向下
+# 收集一组粒子的 (精灵, 位置)，按图层分别放入三个列表
+def collect_particle_blits(particles, trail_blits, glow_blits, core_blits, interpolation=1.0, scale=1.0):
+    n = particles.count
+    xs, ys = particles.positions(interpolation)
+    trails, trail_counts = particles.ordered_trails()
+    sizes = particles.size[:n]
+    if scale != 1.0:
+        # 离线导出：位置和半径从窗口坐标缩放到输出分辨率
+        xs, ys, trails, sizes = xs * scale, ys * scale, trails * scale, sizes * scale
+    glow_scale = 3 * quality["glow_scale"]
+    if dirty_regions is not None:
+        mark_dirty_particles(xs, ys, sizes, glow_scale, trails, trail_counts)
+    xs = xs.tolist()
+    ys = ys.tolist()
+    sizes = sizes.tolist()
+    colors = [tuple(c) for c in particles.color[:n].tolist()]
+    alphas = particles.alpha[:n].tolist()
+    lives = particles.life[:n].tolist()
+    trails = trails.reshape(n, -1).tolist()  # 每个粒子一行 [x0, y0, x1, y1, ...]
+    trail_counts = trail_counts.tolist()
+    max_trail = particles.max_trail
+    get_sprite = sprite_cache.get
+    trail_scale = quality["trail_scale"]
+    for x, y, size, color, alpha, life, trail, trail_count in zip(
+            xs, ys, sizes, colors, alphas, lives, trails, trail_counts):
+        # 轨迹（降低画质时只画最新的一段）；有效轨迹点在末尾，从第 first 个点开始
+        first = max_trail - trail_count
+        for i in range(trail_count - 1 - int((trail_count - 1) * trail_scale), trail_count - 1):
+            trail_sprite, offset = get_sprite(size * (i / trail_count), color,
+                                              int(i / trail_count * alpha * 0.5), min_radius=1)
+            j = 2 * (first + i)
+            trail_blits.append((trail_sprite, (int(trail[j] - offset), int(trail[j + 1] - offset))))
         
-        # 在每个点周围添加多个粒子，使爱心更饱满
-        for _ in range(random.randint(1, int(2 * density))):
-            offset_x = random.uniform(-3, 3) * density
-            offset_y = random.uniform(-3, 3) * density
-            particles.append(Particle(x + offset_x, y + offset_y))
-    
-    return particles
-
-# 创建背景粒子
-def create_background_particles(count):
-    particles = []
-    for _ in range(count):
-        x = random.randint(0, WIDTH)
-        y = random.randint(0, HEIGHT)
-        particles.append(Particle(x, y))
-    return particles
-
-# 创建爱心粒子
-heart_particles = create_heart_particles(WIDTH // 2, HEIGHT // 2, 10, 1.5)
-background_particles = create_background_particles(100)
-
-# 主循环
-clock = pygame.time.Clock()
-heart_beat = 0
-growing = True
-attract_mode = False
-font = pygame.font.SysFont(None, 24)
+        # 发光效果和粒子本体
+        glow_sprite, glow_offset = get_sprite(size * glow_scale, color, int(30 * life))
+        glow_blits.append((glow_sprite, (int(x - glow_offset), int(y - glow_offset))))
+        particle_sprite, offset = get_sprite(size, color, int(alpha * life))
+        core_blits.append((particle_sprite, (int(x - offset), int(y - offset))))
+
+# 批量绘制所有粒子：整帧只调用一次 Surface.blits
+# 图层顺序：轨迹在最下面，其上是发光，最上面是粒子本体。
+# surface 默认为窗口；离线导出时传入输出分辨率的 Surface 和缩放比例 scale
+def draw_particles_batched(particle_groups, interpolation=1.0, surface=None, scale=1.0):
+    trail_blits = []
+    glow_blits = []
+    core_blits = []
+    for particles in particle_groups:
+        collect_particle_blits(particles, trail_blits, glow_blits, core_blits, interpolation, scale)
+    trail_blits.extend(glow_blits)
+    trail_blits.extend(core_blits)
+    (screen if surface is None else surface).blits(trail_blits, doreturn=False)
+
+# 把一组粒子的轨迹点、本体和发光加入 target（Framebuffer、TiledFramebuffer 或 BloomCompositor），
+# 参数与逐个绘制精灵时相同。scale 把窗口坐标缩放到输出分辨率（离线导出）；
+# add_glow 为加入发光的方法，默认与本体一样光栅化为圆；传入泛光合成器的 add_glow 时
+# 发光半径不按画质缩小，改由合成器的 glow_scale 缩小模糊半径
+def add_particle_discs(target, particles, interpolation=1.0, scale=1.0, add_glow=None):
+    n = particles.count
+    xs, ys = particles.positions(interpolation)
+    xs = xs * scale
+    ys = ys * scale
+    sizes = particles.size[:n]
+    colors = particles.color[:n]
+    alphas = particles.alpha[:n]
+    lives = particles.life[:n]
+    glow_scale = 3 * quality["glow_scale"] if add_glow is None else 3
+
+    # 轨迹：粒子 p 的第 i 个有效轨迹点位于 trails[p, max_trail - count + i]，
+    # 只画 i 在 [count - 1 - int((count - 1) * trail_scale), count - 1) 内的点
+    trails, trail_counts = particles.ordered_trails()
+    if trails.size:
+        counts = trail_counts[:, None].astype(float)
+        index = np.arange(particles.max_trail)[None, :] - (particles.max_trail - counts)
+        first = counts - 1 - np.floor((counts - 1) * quality["trail_scale"])
+        visible = (index >= first) & (index < counts - 1)
+        owner, point = np.nonzero(visible)
+        fraction = (index / np.maximum(counts, 1))[owner, point]
+        target.add_discs(trails[owner, point, 0] * scale, trails[owner, point, 1] * scale,
+                         np.maximum(sizes[owner] * fraction, 1) * scale, colors[owner],
+                         fraction * alphas[owner] * 0.5 / 255)
+
+    (add_glow or target.add_discs)(xs, ys, sizes * glow_scale * scale, colors, 30 / 255 * lives)
+    target.add_discs(xs, ys, sizes * scale, colors, alphas * lives / 255)
+
+# 泛光合成一帧并以加法混合叠加到背景上
+def draw_bloom(particle_groups, interpolation=1.0):
+    compositor.glow_scale = quality["glow_scale"]
+    for particles in particle_groups:
+        add_particle_discs(compositor, particles, interpolation, add_glow=compositor.add_glow)
+    image = compositor.render()
+    screen.blit(pygame.image.frombuffer(image, (WIDTH, HEIGHT), "RGB"), (0, 0),
+                special_flags=pygame.BLEND_ADD)
 
-# 渐变背景
 def draw_gradient_background():
-    # 创建渐变背景
-    for y in range(0, HEIGHT, 2):
-        # 从深蓝到黑色的渐变
-        color_value = y / HEIGHT
-        color = (0, int(10 * (1 - color_value)), int(30 * (1 - color_value)))
-        pygame.draw.line(screen, color, (0, y), (WIDTH, y))
-
-while True:
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            pygame.quit()
-            sys.exit()
-        elif event.type == pygame.MOUSEBUTTONDOWN:
-            # 切换吸引模式
-            attract_mode = not attract_mode
-        elif event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_SPACE:
-                # 重新生成爱心
-                heart_particles = create_heart_particles(WIDTH // 2, HEIGHT // 2, 10, 1.5)
-    
-    # 获取鼠标位置
-    mouse_pos = pygame.mouse.get_pos()
-    
-    # 绘制渐变背景
-    draw_gradient_background()
-    
-    # 爱心跳动效果
-    heart_beat += 0.03
-    pulse_factor = 1 + 0.15 * math.sin(heart_beat)
-    
-    # 更新爱心大小
-    if random.random() < 0.05:
-        new_size = 10 * pulse_factor
-        new_particles = create_heart_particles(WIDTH // 2, HEIGHT // 2, new_size, 0.5)
-        heart_particles.extend(new_particles[:10])  # 每次只添加几个粒子
-    
-    # 更新和绘制所有粒子
-    all_particles = background_particles + heart_particles
-    for particle in all_particles:
-        particle.update(mouse_pos, attract_mode)
-        particle.draw()
-    
-    # 添加一些随机飘动的粒子
-    if random.random() < 0.05:
-        x = random.randint(0, WIDTH)
-        y = random.randint(0, HEIGHT)
-        background_particles.append(Particle(x, y))
+    gradient_background.draw(screen)
+
+# 绘制一帧；interpolation 为模拟状态之间的插值比例，scheduler 用于显示丢帧统计
+def render_frame(simulation, interpolation=1.0, scheduler=None):
+    # 绘制渐变背景（脏矩形模式下只恢复上一帧画过的区域）
+    with profiler.span("background"):
+        if dirty_regions is not None:
+            dirty_regions.clear(screen, gradient_background.get(screen))
+        else:
+            draw_gradient_background()
     
-    # 限制粒子数量
-    if len(heart_particles) > 1000:
-        heart_particles = heart_particles[:1000]
-    if len(background_particles) > 200:
-        background_particles = background_particles[:200]
+    # 绘制所有粒子
+    with profiler.span("particles"):
+        particle_groups = simulation.particle_groups
+        if compositor is not None:
+            draw_bloom(particle_groups, interpolation)
+        elif batched_blits:
+            draw_particles_batched(particle_groups, interpolation)
+        else:
+            # 逐个粒子绘制，用于和批量绘制对比
+            for particles in particle_groups:
+                draw_particles(particles, interpolation)
     
-    # 显示提示信息
-    info_text = "点击鼠标: 切换吸引模式 | 空格键: 重新生成爱心"
-    info_surface = font.render(info_text, True, WHITE)
-    screen.blit(info_surface, (10, HEIGHT - 30))
+    with profiler.span("text"):
+        # 显示提示信息
+        info_text = "点击鼠标: 切换吸引模式 | 空格键: 重新生成爱心 | B键: 切换绘制方式 | D键: 脏矩形 | G键: 泛光 | P键: 性能面板"
+        info_surface = render_text(info_text)
+        blit_text(info_surface, (10, HEIGHT - 30))
+        
+        # 显示当前模式
+        mode_text = "吸引模式: " + ("开启" if attract_mode else "关闭")
+        if compositor is not None:
+            mode_text += " | 绘制: 泛光合成"
+        else:
+            mode_text += " | 绘制: " + ("批量" if batched_blits else "逐个")
+        if scheduler is not None:
+            mode_text += f" | 延迟帧: {scheduler.late_frames} | 丢弃步数: {scheduler.dropped_ticks}"
+        if dirty_regions is not None:
+            mode_text += f" | 脏矩形: {dirty_regions.dirty_ratio:.0%}"
+        if quality != FULL_QUALITY:
+            mode_text += " | 画质已降低"
+        mode_surface = render_text(mode_text)
+        blit_text(mode_surface, (10, 10))
+
+# 更新显示：脏矩形模式下只推送变化的区域
+def present():
+    if dirty_regions is not None:
+        dirty_regions.present()
+    else:
+        pygame.display.flip()
+
+def toggle_dirty_rects():
+    global dirty_regions, compositor
+    dirty_regions = None if dirty_regions is not None else DirtyRegions((WIDTH, HEIGHT))
+    compositor = None
+
+def toggle_bloom():
+    global dirty_regions, compositor
+    compositor = None if compositor is not None else BloomCompositor(WIDTH, HEIGHT)
+    dirty_regions = None
+
+def main():
+    global attract_mode, batched_blits, quality
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    init_display()
+    if DIRTY_RECTS:
+        toggle_dirty_rects()
+    if BLOOM:
+        toggle_bloom()
+    simulation = EnhancedHeartSimulation(WIDTH, HEIGHT)
+    governor = QualityGovernor(QUALITY_FEATURES, target_fps=FPS) if ADAPTIVE_QUALITY else None
     
-    # 显示当前模式
-    mode_text = "吸引模式: " + ("开启" if attract_mode else "关闭")
-    mode_surface = font.render(mode_text, True, WHITE)
-    screen.blit(mode_surface, (10, 10))
+    # 主循环：模拟按固定频率推进，渲染帧率单独限制
+    clock = pygame.time.Clock()
+    scheduler = FixedTimestep(TICK_RATE)
+    if PROFILE_TRACE:
+        profiler.start_trace(PROFILE_TRACE)
     
-    # 更新显示
-    pygame.display.flip()
-    clock.tick(60) 
\ No newline at end of file
+    while True:
+        profiler.begin_frame()
+        with profiler.span("events"):
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    profiler.stop_trace()
+                    pygame.quit()
+                    sys.exit()
+                elif event.type == pygame.MOUSEBUTTONDOWN:
+                    # 切换吸引模式
+                    attract_mode = not attract_mode
+                elif event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_SPACE:
+                        # 重新生成爱心
+                        simulation.regenerate_heart()
+                    elif event.key == pygame.K_b:
+                        # 切换批量绘制 / 逐个粒子绘制
+                        batched_blits = not batched_blits
+                    elif event.key == pygame.K_d:
+                        # 切换脏矩形 / 整屏重画
+                        toggle_dirty_rects()
+                    elif event.key == pygame.K_g:
+                        # 切换泛光合成 / 逐个绘制发光精灵
+                        toggle_bloom()
+                    elif event.key == pygame.K_p:
+                        # 开关性能面板
+                        profiler.toggle()
+            
+            # 获取鼠标位置
+            mouse_pos = pygame.mouse.get_pos()
+        
+        frame_start = time.perf_counter()
+        with profiler.span("update"):
+            for _ in range(scheduler.advance()):
+                simulation.step(mouse_pos, attract_mode)
+        render_frame(simulation, scheduler.interpolation, scheduler)
+        if profiler.enabled:
+            with profiler.span("hud"):
+                draw_profiler_overlay()
+        
+        # 更新显示
+        with profiler.span("flip"):
+            present()
+        
+        # 按这一帧实际的计算耗时（不含等待）调整画质
+        if governor is not None and governor.record(time.perf_counter() - frame_start):
+            quality = governor.settings
+            simulation.particle_scale = quality["particle_scale"]
+        if profiler.enabled:
+            pools = pool_totals(simulation.particle_groups)
+            profiler.end_frame({
+                "particles": len(simulation),
+                "surfaces": profiler.delta(
+                    "surfaces", sprite_cache.misses + gradient_background.rebuilds + text_surfaces),
+                "occupancy": round(pools["occupancy"], 3),
+                "spawned": profiler.delta("spawned", pools["spawned"]),
+                "evicted": profiler.delta("evicted", pools["evicted"]),
+            })
+        clock.tick(FPS)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -1,7 +1,18 @@
 import tkinter as tk
-import random
 import math
-from colorsys import hsv_to_rgb
+import time
+import logging
+
+from canvas_pool import CanvasItemPool
+from heart_geometry import heart_point_list
+from frame_scheduler import FixedTimestep
+from quality_governor import QualityGovernor, FULL_QUALITY, apply_tk_quality
+from spatial_grid import SpatialHash
+from frame_profiler import FrameProfiler
+from tk_batch import CanvasBatch
+from color_palette import PALETTE, light_factors
+from random_stream import STREAM
+import tk_falling
 
 # 窗口设置
 WIDTH, HEIGHT = 800, 600
@@ -22,88 +33,144 @@ DEPTH_SCALE = 0.85  # 每层缩小比例
 DEPTH_OPACITY_SCALE = 0.8  # 每层透明度减少比例
 LIGHT_DIRECTION = [0.5, -0.5, 0.7]  # 光源方向 [x, y, z]
 LIGHT_INTENSITY = 1.2  # 光照强度
+LIGHT_FACTORS = light_factors(LIGHT_DIRECTION, LIGHT_INTENSITY)  # 随机表面朝向的光照系数表
+
+# 每个深度层的系数，启动时算好：重力、风力和脉动幅度（深层更小）、
+# 重新出现时的下落速度和鼠标吸引力（深层更小）、角度变化（深层更大）
+LAYER_FORCE_SCALE = tuple(0.9 ** layer for layer in range(DEPTH_LAYERS))
+LAYER_SPEED_SCALE = tuple(0.8 ** layer for layer in range(DEPTH_LAYERS))
+LAYER_ANGLE_SCALE = tuple(1.1 ** layer for layer in range(DEPTH_LAYERS))
+LAYER_ATTRACTION = tuple(0.5 * scale for scale in LAYER_SPEED_SCALE)
+
+# 爱心采样方式：parameter（按参数 t 均匀）或 arc_length（按弧长均匀）
+HEART_SAMPLING = "parameter"
+
+# 模拟频率（每秒 tick 数）
+TICK_RATE = 60
+
+# 自适应画质：帧耗时超出预算时依次去掉外发光、缩小发光半径（仅单图像模式）、减少粒子、减少深度层
+ADAPTIVE_QUALITY = True
+QUALITY_FEATURES = ("outer_glow", "glow_radius", "particle_count", "depth_layers")
+
+# 渲染方式：items（每个粒子两三个画布椭圆）、framebuffer（整帧光栅化为一张图像，需要 numpy）
+# 或 bloom（与 framebuffer 相同，但发光改为整帧一次高斯模糊，见 bloom.py）
+RENDER_MODE = "items"
+
+# 画布元素模式下把每帧的 move / coords 汇总后批量交给 Tcl（见 tk_batch.py）；False 时逐个调用画布方法
+BATCH_CANVAS_UPDATES = True
+
+# 背景粒子数量上限
+MAX_BACKGROUND_PARTICLES = 300
+
+# 性能剖析：P 键开关性能面板；设为文件名（.csv 或 .jsonl）时启动即开启，并把每帧各阶段耗时写入该文件
+PROFILE_TRACE = None
+
+# 鼠标吸引半径
+ATTRACT_RADIUS = 150
+# 未飘落的爱心粒子离锚点（original_x, original_y）的最大距离：脉动幅度 5 * 最大移动距离 3
+ANCHOR_MARGIN = 16
 
 class Particle:
-    def __init__(self, canvas, x, y, is_heart_particle=True, depth_layer=0):
+    # 同时存在约一万个粒子：用 __slots__ 代替每个实例的 __dict__
+    __slots__ = (
+        "canvas", "id", "glow_id", "outer_glow_id",  # 画布和画布元素
+        "x", "y", "original_x", "original_y", "prev_x", "prev_y",  # 位置
+        "is_heart_particle", "depth_layer", "size", "original_size", "rgb", "alpha",  # 外观
+        "angle", "distance", "sin_offset", "pulse_speed", "time",  # 运动参数
+        "fall_speed", "horizontal_speed", "is_falling", "fall_delay", "fall_counter",  # 飘落参数
+        "life", "fade_speed",  # 生命周期
+        "near_mouse", "hidden", "outer_glow_hidden", "has_outer_glow",  # 空间索引和自适应画质的标记
+    )
+    
+    def __init__(self, canvas, x, y, is_heart_particle=True, depth_layer=0, pool=None):
         self.canvas = canvas
         self.x = x
         self.y = y
         self.original_x = x
         self.original_y = y
+        self.prev_x = x  # 上一个 tick 的位置，单图像渲染模式用于插值
+        self.prev_y = y
         self.is_heart_particle = is_heart_particle
         self.depth_layer = depth_layer  # 深度层 (0是最前面)
         
+        # 这个粒子需要的随机数一次从共用的随机数流中取出，再换算到各参数的范围
+        (r_size, r_hue, r_saturation, r_value, r_light, r_angle, r_distance,
+         r_offset, r_pulse, r_time, r_fall, r_delay, r_life, r_fade) = STREAM.take(14)
+        
         # 根据深度层调整大小
-        base_size = random.uniform(MIN_PARTICLE_SIZE, MAX_PARTICLE_SIZE)
+        base_size = MIN_PARTICLE_SIZE + (MAX_PARTICLE_SIZE - MIN_PARTICLE_SIZE) * r_size
         self.size = base_size * (DEPTH_SCALE ** depth_layer)
         self.original_size = self.size
         
         # 使用HSV色彩空间创建蓝色渐变
         if is_heart_particle:
             # 根据深度层调整色相，创造深度感
-            base_hue = random.uniform(0.55, 0.65)  # 基础蓝色范围
+            base_hue = 0.55 + 0.1 * r_hue  # 基础蓝色范围
             hue_shift = 0.03 * depth_layer  # 深度层越深，色相偏移越大
             hue = max(0.5, min(0.7, base_hue - hue_shift))  # 限制在蓝色范围内
             
             # 根据深度层调整饱和度和亮度
-            saturation = random.uniform(0.7, 1.0) * (0.9 ** depth_layer)
-            value = random.uniform(0.7, 1.0) * (0.85 ** depth_layer)
+            saturation = (0.7 + 0.3 * r_saturation) * (0.9 ** depth_layer)
+            value = (0.7 + 0.3 * r_value) * (0.85 ** depth_layer)
             
             # 计算光照效果
             if depth_layer < 2:  # 只对前面的层应用高光
-                # 随机生成粒子的法向量 (模拟表面朝向)
-                nx = random.uniform(-1, 1)
-                ny = random.uniform(-1, 1)
-                nz = random.uniform(0.5, 1)  # 主要朝向观察者
-                
-                # 归一化法向量
-                norm = math.sqrt(nx*nx + ny*ny + nz*nz)
-                nx, ny, nz = nx/norm, ny/norm, nz/norm
-                
-                # 计算光照强度 (法向量与光源方向的点积)
-                light_dot = nx*LIGHT_DIRECTION[0] + ny*LIGHT_DIRECTION[1] + nz*LIGHT_DIRECTION[2]
-                light_factor = max(0.2, min(1.0, 0.5 + light_dot * LIGHT_INTENSITY))
+                # 随机的表面朝向对应的光照系数（预先算好，见 color_palette.light_factors）
+                light_factor = LIGHT_FACTORS[int(r_light * len(LIGHT_FACTORS))]
                 
                 # 应用光照
                 value = min(1.0, value * light_factor)
         else:
             # 背景粒子
-            hue = random.uniform(0.5, 0.7)
-            saturation = random.uniform(0.5, 0.9)
-            value = random.uniform(0.5, 0.9)
+            hue = 0.5 + 0.2 * r_hue
+            saturation = 0.5 + 0.4 * r_saturation
+            value = 0.5 + 0.4 * r_value
         
-        r, g, b = hsv_to_rgb(hue, saturation, value)
+        # 从调色板查出量化后的颜色和共用的Tkinter颜色字符串
+        # 颜色字符串只在创建画布元素时使用，不保存在粒子上
+        self.rgb, color = PALETTE.lookup(hue, saturation, value)  # rgb 供单图像渲染模式使用
         
         # 根据深度层调整透明度
         alpha = int(255 * (DEPTH_OPACITY_SCALE ** depth_layer))
         
-        # 转换为Tkinter颜色格式
-        self.color = f'#{int(r*255):02x}{int(g*255):02x}{int(b*255):02x}'
         self.alpha = alpha  # 存储透明度值用于发光效果
         
         # 运动参数
-        self.angle = random.uniform(0, 2 * math.pi)
-        self.distance = random.uniform(0.8, 3) * (0.9 ** depth_layer)  # 深层粒子移动距离更小
-        self.sin_offset = random.uniform(0, 2 * math.pi)
-        self.pulse_speed = random.uniform(0.02, 0.05) * (1.1 ** depth_layer)  # 深层粒子脉动更快
-        self.time = random.uniform(0, 100)
+        self.angle = 2 * math.pi * r_angle
+        self.distance = (0.8 + 2.2 * r_distance) * (0.9 ** depth_layer)  # 深层粒子移动距离更小
+        self.sin_offset = 2 * math.pi * r_offset
+        self.pulse_speed = (0.02 + 0.03 * r_pulse) * (1.1 ** depth_layer)  # 深层粒子脉动更快
+        self.time = 100 * r_time
         
         # 飘落参数
-        self.fall_speed = random.uniform(0.1, 0.5) * (0.8 ** depth_layer)  # 深层粒子下落更慢
+        self.fall_speed = (0.1 + 0.4 * r_fall) * (0.8 ** depth_layer)  # 深层粒子下落更慢
         self.horizontal_speed = 0
         self.is_falling = False
-        self.fall_delay = random.randint(100, 500)
+        self.fall_delay = 100 + int(401 * r_delay)  # 100 到 500
         self.fall_counter = 0
         
         # 生命周期
-        self.life = random.uniform(0.7, 1.0)
-        self.fade_speed = random.uniform(0.001, 0.003)
+        self.life = 0.7 + 0.3 * r_life
+        self.fade_speed = 0.001 + 0.002 * r_fade
         
-        # 创建粒子
-        self.id = canvas.create_oval(
+        self.near_mouse = True  # 是否可能在鼠标吸引范围内（由空间索引标记）
+        
+        # 为前两层添加额外的发光效果，增强立体感
+        self.hidden = False  # 自适应画质隐藏的粒子
+        self.outer_glow_hidden = False
+        self.has_outer_glow = is_heart_particle and depth_layer < 2
+        
+        # 单图像渲染模式下粒子没有画布元素
+        items = pool if pool is not None else canvas
+        if items is None:
+            self.id = self.glow_id = self.outer_glow_id = None
+            return
+        
+        # 创建粒子（有元素池时优先复用旧的画布元素）
+        self.id = items.create_oval(
             x - self.size, y - self.size,
             x + self.size, y + self.size,
-            fill=self.color, outline=""
+            fill=color, outline=""
         )
         
         # 创建发光效果
@@ -111,37 +178,95 @@ class Particle:
         glow_width = max(0.2, 0.3 * (DEPTH_OPACITY_SCALE ** depth_layer))  # 深层粒子发光轮廓更细
         
         # 创建内发光
-        self.glow_id = canvas.create_oval(
+        self.glow_id = items.create_oval(
             x - glow_size, y - glow_size,
             x + glow_size, y + glow_size,
-            fill="", outline=self.color, width=glow_width
+            fill="", outline=color, width=glow_width
         )
         
-        # 为前两层添加额外的发光效果，增强立体感
-        if is_heart_particle and depth_layer < 2:
+        if self.has_outer_glow:
             outer_glow_size = self.size * 2.0
-            self.outer_glow_id = canvas.create_oval(
+            self.outer_glow_id = items.create_oval(
                 x - outer_glow_size, y - outer_glow_size,
                 x + outer_glow_size, y + outer_glow_size,
-                fill="", outline=self.color, width=0.2
+                fill="", outline=color, width=0.2
             )
         else:
             self.outer_glow_id = None
     
-    def update(self, mouse_x=None, mouse_y=None, attract=False, wind_direction=0):
+    def place_items(self, x, y, size):
+        # 按新的位置和大小放置粒子的画布元素
+        if self.id is None:
+            return
+        
+        self.canvas.coords(
+            self.id,
+            x - size, y - size,
+            x + size, y + size
+        )
+        
+        glow_size = size * (1.3 + 0.1 * self.depth_layer)
+        self.canvas.coords(
+            self.glow_id,
+            x - glow_size, y - glow_size,
+            x + glow_size, y + glow_size
+        )
+        
+        if self.outer_glow_id:
+            outer_glow_size = size * 2.0
+            self.canvas.coords(
+                self.outer_glow_id,
+                x - outer_glow_size, y - outer_glow_size,
+                x + outer_glow_size, y + outer_glow_size
+            )
+    
+    def move_items(self, dx, dy):
+        # 把粒子的画布元素移动 (dx, dy)
+        if self.id is not None:
+            self.canvas.move(self.id, dx, dy)
+            self.canvas.move(self.glow_id, dx, dy)
+            if self.outer_glow_id:
+                self.canvas.move(self.outer_glow_id, dx, dy)
+    
+    def resize_near_mouse(self, x, y, near):
+        # 吸引范围内的粒子变大，离开后逐渐恢复原始大小
+        if near:
+            # 增加粒子大小
+            new_size = min(self.original_size * 1.5, self.original_size + 1)
+            
+            # 更新粒子和发光效果的大小
+            self.place_items(x, y, new_size)
+            
+            self.size = new_size
+        elif self.size > self.original_size:
+            # 恢复原始大小
+            self.size = max(self.size - 0.1, self.original_size)
+            
+            # 更新粒子和发光效果的大小
+            self.place_items(x, y, self.size)
+    
+    # jitter 和 chance 为这个 tick 的两个 [0, 1) 随机数（角度扰动和飘落判定），由调用者批量取出；
+    # 不传入时角度不变、不会开始飘落。返回这个 tick 是否开始飘落
+    def update(self, mouse_x=None, mouse_y=None, attract=False, wind_direction=0, jitter=0.5, chance=1.0):
+        # 记录上一个 tick 的位置
+        self.prev_x = self.x
+        self.prev_y = self.y
+        
         # 更新时间
         self.time += 0.05
         
         # 检查是否开始飘落
+        started = False
         if self.is_heart_particle and not self.is_falling:
             self.fall_counter += 1
-            if self.fall_counter > self.fall_delay and random.random() < 0.002:
-                self.is_falling = True
+            if self.fall_counter > self.fall_delay and chance < 0.002:
+                self.is_falling = started = True
         
         if self.is_falling:
             # 飘落效果
-            self.fall_speed += GRAVITY * (0.9 ** self.depth_layer)  # 深层粒子受重力影响更小
-            self.horizontal_speed += math.cos(wind_direction) * WIND_STRENGTH * (0.9 ** self.depth_layer)
+            force_scale = LAYER_FORCE_SCALE[self.depth_layer]
+            self.fall_speed += GRAVITY * force_scale  # 深层粒子受重力影响更小
+            self.horizontal_speed += math.cos(wind_direction) * WIND_STRENGTH * force_scale
             
             # 更新位置
             new_x = self.x + self.horizontal_speed
@@ -150,9 +275,11 @@ class Particle:
             # 边界检查
             if new_y > HEIGHT + 10:
                 new_y = -10
-                new_x = random.randint(0, WIDTH)
-                self.fall_speed = random.uniform(0.1, 0.5) * (0.8 ** self.depth_layer)
+                new_x = STREAM.randint(0, WIDTH)
+                self.fall_speed = STREAM.uniform(0.1, 0.5) * LAYER_SPEED_SCALE[self.depth_layer]
                 self.horizontal_speed = 0
+                # 从顶部重新出现，不做插值
+                self.prev_x, self.prev_y = new_x, new_y
             
             if new_x < -10:
                 new_x = -10
@@ -165,7 +292,7 @@ class Particle:
             pulse = math.sin(self.time * self.pulse_speed + self.sin_offset) * 5
             
             # 根据深度层调整脉动幅度
-            pulse *= (0.9 ** self.depth_layer)
+            pulse *= LAYER_FORCE_SCALE[self.depth_layer]
             
             # 计算新位置
             new_x = self.original_x + math.cos(self.angle) * self.distance * pulse
@@ -173,131 +300,56 @@ class Particle:
         
         # 鼠标交互 - 吸引或排斥粒子
         if mouse_x is not None and mouse_y is not None and attract:
-            dx = mouse_x - new_x
-            dy = mouse_y - new_y
-            distance = max(math.sqrt(dx*dx + dy*dy), 0.1)
+            # near_mouse 为 False 表示空间索引已判定粒子不在吸引范围内，不必计算距离
+            if self.near_mouse or self.is_falling:
+                dx = mouse_x - new_x
+                dy = mouse_y - new_y
+                distance = max(math.sqrt(dx*dx + dy*dy), 0.1)
+            else:
+                distance = ATTRACT_RADIUS
             
             # 根据深度层调整吸引力
-            attraction_factor = 0.5 * (0.8 ** self.depth_layer)
-            
-            if distance < 150:
-                force = attraction_factor / distance
+            near = distance < ATTRACT_RADIUS
+            if near:
+                force = LAYER_ATTRACTION[self.depth_layer] / distance
                 new_x += dx * force
                 new_y += dy * force
-                
-                # 增加粒子大小
-                new_size = min(self.original_size * 1.5, self.original_size + 1)
-                
-                # 更新粒子大小
-                self.canvas.coords(
-                    self.id,
-                    new_x - new_size, new_y - new_size,
-                    new_x + new_size, new_y + new_size
-                )
-                
-                # 更新发光效果大小
-                glow_size = new_size * (1.3 + 0.1 * self.depth_layer)
-                self.canvas.coords(
-                    self.glow_id,
-                    new_x - glow_size, new_y - glow_size,
-                    new_x + glow_size, new_y + glow_size
-                )
-                
-                # 更新外发光效果
-                if self.outer_glow_id:
-                    outer_glow_size = new_size * 2.0
-                    self.canvas.coords(
-                        self.outer_glow_id,
-                        new_x - outer_glow_size, new_y - outer_glow_size,
-                        new_x + outer_glow_size, new_y + outer_glow_size
-                    )
-                
-                self.size = new_size
-            else:
-                # 恢复原始大小
-                if self.size > self.original_size:
-                    self.size = max(self.size - 0.1, self.original_size)
-                    
-                    # 更新粒子大小
-                    self.canvas.coords(
-                        self.id,
-                        new_x - self.size, new_y - self.size,
-                        new_x + self.size, new_y + self.size
-                    )
-                    
-                    # 更新发光效果大小
-                    glow_size = self.size * (1.3 + 0.1 * self.depth_layer)
-                    self.canvas.coords(
-                        self.glow_id,
-                        new_x - glow_size, new_y - glow_size,
-                        new_x + glow_size, new_y + glow_size
-                    )
-                    
-                    # 更新外发光效果
-                    if self.outer_glow_id:
-                        outer_glow_size = self.size * 2.0
-                        self.canvas.coords(
-                            self.outer_glow_id,
-                            new_x - outer_glow_size, new_y - outer_glow_size,
-                            new_x + outer_glow_size, new_y + outer_glow_size
-                        )
+            self.resize_near_mouse(new_x, new_y, near)
         
         # 计算移动距离
         dx = new_x - self.x
         dy = new_y - self.y
         
         # 更新位置
-        self.canvas.move(self.id, dx, dy)
-        self.canvas.move(self.glow_id, dx, dy)
-        if self.outer_glow_id:
-            self.canvas.move(self.outer_glow_id, dx, dy)
+        self.move_items(dx, dy)
         
         # 更新当前位置
         self.x = new_x
         self.y = new_y
         
         # 随机改变角度
-        self.angle += random.uniform(-0.05, 0.05) * (1.1 ** self.depth_layer)  # 深层粒子角度变化更大
+        self.angle += (jitter - 0.5) * 0.1 * LAYER_ANGLE_SCALE[self.depth_layer]  # 深层粒子角度变化更大
         
         # 更新生命周期
         if not self.is_heart_particle:
             self.life -= self.fade_speed
             if self.life <= 0:
-                self.life = random.uniform(0.7, 1.0)
+                self.life = STREAM.uniform(0.7, 1.0)
                 # 重置位置
-                new_x = random.randint(0, WIDTH)
-                new_y = random.randint(0, HEIGHT)
+                new_x = STREAM.randint(0, WIDTH)
+                new_y = STREAM.randint(0, HEIGHT)
                 
                 # 移动到新位置
-                self.canvas.coords(
-                    self.id,
-                    new_x - self.size, new_y - self.size,
-                    new_x + self.size, new_y + self.size
-                )
+                self.place_items(new_x, new_y, self.size)
                 
-                glow_size = self.size * (1.3 + 0.1 * self.depth_layer)
-                self.canvas.coords(
-                    self.glow_id,
-                    new_x - glow_size, new_y - glow_size,
-                    new_x + glow_size, new_y + glow_size
-                )
-                
-                if self.outer_glow_id:
-                    outer_glow_size = self.size * 2.0
-                    self.canvas.coords(
-                        self.outer_glow_id,
-                        new_x - outer_glow_size, new_y - outer_glow_size,
-                        new_x + outer_glow_size, new_y + outer_glow_size
-                    )
-                
-                self.x = new_x
-                self.y = new_y
+                self.x = self.prev_x = new_x
+                self.y = self.prev_y = new_y
                 self.original_x = new_x
                 self.original_y = new_y
         
-        return True
+        return started
 
-def create_heart_particles(canvas, center_x, center_y, size):
+def create_heart_particles(canvas, center_x, center_y, size, pool=None):
     particles = []
     
     # 创建多层爱心，增加立体感
@@ -312,57 +364,79 @@ def create_heart_particles(canvas, center_x, center_y, size):
         # 减小步长，增加粒子数量
         step = 1 if layer < 2 else 2  # 前两层使用更多粒子
         
-        for t in range(0, 628, step):
-            t = t / 100
-            # 爱心参数方程
-            x = 16 * (math.sin(t) ** 3)
-            y = 13 * math.cos(t) - 5 * math.cos(2*t) - 2 * math.cos(3*t) - math.cos(4*t)
-            
-            # 缩放和定位
-            x = center_x + layer_offset_x + x * layer_size
-            y = center_y + layer_offset_y - y * layer_size  # 注意这里是减号
-            
+        # 缓存的爱心几何表，只做缩放和平移
+        xs, ys = heart_point_list(center_x + layer_offset_x, center_y + layer_offset_y,
+                                  layer_size, step, HEART_SAMPLING)
+        
+        # 每个点的粒子数所需的随机数按层一次取出
+        for x, y, r_count in zip(xs, ys, STREAM.take(len(xs))):
             # 在每个点周围添加多个粒子，使爱心更饱满
             # 前面的层使用更多粒子
-            particle_count = random.randint(2, 5) if layer < 2 else random.randint(1, 3)
+            particle_count = 2 + int(4 * r_count) if layer < 2 else 1 + int(3 * r_count)
             
             for _ in range(particle_count):
                 # 偏移量随深度减小
                 offset_scale = max(0.5, 2 - layer * 0.5)
-                offset_x = random.uniform(-2, 2) * offset_scale
-                offset_y = random.uniform(-2, 2) * offset_scale
+                r_x, r_y = STREAM.take(2)
+                offset_x = (4 * r_x - 2) * offset_scale
+                offset_y = (4 * r_y - 2) * offset_scale
                 
-                particles.append(Particle(canvas, x + offset_x, y + offset_y, True, layer))
+                particles.append(Particle(canvas, x + offset_x, y + offset_y, True, layer, pool))
     
     return particles
 
-def create_background_particles(canvas, count):
+def create_background_particles(canvas, count, pool=None):
     particles = []
     for _ in range(count):
-        x = random.randint(0, WIDTH)
-        y = random.randint(0, HEIGHT)
+        x = STREAM.randint(0, WIDTH)
+        y = STREAM.randint(0, HEIGHT)
         # 随机深度层
-        depth = random.randint(0, DEPTH_LAYERS - 1)
-        particles.append(Particle(canvas, x, y, False, depth))
+        depth = STREAM.randint(0, DEPTH_LAYERS - 1)
+        particles.append(Particle(canvas, x, y, False, depth, pool))
     return particles
 
 class HeartApp:
-    def __init__(self, root):
+    # root 为 None 时不创建窗口，只运行模拟（离线导出时由调用者渲染）
+    def __init__(self, root, start=True, render_mode=RENDER_MODE, batch_updates=BATCH_CANVAS_UPDATES):
         self.root = root
-        self.root.title("立体蓝色粒子爱心")
-        
-        # 设置窗口大小和位置
-        self.root.geometry(f"{WIDTH}x{HEIGHT}")
-        self.root.configure(bg=BACKGROUND_COLOR)
-        
-        # 创建画布
-        self.canvas = tk.Canvas(root, width=WIDTH, height=HEIGHT, bg=BACKGROUND_COLOR, highlightthickness=0)
-        self.canvas.pack(fill="both", expand=True)
+        self.canvas = None
+        if root is not None:
+            self.root.title("立体蓝色粒子爱心")
+            
+            # 设置窗口大小和位置
+            self.root.geometry(f"{WIDTH}x{HEIGHT}")
+            self.root.configure(bg=BACKGROUND_COLOR)
+            
+            # 创建画布
+            self.canvas = tk.Canvas(root, width=WIDTH, height=HEIGHT, bg=BACKGROUND_COLOR, highlightthickness=0)
+            self.canvas.pack(fill="both", expand=True)
+        
+        self.canvas_batch = None
+        if root is None:
+            self.renderer = None
+            self.particle_canvas = None
+            self.pool = None
+        elif render_mode in ("framebuffer", "bloom"):
+            # 单图像渲染：粒子不创建画布元素，每帧光栅化为一张图像
+            from tk_framebuffer import TkFramebufferRenderer, TkBloomRenderer
+            renderer_class = TkBloomRenderer if render_mode == "bloom" else TkFramebufferRenderer
+            self.renderer = renderer_class(self.canvas, WIDTH, HEIGHT)
+            self.particle_canvas = None
+            self.pool = None
+        else:
+            self.renderer = None
+            # 粒子、元素池和自适应画质都通过 CanvasBatch 修改画布元素，每帧批量提交
+            if batch_updates:
+                self.canvas_batch = CanvasBatch(self.canvas)
+            self.particle_canvas = self.canvas_batch or self.canvas
+            # 画布元素池：重新生成爱心时复用旧粒子的画布元素
+            self.pool = CanvasItemPool(self.particle_canvas)
         
         # 创建爱心粒子和背景粒子
-        self.heart_particles = create_heart_particles(self.canvas, WIDTH // 2, HEIGHT // 2, 10)
-        self.background_particles = create_background_particles(self.canvas, 200)
+        self.heart_particles = create_heart_particles(self.particle_canvas, WIDTH // 2, HEIGHT // 2, 10, self.pool)
+        self.background_particles = create_background_particles(self.particle_canvas, 200, self.pool)
         self.all_particles = self.heart_particles + self.background_particles
+        self.active_particles = list(self.all_particles)  # 按当前画质需要更新和显示的粒子
         
         # 心跳参数
         self.heart_beat = 0
@@ -371,24 +445,62 @@ class HeartApp:
         # 风向参数
         self.wind_direction = 0
         
+        # 飘落粒子的批量模拟（见 tk_falling.py，需要 numpy；为 None 时在 Particle.update 中逐个计算）
+        self.falling = None
+        if tk_falling.np is not None:
+            self.falling = tk_falling.FallingParticles(WIDTH, HEIGHT, GRAVITY, WIND_STRENGTH,
+                                                       LAYER_FORCE_SCALE, LAYER_SPEED_SCALE, STREAM)
+        
+        # 背景粒子数量上限
+        self.max_background_particles = MAX_BACKGROUND_PARTICLES
+        
+        # 固定时间步长：模拟按 TICK_RATE 推进，与 after() 的实际间隔无关
+        self.scheduler = FixedTimestep(TICK_RATE)
+        
+        # 空间索引：建在爱心粒子的锚点上，吸引模式下只对鼠标附近的粒子计算距离
+        self.spatial_hash = SpatialHash()
+        self.indexed_particles = None
+        self.near_particles = []
+        
+        # 自适应画质（发光半径只在单图像模式下有效）
+        self.governor = None
+        if ADAPTIVE_QUALITY and root is not None:
+            features = [f for f in QUALITY_FEATURES if self.renderer is not None or f != "glow_radius"]
+            self.governor = QualityGovernor(features, target_fps=TICK_RATE)
+        
         # 鼠标交互
         self.attract_mode = False
         self.mouse_x = None
         self.mouse_y = None
         
+        # 每帧各阶段的耗时统计（默认关闭）
+        self.profiler = FrameProfiler()
+        
+        if root is None:
+            return
+        
         # 绑定事件
         self.canvas.bind("<Button-1>", self.toggle_attract_mode)
         self.canvas.bind("<Motion>", self.track_mouse)
         self.root.bind("<space>", self.regenerate_heart)
         self.root.bind("<KeyPress-f>", self.toggle_fall)
+        self.root.bind("<KeyPress-p>", self.toggle_profiler)
         
         # 创建信息文本
         self.info_text = self.canvas.create_text(
             10, HEIGHT - 20, 
-            text="点击鼠标: 切换吸引模式 | 空格键: 重新生成爱心 | F键: 触发飘落效果", 
+            text="点击鼠标: 切换吸引模式 | 空格键: 重新生成爱心 | F键: 触发飘落效果 | P键: 性能面板", 
             fill="white", anchor="w"
         )
         
+        # 性能面板（右上角，默认隐藏）
+        if PROFILE_TRACE:
+            self.profiler.start_trace(PROFILE_TRACE)
+        self.profiler_text = self.canvas.create_text(
+            WIDTH - 10, 10, text="", fill="white", anchor="ne", justify="left",
+            font=("Courier", 9), state="normal" if self.profiler.enabled else "hidden"
+        )
+        
         self.mode_text = self.canvas.create_text(
             10, 20, 
             text="吸引模式: 关闭", 
@@ -396,7 +508,8 @@ class HeartApp:
         )
         
         # 开始动画
-        self.update()
+        if start:
+            self.update()
     
     def track_mouse(self, event):
         self.mouse_x = event.x
@@ -407,52 +520,160 @@ class HeartApp:
         mode_status = "开启" if self.attract_mode else "关闭"
         self.canvas.itemconfig(self.mode_text, text=f"吸引模式: {mode_status}")
     
+    def toggle_profiler(self, event):
+        enabled = self.profiler.toggle()
+        self.canvas.itemconfigure(self.profiler_text, state="normal" if enabled else "hidden")
+    
+    def apply_quality(self):
+        # 按当前画质重新筛选粒子
+        settings = self.governor.settings if self.governor is not None else FULL_QUALITY
+        self.active_particles = apply_tk_quality(self.particle_canvas, self.all_particles, settings, self.renderer)
+    
+    def mark_near_mouse(self):
+        # 未飘落的爱心粒子只在锚点附近脉动，锚点不变，索引只在爱心重新生成时更新；
+        # 每个 tick 只修改鼠标附近几个格子里粒子的标记。飘落粒子和背景粒子总是直接计算距离
+        heart_particles = self.heart_particles
+        if self.indexed_particles is not heart_particles or len(self.spatial_hash) != len(heart_particles):
+            for particle in heart_particles:
+                particle.near_mouse = False
+            self.spatial_hash.update([p.original_x for p in heart_particles],
+                                     [p.original_y for p in heart_particles])
+            self.indexed_particles = heart_particles
+            self.near_particles = []
+        
+        for particle in self.near_particles:
+            particle.near_mouse = False
+        self.near_particles = [heart_particles[i] for i in self.spatial_hash.candidates(
+            self.mouse_x, self.mouse_y, ATTRACT_RADIUS + ANCHOR_MARGIN)]
+        for particle in self.near_particles:
+            particle.near_mouse = True
+    
     def toggle_fall(self, event):
         # 触发所有爱心粒子开始飘落
-        for particle in self.heart_particles:
-            if random.random() < 0.7:
+        for particle, chance in zip(self.heart_particles, STREAM.take(len(self.heart_particles))):
+            if chance < 0.7:
                 particle.is_falling = True
+        if self.falling is not None:
+            self.falling.invalidate()
     
     def regenerate_heart(self, event):
-        # 删除现有的爱心粒子
-        for particle in self.heart_particles:
-            self.canvas.delete(particle.id)
-            self.canvas.delete(particle.glow_id)
-            if particle.outer_glow_id:
-                self.canvas.delete(particle.outer_glow_id)
-        
-        # 创建新的爱心粒子
-        self.heart_particles = create_heart_particles(self.canvas, WIDTH // 2, HEIGHT // 2, 10)
+        # 把现有爱心粒子的画布元素归还元素池
+        if self.pool is not None:
+            for particle in self.heart_particles:
+                self.pool.release(particle.id, particle.glow_id, particle.outer_glow_id)
+        
+        # 创建新的爱心粒子（复用元素池中的画布元素）
+        self.heart_particles = create_heart_particles(self.particle_canvas, WIDTH // 2, HEIGHT // 2, 10, self.pool)
         self.all_particles = self.heart_particles + self.background_particles
+        self.apply_quality()
+        self.flush_canvas()
     
-    def update(self):
+    def flush_canvas(self):
+        # 把记录下来的画布命令交给 Tcl 执行
+        if self.canvas_batch is not None:
+            self.canvas_batch.flush()
+    
+    def step(self):
         # 爱心跳动效果
         self.heart_beat += 0.03
         self.pulse_factor = 1 + 0.15 * math.sin(self.heart_beat)
         
         # 更新风向
-        self.wind_direction += (random.uniform(-1, 1) * WIND_CHANGE_SPEED)
+        self.wind_direction += (STREAM.uniform(-1, 1) * WIND_CHANGE_SPEED)
         
         # 更新所有粒子
-        for particle in self.all_particles:
-            particle.update(self.mouse_x, self.mouse_y, self.attract_mode, self.wind_direction)
+        if self.attract_mode and self.mouse_x is not None and self.mouse_y is not None:
+            self.mark_near_mouse()
+        # 所有粒子这个 tick 的角度扰动和飘落判定随机数各一次取出
+        particles = self.active_particles
+        count = len(particles)
+        mouse_x, mouse_y, attract, wind = self.mouse_x, self.mouse_y, self.attract_mode, self.wind_direction
+        falling = self.falling
+        if falling is None:
+            for particle, jitter, chance in zip(particles, STREAM.take(count), STREAM.take(count)):
+                particle.update(mouse_x, mouse_y, attract, wind, jitter, chance)
+        else:
+            self.step_falling(particles)
+            # 飘落的粒子已经整体推进，其余粒子逐个更新；这个 tick 刚开始飘落的粒子从下一个 tick 起整体推进
+            started = []
+            for particle, jitter, chance in zip(particles, STREAM.take(count), STREAM.take(count)):
+                if not particle.is_falling and particle.update(mouse_x, mouse_y, attract, wind, jitter, chance):
+                    started.append(particle)
+            falling.add(started)
         
         # 添加一些随机飘动的粒子
-        if random.random() < 0.05 and len(self.background_particles) < 300:
-            x = random.randint(0, WIDTH)
-            y = random.randint(0, HEIGHT)
-            depth = random.randint(0, DEPTH_LAYERS - 1)
-            new_particle = Particle(self.canvas, x, y, False, depth)
+        if STREAM.random() < 0.05 and len(self.background_particles) < self.max_background_particles:
+            x = STREAM.randint(0, WIDTH)
+            y = STREAM.randint(0, HEIGHT)
+            depth = STREAM.randint(0, DEPTH_LAYERS - 1)
+            new_particle = Particle(self.particle_canvas, x, y, False, depth, self.pool)
             self.background_particles.append(new_particle)
             self.all_particles.append(new_particle)
-        
-        # 安排下一次更新
-        self.root.after(16, self.update)
+            if self.governor is not None and self.governor.level:
+                # 降低画质时新粒子同样需要按当前设置筛选
+                self.apply_quality()
+            else:
+                self.active_particles.append(new_particle)
+    
+    def step_falling(self, particles):
+        # 用数组运算推进所有飘落的粒子（重力、风力、回到顶部、左右反弹和鼠标吸引），再移动画布元素
+        falling = self.falling
+        falling.advance(particles, self.wind_direction)
+        attracting = self.attract_mode and self.mouse_x is not None and self.mouse_y is not None
+        if attracting:
+            near = falling.attract(self.mouse_x, self.mouse_y, ATTRACT_RADIUS, LAYER_ATTRACTION)
+        dxs, dys = falling.commit()
+        if attracting:
+            for particle, near_mouse in zip(falling.particles, near):
+                particle.resize_near_mouse(particle.x, particle.y, near_mouse)
+        for particle, dx, dy in zip(falling.particles, dxs, dys):
+            particle.move_items(dx, dy)
+    
+    def update(self):
+        profiler = self.profiler
+        profiler.begin_frame()
+        frame_start = time.perf_counter()
+        
+        # 执行这一帧累积的模拟步数（画布元素模式下元素随每一步移动）
+        with profiler.span("update"):
+            for _ in range(self.scheduler.advance()):
+                self.step()
+        
+        # 单图像渲染模式：整帧光栅化后推送到画布上的一张图像，位置按插值比例插值
+        if self.renderer is not None:
+            with profiler.span("draw"):
+                self.renderer.draw(self.active_particles, self.scheduler.interpolation)
+        
+        if self.canvas_batch is not None:
+            with profiler.span("flush"):
+                self.canvas_batch.flush()
+        
+        # 画布重绘原本在空闲任务中完成；需要测量耗时时在这里完成重绘
+        if self.governor is not None or profiler.enabled:
+            with profiler.span("redraw"):
+                self.root.update_idletasks()
+        
+        # 按这一帧实际的计算和重绘耗时调整画质（显示状态的修改随下一帧一起提交）
+        if self.governor is not None and self.governor.record(time.perf_counter() - frame_start):
+            self.apply_quality()
+        
+        if profiler.enabled:
+            with profiler.span("hud"):
+                self.canvas.itemconfigure(self.profiler_text, text="\n".join(profiler.overlay_lines()))
+            profiler.end_frame({
+                "particles": len(self.active_particles),
+                "canvas_items": profiler.sample("canvas_items", lambda: len(self.canvas.find_all())),
+            })
+        
+        # 在下一个 tick 到期时更新
+        self.root.after(self.scheduler.delay_ms(), self.update)
 
 def main():
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     root = tk.Tk()
     app = HeartApp(root)
     root.mainloop()
+    app.profiler.stop_trace()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
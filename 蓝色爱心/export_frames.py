@@ -0,0 +1,298 @@
+import argparse
+import importlib
+import json
+import math
+import os
+import struct
+import sys
+import time
+import zlib
+
+# 离线导出
+# 不开窗口、不受实时帧率限制地渲染动画，逐帧写入 PNG 序列或原始 RGB 流（可直接交给 ffmpeg），
+# 取代录屏：录屏会录到丢帧，而且很占 CPU。
+# 模拟使用固定的随机种子和固定时间步长（TICK_RATE），与输出帧率无关；
+# 每帧渲染后立即写出，不在内存中保存整段视频。结束时报告渲染吞吐量（帧/秒）。
+#
+#   enhanced_blue_heart     - 不创建窗口，与窗口相同地把轨迹、发光和本体精灵以透明度混合绘制到
+#                             输出分辨率的 Surface 上（位置和半径按输出分辨率缩放，不是放大窗口画面）。
+#                             --blend additive 改为把粒子以加法混合光栅化到帧缓冲再叠加渐变背景：
+#                             重叠的发光会叠加变亮，画面比窗口更亮，但可以用 --workers 多进程渲染
+#   tkinter_blue_heart      - 不创建画布元素，粒子直接光栅化到输出分辨率的帧缓冲（需要 numpy）
+#   enhanced_tkinter_heart  - 同上
+# 光栅化到帧缓冲时都可以用 --workers N 改为多进程分块光栅化（tiled_framebuffer.py），适合 4K 输出。
+#
+# 输出分辨率的宽高比与窗口不同时，按较短的一边缩放，模拟区域相应加宽或加高，画面不会被拉伸。
+
+PYGAME_VARIANTS = ("enhanced_blue_heart",)
+TKINTER_VARIANTS = ("tkinter_blue_heart", "enhanced_tkinter_heart")
+VARIANTS = PYGAME_VARIANTS + TKINTER_VARIANTS
+
+FORMATS = ("png", "raw")
+
+# pygame 版本的混合方式：alpha 与窗口相同（默认），additive 为帧缓冲加法混合
+BLENDS = ("alpha", "additive")
+
+# PNG 的 zlib 压缩级别：级别越高文件越小，但编码更慢
+PNG_COMPRESSION = 3
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def parse_size(text):
+    try:
+        width, height = (int(value) for value in text.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError("分辨率格式应为 宽x高，例如 1920x1080")
+    if width <= 0 or height <= 0:
+        raise argparse.ArgumentTypeError("分辨率必须为正数")
+    return width, height
+
+
+def logical_size(module, width, height):
+    # 模拟区域的尺寸（窗口坐标）和从窗口坐标到输出像素的缩放比例
+    scale = min(width / module.WIDTH, height / module.HEIGHT)
+    return round(width / scale), round(height / scale), scale
+
+
+def tick_schedule(frame, fps, tick_rate):
+    # 第 frame 帧时应完成的 tick 数和插值比例。用整数计算，不累加浮点时间，
+    # 同样的参数每次导出的每一帧都完全相同
+    ticks, remainder = divmod(frame * tick_rate, fps)
+    # 与 FixedTimestep 一样，第一帧渲染前先执行一步
+    return ticks + 1, remainder / fps
+
+
+def encode_png(rgb, width, height, level=PNG_COMPRESSION):
+    # 把 RGB 字节编码为 PNG（8 位真彩色，不使用行过滤）
+    stride = width * 3
+    raw = b"".join(b"\x00" + rgb[row:row + stride] for row in range(0, stride * height, stride))
+
+    def chunk(tag, data):
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header)
+            + chunk(b"IDAT", zlib.compress(raw, level)) + chunk(b"IEND", b""))
+
+
+def create_framebuffer(width, height, workers=0):
+    # 返回 (帧缓冲, 关闭函数)；workers 不为 0 时使用多进程分块光栅化
+    from framebuffer import Framebuffer
+    from tiled_framebuffer import TiledFramebuffer
+
+    if workers:
+        framebuffer = TiledFramebuffer(width, height, workers=workers)
+        return framebuffer, framebuffer.close
+    return Framebuffer(width, height), lambda: None
+
+
+def setup_pygame_variant(name, width, height, seed, workers=0, blend="alpha"):
+    # 不打开窗口：粒子按输出分辨率绘制，不是先按窗口大小绘制精灵再放大
+    # 原始 RGB 流可能写到标准输出，不能混入 pygame 的欢迎信息
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+    import numpy as np
+    import pygame
+    import heart_simulation
+
+    module = importlib.import_module(name)
+    sim_width, sim_height, scale = logical_size(module, width, height)
+    simulation = heart_simulation.EnhancedHeartSimulation(sim_width, sim_height, seed=seed)
+
+    def step():
+        simulation.step()
+
+    if blend == "alpha":
+        # 与窗口相同的渐变色带；GradientBackground.get() 要转换为窗口的像素格式，不开窗口时不能使用
+        gradient_background = module.gradient_background
+        band = gradient_background.band_height
+        rows = np.array([gradient_background.color_at(y - y % band, height) for y in range(height)],
+                        dtype=np.uint8)
+        background = pygame.surfarray.make_surface(np.ascontiguousarray(
+            np.broadcast_to(rows[None, :, :], (width, height, 3))))
+        surface = pygame.Surface((width, height))
+
+        def render(interpolation):
+            # 与窗口的批量绘制相同，只是不画操作提示
+            surface.blit(background, (0, 0))
+            module.draw_particles_batched(simulation.particle_groups, interpolation, surface, scale)
+            return pygame.image.tostring(surface, "RGB")
+
+        return step, render, lambda: None
+
+    framebuffer, close = create_framebuffer(width, height, workers)
+    # 渐变背景逐行的颜色，加法叠加到粒子上（超出 255 时截断）
+    gradient = np.array([module.gradient_background.color_at(y, height) for y in range(height)],
+                        dtype=np.uint16)[:, None, :]
+
+    def render(interpolation):
+        # 只画背景和粒子，不画操作提示
+        for particles in simulation.particle_groups:
+            module.add_particle_discs(framebuffer, particles, interpolation, scale)
+        image = np.minimum(framebuffer.render() + gradient, 255).astype(np.uint8)
+        return image.tobytes()
+
+    return step, render, close
+
+
+def setup_tkinter_variant(name, width, height, seed, workers=0):
+    import random_stream
+    from tk_framebuffer import add_particles
+
+    module = importlib.import_module(name)
+    sim_width, sim_height, scale = logical_size(module, width, height)
+    module.WIDTH, module.HEIGHT = sim_width, sim_height
+    random_stream.seed(seed)
+    if name == "tkinter_blue_heart":
+        # 飘落粒子的批量模拟按修改后的 WIDTH、HEIGHT 创建（与 main() 相同）
+        module.falling = module.create_falling()
+    framebuffer, close = create_framebuffer(width, height, workers)
+
+    if name == "tkinter_blue_heart":
+        particles = module.create_heart_particles(None, sim_width // 2, sim_height // 2, 10)
+        wind_direction = 0
+
+        def step():
+            nonlocal wind_direction
+            wind_direction = module.step_particles(particles, wind_direction)
+
+        def current_particles():
+            return particles
+    else:
+        app = module.HeartApp(None)
+        step = app.step
+
+        def current_particles():
+            return app.active_particles
+
+    def render(interpolation):
+        add_particles(framebuffer, current_particles(), interpolation, scale=scale)
+        return framebuffer.render().tobytes()
+
+    return step, render, close
+
+
+class FrameWriter:
+    # 逐帧写出：PNG 序列写入目录，原始 RGB 追加到文件或标准输出（"-"）
+    def __init__(self, output, output_format, width, height):
+        self.format = output_format
+        self.width = width
+        self.height = height
+        self.frames = 0
+        self.bytes = 0
+        self.stream = None
+        if output_format == "png":
+            os.makedirs(output, exist_ok=True)
+            self.directory = output
+        elif output == "-":
+            self.stream = sys.stdout.buffer
+        else:
+            self.stream = open(output, "wb")
+
+    def write(self, rgb):
+        if self.format == "png":
+            data = encode_png(rgb, self.width, self.height)
+            with open(os.path.join(self.directory, f"frame_{self.frames:05d}.png"), "wb") as f:
+                f.write(data)
+        else:
+            data = rgb
+            self.stream.write(data)
+        self.frames += 1
+        self.bytes += len(data)
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.flush()
+            if self.stream is not sys.stdout.buffer:
+                self.stream.close()
+
+
+def export(name, output, output_format, width, height, fps, frames, seed, workers=0, blend="alpha"):
+    if SCRIPT_DIR not in sys.path:
+        sys.path.insert(0, SCRIPT_DIR)
+
+    if name in PYGAME_VARIANTS:
+        step, render, close = setup_pygame_variant(name, width, height, seed, workers, blend)
+    else:
+        step, render, close = setup_tkinter_variant(name, width, height, seed, workers)
+    tick_rate = importlib.import_module(name).TICK_RATE
+
+    writer = FrameWriter(output, output_format, width, height)
+    timings = {"simulate": 0.0, "render": 0.0, "write": 0.0}
+    clock = time.perf_counter
+    ticks_done = 0
+    start = clock()
+    try:
+        for frame in range(frames):
+            t0 = clock()
+            ticks, interpolation = tick_schedule(frame, fps, tick_rate)
+            for _ in range(ticks - ticks_done):
+                step()
+            ticks_done = ticks
+            t1 = clock()
+            rgb = render(interpolation)
+            t2 = clock()
+            writer.write(rgb)
+            t3 = clock()
+            timings["simulate"] += t1 - t0
+            timings["render"] += t2 - t1
+            timings["write"] += t3 - t2
+    finally:
+        writer.close()
+        close()
+    wall_time = clock() - start
+
+    return {
+        "variant": name,
+        "format": output_format,
+        "output": output,
+        "size": f"{width}x{height}",
+        "fps": fps,
+        "seed": seed,
+        "workers": workers,
+        "blend": blend if name in PYGAME_VARIANTS else "additive",
+        "frames": writer.frames,
+        "ticks": ticks_done,
+        "bytes_written": writer.bytes,
+        "wall_time_s": wall_time,
+        "render_fps": writer.frames / wall_time if wall_time else 0.0,
+        # 各阶段每帧平均耗时
+        "stage_ms": {stage: total * 1000 / max(writer.frames, 1) for stage, total in timings.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="蓝色爱心离线导出（PNG 序列或原始 RGB 流）")
+    parser.add_argument("variant", choices=VARIANTS, help="要导出的版本")
+    parser.add_argument("--output", "-o", required=True,
+                        help="png 格式为输出目录；raw 格式为输出文件，\"-\" 表示标准输出")
+    parser.add_argument("--format", choices=FORMATS, default="png", help="输出格式")
+    parser.add_argument("--size", type=parse_size, default=(800, 600), help="输出分辨率，例如 1920x1080")
+    parser.add_argument("--fps", type=int, default=60, help="输出帧率")
+    parser.add_argument("--seconds", type=float, default=10.0, help="导出时长（秒）")
+    parser.add_argument("--frames", type=int, help="导出帧数（指定后忽略 --seconds）")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="多进程分块光栅化的进程数，0 表示在当前进程中渲染")
+    parser.add_argument("--blend", choices=BLENDS, default="alpha",
+                        help="enhanced_blue_heart 的混合方式：alpha 与窗口相同，additive 为帧缓冲加法混合"
+                             "（tkinter 版本总是光栅化到帧缓冲）")
+    args = parser.parse_args()
+    if args.fps <= 0:
+        parser.error("--fps 必须为正数")
+    if args.workers and args.variant in PYGAME_VARIANTS and args.blend == "alpha":
+        parser.error("--workers 只用于光栅化到帧缓冲，enhanced_blue_heart 需要同时指定 --blend additive")
+    frames = args.frames if args.frames is not None else math.ceil(args.seconds * args.fps)
+
+    width, height = args.size
+    if args.format == "raw":
+        print(f"ffmpeg -f rawvideo -pix_fmt rgb24 -s {width}x{height} -r {args.fps} -i {args.output} out.mp4",
+              file=sys.stderr)
+    report = export(args.variant, args.output, args.format, width, height, args.fps, frames, args.seed,
+                    args.workers, args.blend)
+    # 标准输出可能是视频流，报告写到标准错误
+    print(json.dumps(report, indent=2, ensure_ascii=False), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,189 @@
+import csv
+import json
+import os
+import time
+from collections import deque
+
+# 每帧性能剖析
+# 主循环的各个阶段用 `with profiler.span("名字"):` 包起来，记录每帧各阶段的耗时，
+# 以及粒子数、新建 Surface 数、画布元素数等计数。开启后：
+#   - 各阶段最近 WINDOW 帧的平均耗时由前端显示在性能面板上（overlay_lines）
+#   - start_trace() 把每一帧的数据写入 CSV 或 JSONL 文件，供离线分析。JSONL 每帧一行；
+#     CSV 为长格式，每帧每项一行 (frame, time_s, name, value)：中途才出现的阶段和计数也能写入
+# 关闭时 span() 返回同一个空的上下文管理器，不读时钟、不分配对象，每个阶段只多一次方法调用。
+
+# 滚动平均的帧数，也是代价较高的计数（sample）的更新间隔
+WINDOW = 60
+
+# 性能面板中计数的显示名称（pygame 的默认字体没有中文字形，面板只用英文）
+COUNTER_LABELS = {
+    "particles": "particles",
+    "surfaces": "new surfaces",
+    "canvas_items": "canvas items",
+    "occupancy": "pool occupancy",
+    "spawned": "spawned/frame",
+    "evicted": "evicted/frame",
+}
+
+
+class NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+class Span:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = self.profiler.clock()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.profiler.add(self.name, self.profiler.clock() - self.start)
+        return False
+
+
+class FrameProfiler:
+    def __init__(self, enabled=False, window=WINDOW, clock=time.perf_counter):
+        self.enabled = enabled
+        self.window = window
+        self.clock = clock
+        self.frame_start = None
+        self.stages = {}  # 当前帧各阶段的耗时（秒），同一阶段多次进入时累加
+        self.history = {}  # 阶段名 -> 最近 window 帧的耗时（毫秒），按第一次出现的顺序
+        self.frame_times = deque(maxlen=window)
+        self.counters = {}  # 最近一帧的计数
+        self._totals = {}  # 累计计数的上一次取值（用于按帧求差）
+        self._samples = {}  # 代价较高的计数：名字 -> (上次更新的帧号, 值)
+        self.frames = 0
+
+        # 逐帧记录文件
+        self.trace_path = None
+        self._trace_file = None
+        self._trace_writer = None
+        self.trace_rows = 0
+
+    def span(self, name):
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name)
+
+    def add(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        # 重新开启时从新的一帧开始统计
+        self.frame_start = None
+        self.stages = {}
+        return self.enabled
+
+    def begin_frame(self):
+        if self.enabled:
+            self.frame_start = self.clock()
+
+    def delta(self, name, total):
+        # 把累计计数（例如精灵缓存未命中次数）换算为这一帧的增量
+        previous = self._totals.get(name, total)
+        self._totals[name] = total
+        return total - previous
+
+    def sample(self, name, function):
+        # 每 window 帧调用一次 function 更新计数，其余帧沿用上次的值
+        sampled = self._samples.get(name)
+        if sampled is None or self.frames - sampled[0] >= self.window:
+            sampled = (self.frames, function())
+            self._samples[name] = sampled
+        return sampled[1]
+
+    def end_frame(self, counters=None):
+        # 结束一帧：记录各阶段耗时和计数，写入逐帧记录文件
+        if not self.enabled or self.frame_start is None:
+            return
+        frame_ms = (self.clock() - self.frame_start) * 1000
+        self.frame_times.append(frame_ms)
+        stages_ms = {}
+        for name, seconds in self.stages.items():
+            history = self.history.get(name)
+            if history is None:
+                history = self.history[name] = deque(maxlen=self.window)
+            history.append(seconds * 1000)
+            stages_ms[name] = seconds * 1000
+        self.stages = {}
+        self.counters = counters or {}
+        self.frames += 1
+        if self._trace_file is not None:
+            self._write_trace(frame_ms, stages_ms)
+
+    def averages(self):
+        # 各阶段最近 window 帧的平均耗时（毫秒）
+        return {name: sum(history) / len(history) for name, history in self.history.items() if history}
+
+    def mean_frame_ms(self):
+        return sum(self.frame_times) / len(self.frame_times) if self.frame_times else 0.0
+
+    def overlay_lines(self):
+        # 性能面板的文字，每行一项
+        frame_ms = self.mean_frame_ms()
+        fps = 1000 / frame_ms if frame_ms else 0.0
+        lines = [f"frame {frame_ms:6.2f} ms  ({fps:.0f} fps busy)"]
+        for name, ms in self.averages().items():
+            lines.append(f"{name:<12}{ms:6.2f} ms")
+        for name, value in self.counters.items():
+            lines.append(f"{COUNTER_LABELS.get(name, name)}: {value}")
+        if self._trace_file is not None:
+            lines.append(f"trace: {os.path.basename(self.trace_path)} ({self.trace_rows} rows)")
+        return lines
+
+    def start_trace(self, path):
+        # 按扩展名选择格式：.csv 为 CSV，其余为 JSONL（每行一个 JSON 对象）。记录期间剖析保持开启
+        self.stop_trace()
+        if not self.enabled:
+            self.toggle()
+        self.trace_path = path
+        self._trace_file = open(path, "w", encoding="utf-8", newline="")
+        self._trace_writer = None
+        if path.lower().endswith(".csv"):
+            self._trace_writer = csv.writer(self._trace_file)
+            self._trace_writer.writerow(("frame", "time_s", "name", "value"))
+        self.trace_rows = 0
+
+    def _write_trace(self, frame_ms, stages_ms):
+        row = {"frame": self.frames, "time_s": round(self.clock(), 6), "frame_ms": round(frame_ms, 4)}
+        for name, ms in stages_ms.items():
+            row[name + "_ms"] = round(ms, 4)
+        row.update(self.counters)
+        if self._trace_writer is not None:
+            frame = row.pop("frame")
+            time_s = row.pop("time_s")
+            self._trace_writer.writerows((frame, time_s, name, value) for name, value in row.items())
+        else:
+            self._trace_file.write(json.dumps(row) + "\n")
+        self.trace_rows += 1
+
+    def stop_trace(self):
+        if self._trace_file is not None:
+            self._trace_file.close()
+            self._trace_file = None
+            self._trace_writer = None
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "frames": self.frames,
+            "mean_frame_ms": self.mean_frame_ms(),
+            "stages_ms": self.averages(),
+            "trace_rows": self.trace_rows,
+        }
\ No newline at end of file
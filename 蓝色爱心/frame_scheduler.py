@@ -0,0 +1,81 @@
+import time
+
+# 固定时间步长调度器
+# 模拟按固定的 tick 频率推进，与渲染帧率无关：每帧把经过的真实时间放进累加器，
+# 累加器里攒够多少个 tick 就执行多少次模拟步骤，剩余的零头作为插值比例，
+# 渲染时在上一次和本次模拟状态之间插值。机器变慢时动画速度保持不变，只是帧数减少；
+# 落后太多时丢弃多余的 tick，避免越追越慢（“死亡螺旋”）。
+#
+# 各版本的运动参数（时间增量、重力等）都是按每个 tick 设计的，默认 60 tick/秒与原来的速度相同。
+
+TICK_RATE = 60
+
+# 单帧最多补跑的 tick 数，超出的部分计为丢弃
+MAX_TICKS_PER_FRAME = 5
+
+# 两帧间隔超过 tick 间隔的多少倍算作延迟帧
+LATE_FRAME_FACTOR = 1.5
+
+
+class FixedTimestep:
+    def __init__(self, tick_rate=TICK_RATE, max_ticks_per_frame=MAX_TICKS_PER_FRAME,
+                 clock=time.perf_counter):
+        self.tick_rate = tick_rate
+        self.dt = 1.0 / tick_rate
+        self.max_ticks_per_frame = max_ticks_per_frame
+        self.clock = clock
+        self.reset()
+
+    def reset(self):
+        self.accumulator = 0.0
+        self.last_time = None
+
+        # 统计信息
+        self.frames = 0
+        self.ticks = 0
+        self.dropped_ticks = 0  # 因落后太多而丢弃的 tick
+        self.late_frames = 0  # 帧间隔明显超过 tick 间隔的帧
+
+    def advance(self, now=None):
+        # 开始新的一帧，返回这一帧需要执行的模拟步数
+        if now is None:
+            now = self.clock()
+        if self.last_time is None:
+            # 第一帧执行一步，保证渲染前已有模拟状态
+            self.last_time = now
+            self.frames += 1
+            self.ticks += 1
+            return 1
+        elapsed = now - self.last_time
+        self.last_time = now
+        self.frames += 1
+        if elapsed > self.dt * LATE_FRAME_FACTOR:
+            self.late_frames += 1
+
+        self.accumulator += elapsed
+        ticks = int(self.accumulator / self.dt)
+        self.accumulator -= ticks * self.dt
+        if ticks > self.max_ticks_per_frame:
+            self.dropped_ticks += ticks - self.max_ticks_per_frame
+            ticks = self.max_ticks_per_frame
+        self.ticks += ticks
+        return ticks
+
+    @property
+    def interpolation(self):
+        # 渲染插值比例：0 为上一次模拟状态，1 为最新状态
+        return min(self.accumulator / self.dt, 1.0)
+
+    def delay_ms(self):
+        # 距离下一个 tick 的毫秒数，供 tkinter 的 after() 使用。
+        # 按累加器计算而不是固定 16 毫秒，帧超时后不会一直累积漂移
+        return max(1, int((self.dt - self.accumulator) * 1000))
+
+    def stats(self):
+        return {
+            "tick_rate": self.tick_rate,
+            "frames": self.frames,
+            "ticks": self.ticks,
+            "dropped_ticks": self.dropped_ticks,
+            "late_frames": self.late_frames,
+        }
\ No newline at end of file
@@ -0,0 +1,98 @@
+import math
+
+import numpy as np
+
+# 单图像帧缓冲
+# 把所有粒子和发光效果光栅化到同一块 RGB 缓冲区，每帧只输出一张图像。
+# 圆点按量化后的半径分组，同一组共用一个预先计算好的抗锯齿“印章”，
+# 整帧的像素累加只用三次 np.bincount 完成（加法混合），
+# 开销随像素数和粒子覆盖面积增长，与画布元素数量无关。
+
+
+def make_stamp(radius):
+    # 半径为 radius 的抗锯齿圆：返回像素偏移 (dy, dx) 和覆盖率
+    reach = stamp_reach(radius)
+    dy, dx = np.mgrid[-reach:reach + 1, -reach:reach + 1]
+    coverage = np.clip(radius + 0.5 - np.hypot(dx, dy), 0.0, 1.0)
+    keep = coverage > 0
+    return dy[keep], dx[keep], coverage[keep].astype(np.float32)
+
+
+def stamp_reach(radius):
+    # 印章覆盖的最大像素偏移
+    return int(math.ceil(radius + 0.5))
+
+
+class Framebuffer:
+    def __init__(self, width, height, background=(0, 0, 0), radius_step=0.25):
+        self.width = width
+        self.height = height
+        self.background = np.asarray(background, dtype=np.float32)
+        self.radius_step = radius_step  # 半径量化步长（像素）
+        self._stamps = {}
+        self._indices = []
+        self._weights = []
+
+    def _stamp(self, key):
+        # 半径为 key * radius_step 的抗锯齿圆：返回像素偏移和覆盖率
+        stamp = self._stamps.get(key)
+        if stamp is None:
+            stamp = make_stamp(max(key * self.radius_step, 0.5))
+            self._stamps[key] = stamp
+        return stamp
+
+    def add_discs(self, xs, ys, radii, colors, intensities):
+        # 加入一批实心圆；colors 为 0-255 的 RGB，intensities 为 0-1 的不透明度
+        xs = np.asarray(xs, dtype=np.float64)
+        if len(xs) == 0:
+            return
+        ys = np.asarray(ys, dtype=np.float64)
+        radii = np.asarray(radii, dtype=np.float64)
+        colors = np.asarray(colors, dtype=np.float32).reshape(-1, 3)
+        intensities = np.broadcast_to(np.asarray(intensities, dtype=np.float32), xs.shape)
+
+        keys = np.rint(radii / self.radius_step).astype(np.int64)
+        px = np.rint(xs).astype(np.int64)
+        py = np.rint(ys).astype(np.int64)
+        # 每个粒子的 RGB 权重
+        rgb = colors * intensities[:, None]
+
+        for key in np.unique(keys).tolist():
+            selected = np.flatnonzero(keys == key)
+            dy, dx, coverage = self._stamp(key)
+            rows = py[selected, None] + dy[None, :]
+            cols = px[selected, None] + dx[None, :]
+            valid = (rows >= 0) & (rows < self.height) & (cols >= 0) & (cols < self.width)
+            self._indices.append((rows * self.width + cols)[valid])
+            self._weights.append((rgb[selected, None, :] * coverage[None, :, None])[valid])
+
+    def accumulate(self, planes):
+        # 把待绘制的圆加法混合到 planes（(3, height, width) 的 float32 数组，每个通道连续存放）
+        # 并清空待绘制列表；泛光合成（bloom.py）在此基础上再叠加发光
+        flat = planes.reshape(3, -1)
+        if self._indices:
+            indices = np.concatenate(self._indices)
+            weights = np.concatenate(self._weights)
+            for channel in range(3):
+                flat[channel] += np.bincount(indices, weights[:, channel], minlength=flat.shape[1])
+        self._indices = []
+        self._weights = []
+
+    def render(self):
+        # 合成当前帧并清空待绘制列表，返回 (height, width, 3) 的 uint8 数组
+        size = self.width * self.height
+        image = np.empty((size, 3), dtype=np.float32)
+        image[:] = self.background
+        if self._indices:
+            indices = np.concatenate(self._indices)
+            weights = np.concatenate(self._weights)
+            for channel in range(3):
+                image[:, channel] += np.bincount(indices, weights[:, channel], minlength=size)
+        self._indices = []
+        self._weights = []
+        return np.clip(image, 0, 255).astype(np.uint8).reshape(self.height, self.width, 3)
+
+    def render_ppm(self):
+        # 以二进制 PPM（P6）格式输出，tkinter 的 PhotoImage 可以直接读取
+        header = f"P6 {self.width} {self.height} 255\n".encode("ascii")
+        return header + self.render().tobytes()
\ No newline at end of file
@@ -0,0 +1,181 @@
+import heapq
+import math
+from bisect import bisect_left
+from functools import lru_cache
+
+try:
+    import numpy as np
+except ImportError:  # tkinter 版本可以不安装 numpy，此时退回纯 Python 列表
+    np = None
+
+# 爱心曲线几何表
+# 单位爱心（未缩放、未平移）的坐标在每种分辨率下只计算一次并缓存，
+# 之后每一层、每一种大小只需要做一次缩放和平移。
+#
+# 采样方式：
+#   parameter  - 与原来的循环相同，t = k / 100，k = 0, step, 2*step, ... < 628
+#   arc_length - 点数相同，但沿曲线按弧长均匀分布。按 t 均匀采样时，
+#                点会挤在顶部凹口附近，浪费粒子预算
+#
+# 补充粒子（每次只加几个）不需要整颗爱心：把曲线按弧长分成 ARC_SEGMENTS 段，
+# 统计现有粒子落在各段的数量，sparse_heart_points() 按需逐个产生最稀疏那几段上的点，
+# 取多少个就只计算多少个点（需要 numpy）。
+# 爱心曲线相对中心是星形的（从中心看去极角随 t 单调增加），所以粒子属于哪一段、
+# 离曲线多远，只需要按它相对中心的极角查一张预先算好的表，不需要逐段计算距离
+
+SAMPLING_MODES = ("parameter", "arc_length")
+
+# 原循环的参数范围：t 从 0 到 6.28，步长 0.01
+T_SCALE = 100
+T_STEPS = 628
+
+# 计算弧长时使用的密集采样点数
+ARC_TABLE_SAMPLES = 4096
+
+# 补充粒子时按弧长划分的段数
+ARC_SEGMENTS = 64
+
+# 离曲线超过此距离（单位爱心坐标）的粒子不计入任何一段，例如随机飘动的粒子
+SEGMENT_REACH = 2.0
+
+# 按极角查表的分档数
+ANGLE_BINS = 1024
+
+
+# 爱心参数方程
+def heart_xy(t):
+    x = 16 * (math.sin(t) ** 3)
+    y = 13 * math.cos(t) - 5 * math.cos(2*t) - 2 * math.cos(3*t) - math.cos(4*t)
+    return x, y
+
+
+@lru_cache(maxsize=None)
+def arc_length_table():
+    # 返回 (参数 t 列表, 从 t=0 开始的累计弧长列表, 总弧长)
+    ts = [2 * math.pi * i / ARC_TABLE_SAMPLES for i in range(ARC_TABLE_SAMPLES + 1)]
+    lengths = [0.0]
+    prev_x, prev_y = heart_xy(0)
+    for t in ts[1:]:
+        x, y = heart_xy(t)
+        lengths.append(lengths[-1] + math.hypot(x - prev_x, y - prev_y))
+        prev_x, prev_y = x, y
+    return ts, lengths, lengths[-1]
+
+
+def arc_length_parameter(fraction):
+    # 弧长比例 fraction（0 到 1）处的参数 t
+    ts, lengths, total = arc_length_table()
+    target = fraction * total
+    j = max(1, bisect_left(lengths, target))
+    # 在相邻两个表项之间线性插值
+    span = lengths[j] - lengths[j - 1]
+    frac = (target - lengths[j - 1]) / span if span else 0.0
+    return ts[j - 1] + (ts[j] - ts[j - 1]) * frac
+
+
+def arc_length_parameters(count, start=0.0, end=1.0):
+    # 在弧长比例 [start, end) 上均匀取 count 个点，返回对应的参数 t
+    return [arc_length_parameter(start + (end - start) * i / count) for i in range(count)]
+
+
+def sample_parameters(step=1, sampling="parameter"):
+    count = len(range(0, T_STEPS, step))
+    if sampling == "parameter":
+        return [k / T_SCALE for k in range(0, T_STEPS, step)]
+    if sampling == "arc_length":
+        return arc_length_parameters(count)
+    raise ValueError(f"未知的采样方式: {sampling}")
+
+
+def unit_points(ts):
+    # heart_xy 的 NumPy 版本
+    xs = 16 * np.sin(ts) ** 3
+    ys = 13 * np.cos(ts) - 5 * np.cos(2*ts) - 2 * np.cos(3*ts) - np.cos(4*ts)
+    return xs, ys
+
+
+@lru_cache(maxsize=None)
+def unit_heart(step=1, sampling="parameter"):
+    # 单位爱心坐标表（只读）；安装了 numpy 时为数组，否则为元组
+    ts = sample_parameters(step, sampling)
+    if np is None:
+        points = [heart_xy(t) for t in ts]
+        return tuple(x for x, _ in points), tuple(y for _, y in points)
+
+    xs, ys = unit_points(np.array(ts))
+    xs.setflags(write=False)
+    ys.setflags(write=False)
+    return xs, ys
+
+
+def heart_points(center_x, center_y, size, step=1, sampling="parameter"):
+    # 缩放和定位（屏幕坐标系 y 轴向下，所以 y 用减号）
+    unit_xs, unit_ys = unit_heart(step, sampling)
+    if np is None:
+        return ([center_x + x * size for x in unit_xs],
+                [center_y - y * size for y in unit_ys])
+    return center_x + unit_xs * size, center_y - unit_ys * size
+
+
+def heart_point_list(center_x, center_y, size, step=1, sampling="parameter"):
+    # 与 heart_points 相同，但总是返回 Python 列表，便于逐点创建粒子
+    xs, ys = heart_points(center_x, center_y, size, step, sampling)
+    if np is None:
+        return xs, ys
+    return xs.tolist(), ys.tolist()
+
+
+def polar_angles(unit_xs, unit_ys):
+    # 相对中心的极角：从正上方（t = 0 的凹口）开始顺时针为正，范围 (0, 2π]。
+    # 转半圈再加 π，避免对整个数组取模
+    return np.arctan2(-unit_xs, -unit_ys) + math.pi
+
+
+@lru_cache(maxsize=None)
+def arc_segments(segments=ARC_SEGMENTS, angle_bins=ANGLE_BINS):
+    # 返回 (各段起止的参数 t（长度 segments + 1）, 每个极角档所属的段, 每个极角档处曲线的半径)
+    ts, _, _ = arc_length_table()
+    curve_xs, curve_ys = unit_points(np.array(ts))
+    curve_angles = polar_angles(curve_xs, curve_ys)
+    curve_angles[0] = 0.0  # t = 0 的极角记为 0，t = 2π 回到起点时记为 2π
+    curve_radii = np.hypot(curve_xs, curve_ys)
+
+    bounds = np.array(arc_length_parameters(segments) + [2 * math.pi])
+    bin_angles = (np.arange(angle_bins) + 0.5) * (2 * math.pi / angle_bins)
+    bin_segments = np.searchsorted(bounds, np.interp(bin_angles, curve_angles, ts), side="right") - 1
+    bin_radii = np.interp(bin_angles, curve_angles, curve_radii)
+    for array in (bounds, bin_segments, bin_radii):
+        array.setflags(write=False)
+    return bounds, bin_segments, bin_radii
+
+
+def arc_segment_counts(xs, ys, center_x, center_y, size, segments=ARC_SEGMENTS):
+    # 按极角把粒子归入各段，返回各段的粒子数
+    _, bin_segments, bin_radii = arc_segments(segments)
+    unit_xs = (np.asarray(xs) - center_x) / size
+    unit_ys = (center_y - np.asarray(ys)) / size
+    bins = (polar_angles(unit_xs, unit_ys) * (len(bin_radii) / (2 * math.pi))).astype(np.intp)
+    np.minimum(bins, len(bin_radii) - 1, out=bins)  # 极角恰好为 2π 的粒子归入最后一档
+    near = np.abs(np.hypot(unit_xs, unit_ys) - bin_radii[bins]) <= SEGMENT_REACH
+    return np.bincount(bin_segments[bins[near]], minlength=segments)
+
+
+def sparse_arc_parameters(counts, rng):
+    # 惰性地逐个产生参数 t：每次取当前粒子最少的一段，在段内按弧长均匀地随机取一点，并把该段计数加一，
+    # 所以连续取出的点依次落在最稀疏的几段上。粒子数相同的段按随机顺序轮流。
+    # 段内不能按 t 均匀取点：顶部凹口附近 t 变化很快而弧长很短，点会挤在段的一端
+    segments = len(counts)
+    # 按 (粒子数, 随机次序, 段号) 建堆，每取一个点只调整一次堆顶
+    heap = list(zip(np.asarray(counts).tolist(), rng.random(len(counts)).tolist(), range(len(counts))))
+    heapq.heapify(heap)
+    while True:
+        count, order, i = heap[0]
+        heapq.heapreplace(heap, (count + 1, order, i))
+        yield arc_length_parameter((i + rng.random()) / segments)
+
+
+def sparse_heart_points(counts, center_x, center_y, size, rng):
+    # 惰性地逐个产生最稀疏几段上的屏幕坐标 (x, y)
+    for t in sparse_arc_parameters(counts, rng):
+        x, y = heart_xy(t)
+        yield center_x + x * size, center_y - y * size
\ No newline at end of file
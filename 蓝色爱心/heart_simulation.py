@@ -0,0 +1,301 @@
+import math
+import random
+from itertools import islice
+
+import numpy as np
+
+from color_palette import PALETTE
+from heart_geometry import arc_segment_counts, heart_points, sparse_heart_points
+from particle_engine import ParticleArrays
+
+# 爱心粒子模拟核心
+# 只包含爱心采样、粒子状态和每帧的更新步骤，不依赖 pygame，导入时没有任何副作用。
+# 可以被 pygame 窗口、基准测试、性能分析器或其他前端直接驱动。
+
+# 默认画布大小
+WIDTH, HEIGHT = 800, 600
+
+# 爱心采样方式：parameter（按参数 t 均匀）或 arc_length（按弧长均匀）
+HEART_SAMPLING = "parameter"
+
+# 粒子池满时的淘汰策略：oldest（淘汰最旧的粒子）或 lowest_life（淘汰生命值最低的粒子）
+EVICTION_POLICY = "oldest"
+
+# 在粒子最稀疏的几段爱心曲线上补充 count 个粒子的位置，只计算实际添加的点
+def refill_heart_positions(particles, count, center_x, center_y, size, jitter, rng):
+    n = len(particles)
+    counts = arc_segment_counts(particles.original_x[:n], particles.original_y[:n], center_x, center_y, size)
+    points = np.array(list(islice(sparse_heart_points(counts, center_x, center_y, size, rng), count)))
+    xs, ys = points.reshape(-1, 2).T
+    return xs + rng.uniform(-jitter, jitter, count), ys + rng.uniform(-jitter, jitter, count)
+
+
+# 基础版颜色定义
+BLUE_LIGHT = (100, 180, 255)
+BLUE_MEDIUM = (50, 120, 220)
+BLUE_DARK = (20, 80, 180)
+
+
+class BasicHeartSimulation:
+    # 粒子数量上限（其中随机飘动的粒子最多 MAX_DRIFT_PARTICLES 个）
+    MAX_PARTICLES = 800
+    MAX_DRIFT_PARTICLES = 80
+
+    # 画质恢复后每个 tick 补回的爱心粒子数
+    RESTORE_BATCH = 5
+
+    # 粒子颜色表
+    PARTICLE_COLORS = np.array([BLUE_LIGHT, BLUE_MEDIUM, BLUE_DARK], dtype=np.uint8)
+
+    def __init__(self, width=WIDTH, height=HEIGHT, seed=None, particle_count=None,
+                 sampling=HEART_SAMPLING):
+        self.width = width
+        self.height = height
+        self.sampling = sampling
+        self.reset(seed, particle_count)
+
+    # 重置动画；seed 固定随机数，particle_count 固定粒子数量（用于基准测试）
+    def reset(self, seed=None, particle_count=None):
+        self.random = random.Random(seed)
+        self.rng = np.random.default_rng(seed)
+        self.heart_beat = 0
+        self.max_particles = particle_count or self.MAX_PARTICLES
+        self.max_drift_particles = self.max_particles * self.MAX_DRIFT_PARTICLES // self.MAX_PARTICLES
+        self.max_heart_particles = self.max_particles - self.max_drift_particles
+        self.particle_scale = 1.0  # 自适应画质可以临时降低粒子上限
+        # 降低粒子上限前的爱心粒子数；上限恢复后分批补回，否则只靠少于 500 个时的随机补充，爱心会一直变稀
+        self.restore_heart_count = 0
+
+        # 创建爱心粒子。随机飘动的粒子放在单独的粒子池里，池满时淘汰的是最旧的飘动粒子，不会挤掉爱心粒子
+        self.heart_particles = ParticleArrays(angle_jitter=0.05, seed=self.rng, limit=self.max_heart_particles,
+                                              eviction=EVICTION_POLICY)
+        self.spawn_particles(self.heart_particles, *self.create_heart_particles(10))
+        self.drift_particles = ParticleArrays(angle_jitter=0.05, seed=self.rng, limit=self.max_drift_particles,
+                                              eviction=EVICTION_POLICY)
+
+        # 固定粒子数量时一次填满
+        if particle_count:
+            while len(self.heart_particles) < self.max_heart_particles:
+                xs, ys = self.create_heart_particles(10)
+                needed = self.max_heart_particles - len(self.heart_particles)
+                self.spawn_particles(self.heart_particles, xs[:needed], ys[:needed])
+            count = self.max_drift_particles
+            self.spawn_particles(self.drift_particles, self.rng.uniform(0, self.width, count),
+                                 self.rng.uniform(0, self.height, count))
+
+    @property
+    def particle_groups(self):
+        return (self.heart_particles, self.drift_particles)
+
+    def __len__(self):
+        return len(self.heart_particles) + len(self.drift_particles)
+
+    # 各粒子池的占用率和生成、淘汰统计
+    def stats(self):
+        return {"heart": self.heart_particles.stats(), "drift": self.drift_particles.stats()}
+
+    # 批量生成粒子，所有粒子状态保存在 ParticleArrays 中
+    def spawn_particles(self, particles, xs, ys):
+        n = len(xs)
+        rng = particles.rng
+        particles.spawn(
+            xs, ys,
+            size=rng.integers(2, 6, n),
+            color=self.PARTICLE_COLORS[rng.integers(0, len(self.PARTICLE_COLORS), n)],
+            angle=rng.uniform(0, 2 * math.pi, n),
+            distance=rng.integers(1, 4, n),
+            sin_offset=rng.uniform(0, 2 * math.pi, n),
+            pulse_speed=rng.uniform(0.02, 0.05, n),
+        )
+
+    # 创建爱心形状的粒子位置
+    def create_heart_particles(self, size):
+        # 缓存的爱心几何表，步长为0.02
+        xs, ys = heart_points(self.width // 2, self.height // 2, size, step=2, sampling=self.sampling)
+
+        # 在每个点周围添加多个粒子，使爱心更饱满
+        counts = self.rng.integers(1, 4, len(xs))
+        total = counts.sum()
+        xs = np.repeat(xs, counts) + self.rng.uniform(-5, 5, total)
+        ys = np.repeat(ys, counts) + self.rng.uniform(-5, 5, total)
+        return xs, ys
+
+    # 更新一帧的粒子状态
+    def step(self):
+        # 爱心跳动效果
+        self.heart_beat += 0.03
+        pulse_factor = 1 + 0.1 * math.sin(self.heart_beat)
+
+        # 粒子数量上限（池满后新粒子按淘汰策略替换旧粒子）
+        heart_limit = int(self.max_heart_particles * self.particle_scale)
+        if heart_limit < len(self.heart_particles):
+            self.restore_heart_count = max(self.restore_heart_count, len(self.heart_particles))
+        self.heart_particles.set_limit(heart_limit)
+        self.drift_particles.set_limit(int(self.max_drift_particles * self.particle_scale))
+
+        # 上限恢复后把降级时淘汰的爱心粒子分批补回
+        missing = min(self.restore_heart_count, heart_limit) - len(self.heart_particles)
+        if missing > 0:
+            count = min(missing, self.RESTORE_BATCH)
+            xs, ys = refill_heart_positions(self.heart_particles, count, self.width // 2, self.height // 2,
+                                            10 * pulse_factor, 5, self.rng)
+            self.spawn_particles(self.heart_particles, xs, ys)
+        elif self.restore_heart_count and heart_limit >= self.restore_heart_count:
+            self.restore_heart_count = 0
+
+        # 更新爱心大小
+        if len(self.heart_particles) < 500 and self.random.random() < 0.1:
+            # 每次只添加几个粒子，避免突然变化；补在粒子最稀疏的位置
+            xs, ys = refill_heart_positions(self.heart_particles, 5, self.width // 2, self.height // 2,
+                                            10 * pulse_factor, 5, self.rng)
+            self.spawn_particles(self.heart_particles, xs, ys)
+
+        # 更新所有粒子（每组粒子一次向量化更新）
+        for particles in self.particle_groups:
+            particles.update()
+
+        # 添加一些随机飘动的粒子
+        if self.random.random() < 0.1:
+            x = self.random.randint(0, self.width)
+            y = self.random.randint(0, self.height)
+            self.spawn_particles(self.drift_particles, [x], [y])
+
+
+class EnhancedHeartSimulation:
+    # 粒子数量上限
+    MAX_HEART_PARTICLES = 1000
+    MAX_BACKGROUND_PARTICLES = 200
+
+    def __init__(self, width=WIDTH, height=HEIGHT, seed=None, particle_count=None,
+                 sampling=HEART_SAMPLING):
+        self.width = width
+        self.height = height
+        self.sampling = sampling
+        self.reset(seed, particle_count)
+
+    # 重置动画；seed 固定随机数，particle_count 固定粒子数量（用于基准测试）
+    def reset(self, seed=None, particle_count=None):
+        self.random = random.Random(seed)
+        self.rng = np.random.default_rng(seed)
+        self.heart_beat = 0
+        self.particle_scale = 1.0  # 自适应画质可以临时降低粒子上限
+
+        if particle_count:
+            # 按默认上限的比例分配爱心粒子和背景粒子
+            self.max_background_particles = particle_count * self.MAX_BACKGROUND_PARTICLES // (
+                self.MAX_HEART_PARTICLES + self.MAX_BACKGROUND_PARTICLES)
+            self.max_heart_particles = particle_count - self.max_background_particles
+        else:
+            self.max_heart_particles = self.MAX_HEART_PARTICLES
+            self.max_background_particles = self.MAX_BACKGROUND_PARTICLES
+
+        # 创建爱心粒子和背景粒子
+        self.heart_particles = self.new_particle_arrays(self.max_heart_particles)
+        self.spawn_particles(self.heart_particles, *self.create_heart_particles(10, 1.5))
+        self.background_particles = self.new_particle_arrays(self.max_background_particles)
+        self.spawn_particles(self.background_particles, *self.create_background_particles(100))
+
+        if particle_count:
+            # 一次填满
+            self.fill_heart_particles(self.heart_particles, self.max_heart_particles)
+            needed = self.max_background_particles - len(self.background_particles)
+            self.spawn_particles(self.background_particles, *self.create_background_particles(needed))
+
+    @property
+    def particle_groups(self):
+        return (self.background_particles, self.heart_particles)
+
+    def __len__(self):
+        return len(self.heart_particles) + len(self.background_particles)
+
+    # 各粒子池的占用率和生成、淘汰统计
+    def stats(self):
+        return {"heart": self.heart_particles.stats(), "background": self.background_particles.stats()}
+
+    # 粒子存储；limit 为粒子池的上限，None 时不限数量
+    def new_particle_arrays(self, limit=None):
+        return ParticleArrays(capacity=1024, angle_jitter=0.03, track_trails=True, seed=self.rng,
+                              limit=limit, eviction=EVICTION_POLICY)
+
+    # 批量生成粒子，所有粒子状态保存在 ParticleArrays 中
+    def spawn_particles(self, particles, xs, ys):
+        n = len(xs)
+        rng = particles.rng
+        # 使用HSV色彩空间创建更丰富的蓝色渐变
+        hues = rng.uniform(0.55, 0.65, n)  # 蓝色范围的色相
+        saturations = rng.uniform(0.7, 1.0, n)
+        values = rng.uniform(0.7, 1.0, n)
+        colors = PALETTE.rgb_array()[PALETTE.indices(hues, saturations, values)]  # 预先计算的调色板
+        particles.spawn(
+            xs, ys,
+            size=rng.uniform(1.5, 4.5, n),
+            color=colors,
+            alpha=rng.integers(150, 256, n),
+            angle=rng.uniform(0, 2 * math.pi, n),
+            distance=rng.uniform(1, 4, n),
+            sin_offset=rng.uniform(0, 2 * math.pi, n),
+            pulse_speed=rng.uniform(0.01, 0.04, n),
+            time=rng.uniform(0, 100, n),  # 随机初始时间使粒子不同步
+            # 粒子生命周期
+            life=rng.uniform(0.7, 1.0, n),
+            fade_speed=rng.uniform(0.001, 0.005, n),
+            # 轨迹点
+            trail_length=rng.integers(3, 9, n),
+        )
+
+    # 创建爱心形状的粒子位置
+    def create_heart_particles(self, size, density=1):
+        step = max(1, int(3 / density))  # 根据密度调整步长
+        xs, ys = heart_points(self.width // 2, self.height // 2, size, step=step, sampling=self.sampling)
+
+        # 在每个点周围添加多个粒子，使爱心更饱满
+        counts = self.rng.integers(1, int(2 * density) + 1, len(xs))
+        total = counts.sum()
+        xs = np.repeat(xs, counts) + self.rng.uniform(-3, 3, total) * density
+        ys = np.repeat(ys, counts) + self.rng.uniform(-3, 3, total) * density
+        return xs, ys
+
+    # 创建背景粒子位置
+    def create_background_particles(self, count):
+        xs = [self.random.randint(0, self.width) for _ in range(count)]
+        ys = [self.random.randint(0, self.height) for _ in range(count)]
+        return xs, ys
+
+    # 用爱心形状的粒子填满到 count 个
+    def fill_heart_particles(self, particles, count):
+        while len(particles) < count:
+            xs, ys = self.create_heart_particles(10, 1.5)
+            needed = count - len(particles)
+            self.spawn_particles(particles, xs[:needed], ys[:needed])
+
+    # 重新生成爱心（清空并复用原来的粒子池）
+    def regenerate_heart(self):
+        self.heart_particles.clear()
+        self.spawn_particles(self.heart_particles, *self.create_heart_particles(10, 1.5))
+
+    # 更新一帧的粒子状态
+    def step(self, mouse_pos=None, attract=False):
+        # 爱心跳动效果
+        self.heart_beat += 0.03
+        pulse_factor = 1 + 0.15 * math.sin(self.heart_beat)
+
+        # 粒子数量上限（池满后新粒子按淘汰策略替换旧粒子）
+        self.heart_particles.set_limit(int(self.max_heart_particles * self.particle_scale))
+        self.background_particles.set_limit(int(self.max_background_particles * self.particle_scale))
+
+        # 更新爱心大小
+        if self.random.random() < 0.05:
+            # 每次只添加几个粒子，补在粒子最稀疏的位置（抖动幅度与 density=0.5 的 create_heart_particles 相同）
+            xs, ys = refill_heart_positions(self.heart_particles, 10, self.width // 2, self.height // 2,
+                                            10 * pulse_factor, 1.5, self.rng)
+            self.spawn_particles(self.heart_particles, xs, ys)
+
+        # 更新所有粒子（每组粒子一次向量化更新）
+        for particles in self.particle_groups:
+            particles.update(mouse_pos, attract)
+
+        # 添加一些随机飘动的粒子
+        if self.random.random() < 0.05:
+            x = self.random.randint(0, self.width)
+            y = self.random.randint(0, self.height)
+            self.spawn_particles(self.background_particles, [x], [y])
\ No newline at end of file
@@ -0,0 +1,349 @@
+import numpy as np
+
+
+# 粒子引擎：以结构数组（SoA）保存所有粒子状态
+# 每个属性都是一段连续的 NumPy 数组，一帧只做一次向量化计算，
+# 取代逐个调用 Particle.update() 的 Python 循环。两个 pygame 版本共用。
+#
+# 设定 limit 时 ParticleArrays 是一个固定容量的粒子池：数组按 limit 预先分配，
+# 存活的粒子始终是前 count 个槽位，其后的槽位就是空闲链表（按顺序取用，不需要单独的链表）。
+# 池满后新生成的粒子按淘汰策略（最旧的或生命值最低的）直接写入被淘汰粒子的槽位，
+# 其他粒子不移动、不复制，遍历顺序保持不变。只有调低 limit 时才把末尾的粒子移入空出的槽位。
+
+# 浮点属性
+FLOAT_FIELDS = (
+    "x", "y", "original_x", "original_y",
+    "prev_x", "prev_y",  # 上一次更新前的位置，用于渲染插值
+    "angle", "distance", "sin_offset", "pulse_speed", "time",
+    "life", "fade_speed", "size", "original_size",
+)
+
+# 整数属性（born 为生成时的序号，用于按新旧淘汰）
+INT_FIELDS = ("alpha", "trail_length", "born")
+
+# 粒子池满时的淘汰策略
+EVICTION_POLICIES = ("oldest", "lowest_life")
+
+# 轨迹：环形缓冲区的长度（轨迹点数上限）和坐标类型
+MAX_TRAIL = 8
+TRAIL_DTYPE = np.float32
+
+# 鼠标吸引参数
+ATTRACT_RADIUS = 150
+ATTRACT_STRENGTH = 0.5
+
+
+class ParticleArrays:
+    def __init__(self, capacity=1024, angle_jitter=0.05, time_step=0.05,
+                 max_size_boost=2, track_trails=False, max_trail=MAX_TRAIL, seed=None,
+                 limit=None, eviction="oldest"):
+        if eviction not in EVICTION_POLICIES:
+            raise ValueError(f"未知的淘汰策略: {eviction}")
+        # limit 为存活粒子上限，None 表示不限（容量不足时扩容）；有上限时按上限预先分配
+        self.limit = limit
+        self.eviction = eviction
+        self.capacity = max(1, int(capacity if limit is None else limit))
+        self.count = 0
+        self.angle_jitter = angle_jitter  # 每帧角度随机扰动幅度
+        self.time_step = time_step  # 每帧时间增量
+        self.max_size_boost = max_size_boost  # 吸引时粒子最大增大量
+        self.track_trails = track_trails
+        self.max_trail = max_trail
+        self.rng = np.random.default_rng(seed)
+
+        for name in FLOAT_FIELDS:
+            setattr(self, name, np.zeros(self.capacity, dtype=np.float64))
+        for name in INT_FIELDS:
+            setattr(self, name, np.zeros(self.capacity, dtype=np.int32))
+        self.color = np.zeros((self.capacity, 3), dtype=np.uint8)
+
+        # 统计信息
+        self.spawned = 0  # 累计生成的粒子数，也是下一个粒子的序号
+        self.evicted = 0  # 累计淘汰的粒子数
+        self.updates = 0
+
+        # 轨迹点：所有粒子共用一块 (粒子数, max_trail, 2) 的环形缓冲区，
+        # trail_head 为每个粒子下一次写入的位置，trail_count 为有效轨迹点数。
+        # 每帧写入是一次向量化赋值，不再对每个粒子的列表 append/pop(0)
+        if track_trails:
+            # 按写入头排好顺序的下标表：_trail_order[head] 从最旧到最新
+            slots = np.arange(max_trail, dtype=np.intp)
+            self._trail_order = (slots[None, :] + slots[:, None]) % max_trail
+            self._allocate_trails()
+
+    def _allocate_trails(self):
+        # 分配（扩容时重新分配）轨迹缓冲区，保留已有粒子的轨迹
+        n = self.count
+        points = np.zeros((self.capacity, self.max_trail, 2), dtype=TRAIL_DTYPE)
+        head = np.zeros(self.capacity, dtype=np.intp)  # 与下标同类型，读取时不需要转换
+        count = np.zeros(self.capacity, dtype=np.int32)
+        if n:
+            points[:n] = self.trail_points[:n]
+            head[:n] = self.trail_head[:n]
+            count[:n] = self.trail_count[:n]
+        self.trail_points = points
+        self.trail_head = head
+        self.trail_count = count
+
+        # 按顺序读取轨迹时使用的缓冲区，读取时不再分配内存
+        self._trail_rows = (np.arange(self.capacity, dtype=np.intp) * self.max_trail)[:, None]
+        self._trail_index = np.zeros((self.capacity, self.max_trail), dtype=np.intp)
+        self._trail_ordered = np.zeros((self.capacity, self.max_trail, 2), dtype=TRAIL_DTYPE)
+
+    def __len__(self):
+        return self.count
+
+    def _grow(self, needed):
+        new_capacity = self.capacity
+        while new_capacity < needed:
+            new_capacity *= 2
+
+        for name in FLOAT_FIELDS + INT_FIELDS + ("color",):
+            old = getattr(self, name)
+            new = np.zeros((new_capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+        self.capacity = new_capacity
+        if self.track_trails:
+            self._allocate_trails()
+
+    def spawn(self, xs, ys, **fields):
+        # 生成一批粒子；fields 中的值可以是标量或与 xs 等长的数组。
+        # 先占用空闲槽位，池满后按淘汰策略覆盖已有粒子的槽位
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+        n = len(xs)
+        if n == 0:
+            return
+        limit = self.limit
+        if limit is not None and n > limit:
+            # 一批就超过上限时只保留最后 limit 个，其余视为生成后立即淘汰
+            first = n - limit
+            xs = xs[first:]
+            ys = ys[first:]
+            fields = {name: value if np.ndim(value) == 0 else value[first:] for name, value in fields.items()}
+            self.spawned += first
+            self.evicted += first
+            n = limit
+
+        start = self.count
+        end = start + n if limit is None else min(start + n, limit)
+        if end > self.capacity:
+            self._grow(end)
+        if end - start == n:
+            slots = slice(start, end)
+        else:
+            replaced = n - (end - start)
+            slots = np.concatenate((np.arange(start, end), self._victims(replaced)))
+            self.evicted += replaced
+
+        self.x[slots] = xs
+        self.y[slots] = ys
+        self.original_x[slots] = xs
+        self.original_y[slots] = ys
+        self.prev_x[slots] = xs
+        self.prev_y[slots] = ys
+
+        # 默认值：不衰减的粒子生命恒为 1
+        self.life[slots] = 1.0
+        self.fade_speed[slots] = 0.0
+        self.time[slots] = 0.0
+        self.alpha[slots] = 255
+        self.trail_length[slots] = 0
+        self.born[slots] = self.spawned  # 同一批粒子序号相同
+
+        for name, value in fields.items():
+            getattr(self, name)[slots] = value
+
+        if "original_size" not in fields:
+            self.original_size[slots] = self.size[slots]
+
+        if self.track_trails:
+            self.trail_head[slots] = 0
+            self.trail_count[slots] = 0
+
+        self.count = end
+        self.spawned += n
+
+    def _victims(self, k):
+        # 按淘汰策略选出 k 个要淘汰的存活粒子的槽位
+        n = self.count
+        key = self.born[:n] if self.eviction == "oldest" else self.life[:n]
+        if k >= n:
+            return np.arange(n)
+        return np.argpartition(key, k - 1)[:k]
+
+    def set_limit(self, limit):
+        # 调整存活粒子上限（例如自适应画质减少粒子）；超出的粒子按淘汰策略移除
+        self.limit = limit
+        if limit is None:
+            return
+        if limit > self.capacity:
+            self._grow(limit)
+        excess = self.count - limit
+        if excess > 0:
+            self._remove(self._victims(excess))
+            self.evicted += excess
+
+    def _remove(self, victims):
+        # 移除一批粒子：末尾存活的粒子移入前面空出的槽位，存活粒子仍然是前 count 个
+        n = self.count
+        keep = n - len(victims)
+        holes = victims[victims < keep]
+        tail = np.arange(keep, n)
+        movers = tail[~np.isin(tail, victims)]
+        names = FLOAT_FIELDS + INT_FIELDS + ("color",)
+        if self.track_trails:
+            names += ("trail_points", "trail_head", "trail_count")
+        for name in names:
+            array = getattr(self, name)
+            array[holes] = array[movers]
+        self.count = keep
+
+    def clear(self):
+        # 移除所有粒子，保留已分配的数组
+        self.count = 0
+
+    def stats(self):
+        updates = max(self.updates, 1)
+        return {
+            "capacity": self.capacity,
+            "limit": self.limit,
+            "live": self.count,
+            "occupancy": self.count / (self.limit or self.capacity),
+            "spawned": self.spawned,
+            "evicted": self.evicted,
+            "spawn_rate": self.spawned / updates,  # 每次 update 平均生成的粒子数
+            "evict_rate": self.evicted / updates,
+        }
+
+    def update(self, mouse_pos=None, attract=False):
+        self.updates += 1
+        n = self.count
+        if n == 0:
+            return
+
+        x = self.x[:n]
+        y = self.y[:n]
+        angle = self.angle[:n]
+        self.prev_x[:n] = x
+        self.prev_y[:n] = y
+
+        # 更新时间
+        time = self.time[:n]
+        time += self.time_step
+
+        # 基础脉动
+        pulse = np.sin(time * self.pulse_speed[:n] + self.sin_offset[:n]) * 5
+        pulse *= self.distance[:n]
+
+        # 计算新位置
+        np.multiply(np.cos(angle), pulse, out=x)
+        x += self.original_x[:n]
+        np.multiply(np.sin(angle), pulse, out=y)
+        y += self.original_y[:n]
+
+        # 鼠标交互 - 吸引鼠标附近的粒子
+        if mouse_pos and attract:
+            self._attract(mouse_pos)
+
+        # 随机改变角度，使运动更自然
+        angle += self.rng.uniform(-self.angle_jitter, self.angle_jitter, n)
+
+        # 更新粒子生命周期
+        life = self.life[:n]
+        life -= self.fade_speed[:n]
+        dead = np.flatnonzero(life <= 0)
+        if len(dead):
+            life[dead] = self.rng.uniform(0.7, 1.0, len(dead))
+            # 重置位置
+            self.original_x[dead] += self.rng.uniform(-1, 1, len(dead))
+            self.original_y[dead] += self.rng.uniform(-1, 1, len(dead))
+
+        if self.track_trails:
+            self._record_trails()
+
+    def positions(self, interpolation=1.0):
+        # 渲染位置：在上一次和本次更新的位置之间按 interpolation 插值
+        n = self.count
+        if interpolation >= 1.0:
+            return self.x[:n], self.y[:n]
+        prev_x = self.prev_x[:n]
+        prev_y = self.prev_y[:n]
+        return (prev_x + (self.x[:n] - prev_x) * interpolation,
+                prev_y + (self.y[:n] - prev_y) * interpolation)
+
+    def _attract(self, mouse_pos):
+        n = self.count
+        x = self.x[:n]
+        y = self.y[:n]
+        size = self.size[:n]
+        original_size = self.original_size[:n]
+
+        # 每个 tick 只有这一次查询，而所有粒子每个 tick 都在移动：重建空间索引比向量化地
+        # 计算全部距离更慢（1k 到 100k 个粒子都是如此，见 benchmark.py --spatial），因此这里直接扫描
+        dx = mouse_pos[0] - x
+        dy = mouse_pos[1] - y
+        distance = np.hypot(dx, dy)
+        near = np.flatnonzero(distance < ATTRACT_RADIUS)
+
+        # 所有粒子逐渐恢复原始大小，靠近鼠标的粒子随后变大
+        np.maximum(size - 0.1, original_size, out=size)
+        if len(near) == 0:
+            return
+
+        force = ATTRACT_STRENGTH / np.maximum(distance[near], 0.1)
+        x[near] += dx[near] * force
+        y[near] += dy[near] * force
+
+        near_size = original_size[near]
+        size[near] = np.minimum(near_size * 1.5, near_size + self.max_size_boost)
+
+    def _record_trails(self):
+        # 添加轨迹点：在每个粒子的写入头处写入当前位置，写入头前移一格
+        n = self.count
+        head = self.trail_head[:n]
+        points = self.trail_points.reshape(-1, 2)
+        index = self._trail_rows[:n, 0] + head
+        points[index, 0] = self.x[:n]
+        points[index, 1] = self.y[:n]
+        head += 1
+        head %= self.max_trail
+
+        # 有效点数不超过每个粒子自己的轨迹长度
+        count = self.trail_count[:n]
+        count += 1
+        np.minimum(count, self.trail_length[:n], out=count)
+
+    def ordered_trails(self):
+        # 按时间顺序读取轨迹，返回 (points, counts)。
+        # points[i] 从最旧到最新排列且向右对齐：粒子 i 的有效轨迹点为 points[i, max_trail - counts[i]:]。
+        # 结果写入预先分配的缓冲区，下一次调用时会被覆盖
+        n = self.count
+        index = self._trail_index[:n]
+        np.take(self._trail_order, self.trail_head[:n], axis=0, out=index, mode="clip")
+        index += self._trail_rows[:n]
+        ordered = self._trail_ordered[:n]
+        np.take(self.trail_points.reshape(-1, 2), index, axis=0, out=ordered, mode="clip")
+        return ordered, self.trail_count[:n]
+
+    def trail_memory(self):
+        # 轨迹存储占用的内存：坐标、写入头和点数三部分（不含读取缓冲区）
+        if not self.track_trails:
+            return {"bytes": 0, "bytes_per_point": 0.0}
+        total = self.trail_points.nbytes + self.trail_head.nbytes + self.trail_count.nbytes
+        return {
+            "bytes": total,
+            "bytes_per_point": total / (self.capacity * self.max_trail),
+        }
+
+
+def pool_totals(pools):
+    # 多个粒子池合计的占用率和累计生成、淘汰数（性能面板使用）
+    live = sum(pool.count for pool in pools)
+    limit = sum(pool.limit or pool.capacity for pool in pools)
+    return {
+        "occupancy": live / limit if limit else 0.0,
+        "spawned": sum(pool.spawned for pool in pools),
+        "evicted": sum(pool.evicted for pool in pools),
+    }
\ No newline at end of file
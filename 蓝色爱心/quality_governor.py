@@ -0,0 +1,163 @@
+import logging
+from collections import deque
+
+# 自适应画质
+# 根据实测的每帧耗时沿固定的阶梯逐级降低或恢复画质，让慢机器保持帧率：
+#   轨迹长度 -> 外发光 -> 发光半径 -> 粒子数量 -> 深度层数
+# 降级和升级使用不同的阈值（滞后），升级前还要连续一段时间足够快；
+# 刚升级就又降级时，下一次升级的等待时间加倍，避免画质来回跳动。
+# 每次等级变化都会写入日志。
+
+logger = logging.getLogger("quality")
+
+# 最高画质
+FULL_QUALITY = {
+    "trail_scale": 1.0,  # 轨迹长度比例
+    "outer_glow": True,  # 是否绘制外发光
+    "glow_scale": 1.0,  # 发光半径比例
+    "particle_scale": 1.0,  # 粒子数量比例
+    "depth_layers": None,  # 显示的深度层数，None 表示全部
+}
+
+# 降级阶梯：每一级在上一级的基础上再降低一项
+QUALITY_STEPS = (
+    ("trail_length", {"trail_scale": 0.5}),
+    ("outer_glow", {"outer_glow": False}),
+    ("glow_radius", {"glow_scale": 0.6}),
+    ("particle_count", {"particle_scale": 0.6}),
+    ("depth_layers", {"depth_layers": 3}),
+)
+
+# 降级阈值：平均帧耗时超过预算的倍数
+DOWNGRADE_RATIO = 1.2
+# 升级阈值：平均帧耗时低于预算的倍数
+UPGRADE_RATIO = 0.7
+
+
+def build_levels(features=None):
+    # 按阶梯生成各级画质；features 为前端支持的项目，不支持的项目直接跳过
+    levels = [("full", dict(FULL_QUALITY))]
+    for name, changes in QUALITY_STEPS:
+        if features is not None and name not in features:
+            continue
+        settings = dict(levels[-1][1])
+        settings.update(changes)
+        levels.append((name, settings))
+    return levels
+
+
+class QualityGovernor:
+    def __init__(self, features=None, target_fps=60, window=30, upgrade_frames=120,
+                 max_upgrade_frames=1920):
+        self.levels = build_levels(features)
+        self.level = 0
+        self.budget = 1.0 / target_fps  # 每帧的时间预算（秒）
+        self.samples = deque(maxlen=window)
+        self.sample_sum = 0.0
+        self.upgrade_frames = upgrade_frames  # 升级前需要连续达标的帧数
+        self.max_upgrade_frames = max_upgrade_frames
+        self.good_frames = 0
+
+        # 统计信息
+        self.frames = 0
+        self.changes = 0
+        self.last_change = None  # "down" 或 "up"
+        self.last_change_frame = 0
+
+    @property
+    def settings(self):
+        return self.levels[self.level][1]
+
+    @property
+    def level_name(self):
+        return self.levels[self.level][0]
+
+    @property
+    def mean_frame_time(self):
+        return self.sample_sum / len(self.samples) if self.samples else 0.0
+
+    def record(self, frame_time):
+        # 记录一帧的耗时（秒）；画质等级发生变化时返回 True
+        if len(self.samples) == self.samples.maxlen:
+            self.sample_sum -= self.samples[0]
+        self.samples.append(frame_time)
+        self.sample_sum += frame_time
+        self.frames += 1
+        if len(self.samples) < self.samples.maxlen:
+            return False
+
+        mean = self.mean_frame_time
+        if mean > self.budget * DOWNGRADE_RATIO:
+            self.good_frames = 0
+            if self.level < len(self.levels) - 1:
+                # 刚升级就撑不住：说明升级太早，延长下一次升级前的等待
+                if self.last_change == "up" and self.frames - self.last_change_frame < self.upgrade_frames:
+                    self.upgrade_frames = min(self.upgrade_frames * 2, self.max_upgrade_frames)
+                self._change(self.level + 1, "down", mean)
+                return True
+        elif mean < self.budget * UPGRADE_RATIO:
+            self.good_frames += 1
+            if self.level > 0 and self.good_frames >= self.upgrade_frames:
+                self._change(self.level - 1, "up", mean)
+                return True
+        else:
+            self.good_frames = 0
+        return False
+
+    def _change(self, level, direction, mean):
+        logger.info("画质等级 %d -> %d（%s），平均帧耗时 %.1f ms，预算 %.1f ms",
+                    self.level, level, self.levels[level][0], mean * 1000, self.budget * 1000)
+        self.level = level
+        self.changes += 1
+        self.last_change = direction
+        self.last_change_frame = self.frames
+        self.good_frames = 0
+        # 新等级重新开始测量
+        self.samples.clear()
+        self.sample_sum = 0.0
+
+    def stats(self):
+        return {
+            "level": self.level,
+            "level_name": self.level_name,
+            "changes": self.changes,
+            "mean_frame_ms": self.mean_frame_time * 1000,
+            "upgrade_frames": self.upgrade_frames,
+        }
+
+
+# tkinter 版本：按画质设置筛选要更新和显示的粒子
+# 粒子数量按黄金分割序列均匀抽取，不消耗随机数；被隐藏的粒子不再更新，
+# 画布元素也保持原位，恢复显示时位置仍然正确。返回需要更新的粒子列表。
+GOLDEN_RATIO_CONJUGATE = 0.6180339887498949
+
+
+def apply_tk_quality(canvas, particles, settings, renderer=None):
+    depth_layers = settings["depth_layers"]
+    particle_scale = settings["particle_scale"]
+    outer_glow = settings["outer_glow"]
+    active = []
+    for i, particle in enumerate(particles):
+        visible = ((depth_layers is None or particle.depth_layer < depth_layers)
+                   and (i * GOLDEN_RATIO_CONJUGATE) % 1.0 < particle_scale)
+        if visible:
+            active.append(particle)
+
+        # 只修改状态发生变化的画布元素
+        if particle.id is None:
+            continue
+        if particle.hidden == visible:
+            state = "normal" if visible else "hidden"
+            canvas.itemconfigure(particle.id, state=state)
+            canvas.itemconfigure(particle.glow_id, state=state)
+            particle.hidden = not visible
+        if particle.outer_glow_id:
+            hide_outer = not (visible and outer_glow)
+            if particle.outer_glow_hidden != hide_outer:
+                canvas.itemconfigure(particle.outer_glow_id, state="hidden" if hide_outer else "normal")
+                particle.outer_glow_hidden = hide_outer
+
+    if renderer is not None:
+        renderer.outer_glow = outer_glow
+        renderer.glow_scale = settings["glow_scale"]
+    return active
\ No newline at end of file
@@ -0,0 +1,89 @@
+import random
+
+try:
+    import numpy as np
+except ImportError:  # tkinter 版本可以不安装 numpy，此时用标准库的生成器逐块生成
+    np = None
+
+# 批量随机数流
+# tkinter 版本的粒子是 Python 对象，原来每个粒子创建时调用十几次 random.uniform / randint，
+# 每个 tick 还要为角度扰动和飘落判定各调用一次，一万个粒子每秒就是上百万次调用。
+# RandomStream 一次生成一整块 [0, 1) 的随机数（安装了 numpy 时由 NumPy 生成后转为列表），
+# 调用者按需取走一段：
+#   - take(n)   每个 tick 为所有粒子一次取出 n 个（角度扰动、飘落判定）
+#   - take(k)   每个新粒子一次取出它需要的全部 k 个，自己换算到各参数的范围
+#   - random() / uniform() / randint()  零散的单个随机数（风向、重新出现的位置等）
+# 所有随机数都来自同一个生成器，seed() 设定一次种子即可复现整段动画。
+# 是否安装 numpy 使用的生成器不同，同一种子得到的序列也不同。
+
+# 每次生成的随机数个数
+BLOCK_SIZE = 4096
+
+
+class RandomStream:
+    def __init__(self, seed=None, block_size=BLOCK_SIZE):
+        self.block_size = block_size
+        self.seed(seed)
+
+    def seed(self, seed=None):
+        # 重新设定种子，丢弃缓冲区中剩余的随机数
+        self._generator = np.random.default_rng(seed) if np is not None else random.Random(seed)
+        self._buffer = []
+        self._pos = 0
+
+        # 统计信息
+        self.blocks = 0  # 生成的块数
+        self.values = 0  # 取走的随机数个数
+
+    def _refill(self, count):
+        # 生成新的一块（至少 count 个），缓冲区中剩余的随机数不再使用
+        size = max(self.block_size, count)
+        if np is not None:
+            self._buffer = self._generator.random(size).tolist()
+        else:
+            generate = self._generator.random
+            self._buffer = [generate() for _ in range(size)]
+        self._pos = 0
+        self.blocks += 1
+
+    def take(self, count):
+        # count 个 [0, 1) 均匀分布的随机数（列表）
+        pos = self._pos
+        if pos + count > len(self._buffer):
+            self._refill(count)
+            pos = 0
+        self._pos = pos + count
+        self.values += count
+        return self._buffer[pos:pos + count]
+
+    def random(self):
+        pos = self._pos
+        if pos >= len(self._buffer):
+            self._refill(1)
+            pos = 0
+        self._pos = pos + 1
+        self.values += 1
+        return self._buffer[pos]
+
+    def uniform(self, a, b):
+        return a + (b - a) * self.random()
+
+    def randint(self, a, b):
+        # [a, b] 中的整数，与 random.randint 相同包含 b
+        return a + int(self.random() * (b - a + 1))
+
+    def stats(self):
+        return {
+            "blocks": self.blocks,
+            "values": self.values,
+            "values_per_block": self.values / self.blocks if self.blocks else 0.0,
+        }
+
+
+# tkinter 版本共用的随机数流
+STREAM = RandomStream()
+
+
+def seed(value=None):
+    # 设定共用随机数流的种子（基准测试和离线导出用固定种子复现动画）
+    STREAM.seed(value)
\ No newline at end of file
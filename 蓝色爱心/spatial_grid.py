@@ -0,0 +1,170 @@
+import math
+
+try:
+    import numpy as np
+except ImportError:  # tkinter 版本可以不安装 numpy，只使用 SpatialHash
+    np = None
+
+# 均匀网格空间索引
+# 把平面划分成边长为 cell_size 的格子，按格子查找某一点半径范围内的粒子，
+# 只检查覆盖查询圆的几个格子，不再对所有粒子计算距离。
+# 增强 tkinter 版本的鼠标吸引使用它，以后的点击爆散、粒子间排斥、悬停高亮等也可以共用同一个索引。
+#
+#   UniformGrid - NumPy 版本。粒子按格子编号排序存放，
+#                 每个格子是排序数组中连续的一段；更新时沿用上一次的顺序，
+#                 大部分粒子仍在原来的格子里，稳定排序接近线性，全都没换格子时直接跳过。
+#                 ParticleArrays 不使用它：所有粒子每个 tick 都在移动，而每个 tick 只有一次查询，
+#                 更新索引比直接计算全部距离更慢（见 benchmark.py --spatial）；
+#                 同一批位置要做多次半径查询时才划算
+#   SpatialHash - 纯 Python 版本，用于 tkinter 的 Particle 列表。
+#                 字典保存每个格子里的粒子下标，更新时只移动换了格子的粒子
+
+# 默认格子边长（像素），约为吸引半径的一半
+CELL_SIZE = 75
+
+# 格子编号：(cx + KEY_OFFSET) * KEY_STRIDE + (cy + KEY_OFFSET)，同一列的格子编号连续。
+# 先加偏移再取整，坐标大于 -KEY_OFFSET * cell_size 时截断取整等于向下取整
+KEY_OFFSET = 1 << 20
+KEY_STRIDE = 1 << 21
+
+
+class UniformGrid:
+    def __init__(self, cell_size=CELL_SIZE):
+        self.cell_size = cell_size
+        self.inv_cell_size = 1.0 / cell_size
+        self.xs = None
+        self.ys = None
+        self.keys = None
+        self.order = None  # 按格子编号排序后的粒子下标
+        self.sorted_keys = None
+
+        # 统计信息
+        self.rebuilds = 0  # 重新排序的次数
+        self.skipped = 0  # 没有粒子换格子、直接跳过的次数
+
+    def __len__(self):
+        return 0 if self.keys is None else len(self.keys)
+
+    def cell_column(self, value):
+        # 坐标所在的格子行列号（含偏移），与 cell_keys 的计算方式一致
+        return int(value * self.inv_cell_size + KEY_OFFSET)
+
+    def cell_keys(self, xs, ys):
+        # 用乘以倒数代替除法，np.floor_divide 要慢一个数量级
+        cx = (xs * self.inv_cell_size + KEY_OFFSET).astype(np.int64)
+        cy = (ys * self.inv_cell_size + KEY_OFFSET).astype(np.int64)
+        cx *= KEY_STRIDE
+        cx += cy
+        return cx
+
+    def update(self, xs, ys):
+        # 按新的位置更新索引；xs、ys 会被引用（不复制），查询前不要修改
+        keys = self.cell_keys(xs, ys)
+        self.xs = xs
+        self.ys = ys
+        if self.keys is not None and len(keys) == len(self.keys):
+            if np.array_equal(keys, self.keys):
+                self.skipped += 1
+                return
+            # 沿用上一次的顺序重新排序，数据几乎有序
+            keys_in_order = keys[self.order]
+            resort = np.argsort(keys_in_order, kind="stable")
+            self.order = self.order[resort]
+            self.sorted_keys = keys_in_order[resort]
+        else:
+            self.order = np.argsort(keys, kind="stable")
+            self.sorted_keys = keys[self.order]
+        self.keys = keys
+        self.rebuilds += 1
+
+    def query_radius(self, x, y, radius):
+        # 返回距离 (x, y) 小于 radius 的粒子下标（升序）
+        if not len(self):
+            return np.empty(0, dtype=np.intp)
+        cx0 = self.cell_column(x - radius)
+        cx1 = self.cell_column(x + radius)
+        cy0 = self.cell_column(y - radius)
+        cy1 = self.cell_column(y + radius)
+
+        # 每一列格子在排序数组中是连续的一段
+        sorted_keys = self.sorted_keys
+        parts = []
+        for cx in range(cx0, cx1 + 1):
+            lo = np.searchsorted(sorted_keys, cx * KEY_STRIDE + cy0, "left")
+            hi = np.searchsorted(sorted_keys, cx * KEY_STRIDE + cy1, "right")
+            if hi > lo:
+                parts.append(self.order[lo:hi])
+        if not parts:
+            return np.empty(0, dtype=np.intp)
+
+        candidates = np.concatenate(parts)
+        distance = np.hypot(self.xs[candidates] - x, self.ys[candidates] - y)
+        return np.sort(candidates[distance < radius])
+
+
+class SpatialHash:
+    def __init__(self, cell_size=CELL_SIZE):
+        self.cell_size = cell_size
+        self.xs = []
+        self.ys = []
+        self.keys = []
+        self.buckets = {}
+
+        # 统计信息
+        self.rebuilds = 0
+        self.moves = 0  # 增量更新时换了格子的粒子数
+
+    def __len__(self):
+        return len(self.keys)
+
+    def clear(self):
+        self.xs = []
+        self.ys = []
+        self.keys = []
+        self.buckets = {}
+
+    def update(self, xs, ys):
+        # 按新的位置更新索引；粒子数量变化时整体重建，否则只移动换了格子的粒子
+        size = self.cell_size
+        keys = [(int(x // size), int(y // size)) for x, y in zip(xs, ys)]
+        buckets = self.buckets
+        if len(keys) != len(self.keys):
+            buckets.clear()
+            for i, key in enumerate(keys):
+                bucket = buckets.get(key)
+                if bucket is None:
+                    buckets[key] = bucket = set()
+                bucket.add(i)
+            self.rebuilds += 1
+        else:
+            for i, (old, new) in enumerate(zip(self.keys, keys)):
+                if old != new:
+                    buckets[old].discard(i)
+                    bucket = buckets.get(new)
+                    if bucket is None:
+                        buckets[new] = bucket = set()
+                    bucket.add(i)
+                    self.moves += 1
+        self.keys = keys
+        self.xs = xs
+        self.ys = ys
+
+    def candidates(self, x, y, radius):
+        # 与查询圆相交的格子里的所有粒子下标（不检查距离，可能多于实际结果）
+        size = self.cell_size
+        buckets = self.buckets
+        result = []
+        for cx in range(math.floor((x - radius) / size), math.floor((x + radius) / size) + 1):
+            for cy in range(math.floor((y - radius) / size), math.floor((y + radius) / size) + 1):
+                bucket = buckets.get((cx, cy))
+                if bucket:
+                    result.extend(bucket)
+        return result
+
+    def query_radius(self, x, y, radius):
+        # 返回距离 (x, y) 小于 radius 的粒子下标（升序）
+        xs = self.xs
+        ys = self.ys
+        result = [i for i in self.candidates(x, y, radius) if math.hypot(xs[i] - x, ys[i] - y) < radius]
+        result.sort()
+        return result
\ No newline at end of file
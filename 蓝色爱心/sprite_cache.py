@@ -0,0 +1,74 @@
+from collections import OrderedDict
+
+import pygame
+
+# 预渲染精灵缓存
+# 发光、粒子本体和轨迹点都是“半透明实心圆”，只由 (半径, 颜色, 透明度) 决定。
+# 把这三个参数量化后作为键，每种精灵只创建一次 Surface，之后反复使用。
+# 缓存有容量上限，超出时按最近最少使用（LRU）淘汰，长时间运行内存不会无限增长。
+
+class SpriteCache:
+    # 默认量化粒度下，1200 个增强版粒子（含轨迹）的工作集约一万个精灵；
+    # 容量必须大于工作集，否则每帧循环访问会让 LRU 不断淘汰、几乎全部未命中
+    def __init__(self, max_size=16384, size_step=0.5, color_step=16, alpha_step=16):
+        self.max_size = max_size
+        self.size_step = size_step  # 半径量化步长（像素）
+        self.color_step = color_step  # 颜色通道量化步长
+        self.alpha_step = alpha_step  # 透明度量化步长
+        self._sprites = OrderedDict()
+
+        # 统计信息
+        self.hits = 0
+        self.misses = 0  # 即新建的 Surface 数量
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._sprites)
+
+    def quantize(self, radius, color, alpha):
+        radius = round(radius / self.size_step) * self.size_step
+        # 颜色取最近的量化值，超出 255 的截断，纯色（0 和 255）保持不变
+        step = self.color_step
+        color = tuple(min(255, round(c / step) * step) for c in color)
+        alpha = min(255, int(alpha) // self.alpha_step * self.alpha_step)
+        return radius, color, alpha
+
+    def get(self, radius, color, alpha, min_radius=0):
+        # 返回 (精灵, 中心偏移)，绘制位置为 (int(x - 偏移), int(y - 偏移))
+        key = self.quantize(radius, color, alpha) + (min_radius,)
+        sprite = self._sprites.get(key)
+        if sprite is not None:
+            self._sprites.move_to_end(key)
+            self.hits += 1
+            return sprite, key[0]
+
+        self.misses += 1
+        sprite = self._render(*key)
+        self._sprites[key] = sprite
+        if len(self._sprites) > self.max_size:
+            self._sprites.popitem(last=False)
+            self.evictions += 1
+        return sprite, key[0]
+
+    def _render(self, radius, color, alpha, min_radius):
+        # 与原先逐帧创建的 Surface 保持相同的尺寸和圆心
+        side = int(radius * 2)
+        surface = pygame.Surface((side, side), pygame.SRCALPHA)
+        if alpha > 0:
+            pygame.draw.circle(surface, (*color, alpha),
+                               (int(radius), int(radius)),
+                               max(min_radius, int(radius)))
+        return surface
+
+    def clear(self):
+        self._sprites.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._sprites),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
\ No newline at end of file
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 各模块都在上一级目录中，按脚本方式直接导入
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
\ No newline at end of file
@@ -0,0 +1,29 @@
+from frame_scheduler import FixedTimestep
+
+
+def test_first_frame_runs_one_tick():
+    scheduler = FixedTimestep(tick_rate=60)
+    assert scheduler.advance(now=10.0) == 1
+    assert scheduler.interpolation == 0.0
+
+
+def test_ticks_follow_elapsed_time_and_keep_the_remainder():
+    # tick 间隔 1/64 秒，时间都是二进制精确的小数
+    scheduler = FixedTimestep(tick_rate=64)
+    scheduler.advance(now=0.0)
+    assert scheduler.advance(now=5 / 128) == 2
+    assert scheduler.interpolation == 0.5
+    # 零头留在累加器里，下一帧补上
+    assert scheduler.advance(now=6 / 128) == 1
+    assert scheduler.interpolation == 0.0
+    assert scheduler.ticks == 4
+
+
+def test_long_stall_drops_extra_ticks():
+    scheduler = FixedTimestep(tick_rate=100, max_ticks_per_frame=5)
+    scheduler.advance(now=0.0)
+    assert scheduler.advance(now=1.0) == 5
+    assert scheduler.dropped_ticks == 95
+    assert scheduler.late_frames == 1
+    # 丢弃的 tick 不会在之后的帧里补跑
+    assert scheduler.advance(now=1.01) == 1
\ No newline at end of file
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from framebuffer import Framebuffer
+from tiled_framebuffer import TiledFramebuffer
+
+WIDTH, HEIGHT = 160, 90
+
+
+def add_scene(framebuffer, seed=0):
+    # 两批圆点，部分超出画面边缘，半径覆盖多个量化档
+    rng = np.random.default_rng(seed)
+    for _ in range(2):
+        n = 300
+        framebuffer.add_discs(rng.uniform(-10, WIDTH + 10, n), rng.uniform(-10, HEIGHT + 10, n),
+                              rng.uniform(0.3, 6.0, n), rng.integers(0, 256, (n, 3)),
+                              rng.uniform(0.05, 1.0, n))
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_tiled_output_matches_single_process(workers):
+    reference = Framebuffer(WIDTH, HEIGHT, background=(0, 10, 30))
+    tiled = TiledFramebuffer(WIDTH, HEIGHT, background=(0, 10, 30), workers=workers)
+    try:
+        for seed in range(2):  # 第二帧检查缓冲区在帧之间正确清空
+            add_scene(reference, seed)
+            add_scene(tiled, seed)
+            assert tiled.render().tobytes() == reference.render().tobytes()
+    finally:
+        tiled.close()
\ No newline at end of file
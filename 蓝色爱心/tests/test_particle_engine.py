@@ -0,0 +1,57 @@
+import numpy as np
+
+from particle_engine import ParticleArrays
+
+
+def spawn_one(pool, x, **fields):
+    pool.spawn([x], [0.0], size=1.0, **fields)
+
+
+def test_full_pool_evicts_oldest_in_place():
+    pool = ParticleArrays(limit=4, seed=0)
+    for x in range(4):
+        spawn_one(pool, x)
+    spawn_one(pool, 10)
+    spawn_one(pool, 11)
+
+    # 最旧的两个粒子（槽位 0 和 1）被覆盖，其余粒子不移动
+    assert pool.count == 4
+    assert pool.x[:4].tolist() == [10, 11, 2, 3]
+    assert pool.spawned == 6
+    assert pool.evicted == 2
+
+
+def test_full_pool_evicts_lowest_life():
+    pool = ParticleArrays(limit=3, eviction="lowest_life", seed=0)
+    pool.spawn([0.0, 1.0, 2.0], [0.0] * 3, size=1.0, life=[0.9, 0.2, 0.5])
+    spawn_one(pool, 10)
+
+    assert pool.x[:3].tolist() == [0, 10, 2]
+    assert pool.evicted == 1
+
+
+def test_batch_larger_than_limit_keeps_the_last_particles():
+    pool = ParticleArrays(limit=3, seed=0)
+    pool.spawn(np.arange(5.0), np.zeros(5), size=1.0)
+
+    assert pool.count == 3
+    assert pool.x[:3].tolist() == [2, 3, 4]
+    assert pool.spawned == 5
+    assert pool.evicted == 2
+
+
+def test_lowering_limit_compacts_survivors():
+    pool = ParticleArrays(limit=5, seed=0)
+    for x in range(5):
+        spawn_one(pool, x)
+    pool.set_limit(3)
+
+    # 最旧的两个被淘汰，存活的粒子仍然是前 count 个槽位
+    assert pool.count == 3
+    assert sorted(pool.x[:3].tolist()) == [2, 3, 4]
+    assert pool.evicted == 2
+
+    pool.set_limit(5)
+    spawn_one(pool, 10)
+    assert pool.count == 4
+    assert pool.evicted == 2
\ No newline at end of file
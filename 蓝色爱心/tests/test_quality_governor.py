@@ -0,0 +1,55 @@
+from quality_governor import QualityGovernor
+
+SLOW = 0.030  # 超过 60 fps 预算的 1.2 倍
+NORMAL = 0.015  # 介于升级和降级阈值之间
+FAST = 0.005  # 低于预算的 0.7 倍
+
+
+def feed(governor, frame_time, frames):
+    return [governor.record(frame_time) for _ in range(frames)]
+
+
+def test_downgrades_once_the_window_is_slow():
+    governor = QualityGovernor(window=4, upgrade_frames=5)
+    assert feed(governor, SLOW, 4) == [False, False, False, True]
+    assert governor.level == 1
+    assert governor.level_name == "trail_length"
+
+
+def test_dead_band_keeps_the_level():
+    governor = QualityGovernor(window=4, upgrade_frames=5)
+    feed(governor, SLOW, 4)
+    assert not any(feed(governor, NORMAL, 50))
+    assert governor.level == 1
+
+
+def test_upgrade_needs_a_run_of_fast_frames():
+    governor = QualityGovernor(window=4, upgrade_frames=5)
+    feed(governor, SLOW, 4)
+    # 先填满测量窗口，再连续 5 帧达标才升级
+    changes = feed(governor, FAST, 8)
+    assert changes == [False] * 7 + [True]
+    assert governor.level == 0
+
+
+def test_dead_band_resets_the_upgrade_run():
+    governor = QualityGovernor(window=4, upgrade_frames=5)
+    feed(governor, SLOW, 4)
+    feed(governor, FAST, 6)
+    assert governor.good_frames == 3
+    # 一帧卡顿让窗口平均落入升级和降级阈值之间，连续达标的计数重新开始
+    governor.record(0.040)
+    assert governor.good_frames == 0
+    assert not any(feed(governor, FAST, 7))
+    assert governor.record(FAST)
+    assert governor.level == 0
+
+
+def test_quick_relapse_doubles_the_upgrade_wait():
+    governor = QualityGovernor(window=4, upgrade_frames=5)
+    feed(governor, SLOW, 4)
+    feed(governor, FAST, 8)
+    assert governor.level == 0
+    feed(governor, SLOW, 4)
+    assert governor.level == 1
+    assert governor.upgrade_frames == 10
\ No newline at end of file
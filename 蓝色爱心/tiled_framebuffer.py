@@ -0,0 +1,230 @@
+import multiprocessing
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from framebuffer import make_stamp, stamp_reach
+
+# 多进程分块帧缓冲
+# 与 Framebuffer 接口相同（add_discs / render / render_ppm），用于 4K 等高分辨率的离线渲染。
+# 画面按行划分为若干横条图块，由进程池分别光栅化与各图块相交的圆点，
+# 结果直接写入共享内存中的整帧图像。
+# 圆点数据（量化后的位置、半径和颜色）每帧写入一块共享内存，按字段连续存放（与 ParticleArrays 相同的 SoA），
+# 子进程按名字映射，不对粒子状态做序列化；每个任务只传递几个整数。
+# 主进程先按（批次，半径编号）稳定排序，每个像素的累加顺序与 Framebuffer 完全相同，输出逐字节一致。
+#
+# 每个图块都要按半径分组展开印章，图块越多固定开销越大，所以只切成进程数的几倍，够分配负载即可。
+
+# 每个进程分到的图块数
+TILES_PER_WORKER = 2
+
+# 共享内存中的圆点字段：量化后的中心、半径编号、印章范围、所属批次（add_discs 调用）和 RGB 权重
+DISC_FIELDS = (
+    ("px", np.int64, ()),
+    ("py", np.int64, ()),
+    ("key", np.int64, ()),
+    ("reach", np.int64, ()),
+    ("batch", np.int64, ()),
+    ("rgb", np.float32, (3,)),
+)
+
+
+def disc_views(buffer, capacity):
+    # 在一块共享内存上按字段切出各个数组
+    views = {}
+    offset = 0
+    for name, dtype, shape in DISC_FIELDS:
+        view = np.ndarray((capacity,) + shape, dtype=dtype, buffer=buffer, offset=offset)
+        views[name] = view
+        offset += view.nbytes
+    return views
+
+
+def disc_bytes(capacity):
+    return sum(capacity * np.dtype(dtype).itemsize * int(np.prod(shape)) for _, dtype, shape in DISC_FIELDS)
+
+
+class TiledFramebuffer:
+    def __init__(self, width, height, background=(0, 0, 0), radius_step=0.25, workers=None,
+                 tiles_per_worker=TILES_PER_WORKER):
+        self.width = width
+        self.height = height
+        self.background = np.asarray(background, dtype=np.float32)
+        self.radius_step = radius_step
+        # workers 为 0 时在当前进程中依次光栅化各图块（不启动进程池）
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        rows = min(height, max(1, self.workers) * tiles_per_worker)
+        bounds = [height * i // rows for i in range(rows + 1)]
+        self.tiles = [(0, y0, width, y1) for y0, y1 in zip(bounds, bounds[1:])]
+        self._pending = []
+
+        # 整帧图像和圆点数据都放在共享内存中；圆点容量不足时按两倍扩大
+        self._image_memory = shared_memory.SharedMemory(create=True, size=width * height * 3)
+        self.image = np.ndarray((height, width, 3), dtype=np.uint8, buffer=self._image_memory.buf)
+        self._disc_memory = None
+        self._disc_capacity = 0
+        self._pool = multiprocessing.Pool(self.workers) if self.workers > 0 else None
+
+        # 统计信息
+        self.frames = 0
+        self.reallocations = 0
+
+    def add_discs(self, xs, ys, radii, colors, intensities):
+        # 加入一批实心圆，参数与 Framebuffer.add_discs 相同。这里只做量化，印章在子进程中展开
+        xs = np.asarray(xs, dtype=np.float64)
+        if len(xs) == 0:
+            return
+        ys = np.asarray(ys, dtype=np.float64)
+        radii = np.asarray(radii, dtype=np.float64)
+        colors = np.asarray(colors, dtype=np.float32).reshape(-1, 3)
+        intensities = np.broadcast_to(np.asarray(intensities, dtype=np.float32), xs.shape)
+
+        keys = np.rint(radii / self.radius_step).astype(np.int64)
+        # 与 Framebuffer 一样按半径编号分组，组内保持原来的顺序
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+        # 每种半径的印章范围只算一次
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        self._pending.append({
+            "px": np.rint(xs[order]).astype(np.int64),
+            "py": np.rint(ys[order]).astype(np.int64),
+            "key": keys,
+            "reach": np.array([stamp_reach(max(key * self.radius_step, 0.5))
+                               for key in unique_keys.tolist()], dtype=np.int64)[inverse],
+            "batch": np.full(len(keys), len(self._pending), dtype=np.int64),
+            "rgb": (colors * intensities[:, None])[order],
+        })
+
+    def _ensure_capacity(self, count):
+        if count <= self._disc_capacity:
+            return
+        capacity = max(count, self._disc_capacity * 2, 1024)
+        if self._disc_memory is not None:
+            self._disc_memory.close()
+            self._disc_memory.unlink()
+        self._disc_memory = shared_memory.SharedMemory(create=True, size=disc_bytes(capacity))
+        self._disc_capacity = capacity
+        self.reallocations += 1
+
+    def render(self):
+        # 合成当前帧并清空待绘制列表，返回 (height, width, 3) 的 uint8 数组。
+        # 返回的是共享内存的视图，下一次 render 时会被覆盖
+        count = sum(len(discs["key"]) for discs in self._pending)
+        self._ensure_capacity(count)
+        shared = disc_views(self._disc_memory.buf, self._disc_capacity)
+        for name, _, _ in DISC_FIELDS:
+            if self._pending:
+                np.concatenate([discs[name] for discs in self._pending], out=shared[name][:count])
+        self._pending = []
+
+        tasks = [
+            (self._disc_memory.name, self._disc_capacity, count, self._image_memory.name,
+             self.width, self.height, tile, self.radius_step, tuple(self.background.tolist()))
+            for tile in self.tiles
+        ]
+        if self._pool is not None:
+            self._pool.map(rasterize_tile, tasks)
+        else:
+            for task in tasks:
+                rasterize_tile(task)
+        self.frames += 1
+        return self.image
+
+    def render_ppm(self):
+        header = f"P6 {self.width} {self.height} 255\n".encode("ascii")
+        return header + self.render().tobytes()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+        self.image = None
+        for memory in (self._image_memory, self._disc_memory):
+            if memory is not None:
+                memory.close()
+                memory.unlink()
+        self._image_memory = None
+        self._disc_memory = None
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "tiles": len(self.tiles),
+            "frames": self.frames,
+            "disc_capacity": self._disc_capacity,
+            "reallocations": self.reallocations,
+        }
+
+
+# 以下在子进程中运行
+
+# 已映射的共享内存（按用途保存名字和映射），以及展开过的印章
+_attached = {}
+_stamps = {}
+
+
+def _attach(role, name):
+    # 主进程扩容后共享内存的名字会变，这时关闭旧的映射
+    attached = _attached.get(role)
+    if attached is not None and attached[0] == name:
+        return attached[1]
+    if attached is not None:
+        attached[1].close()
+    memory = shared_memory.SharedMemory(name=name)
+    _attached[role] = (name, memory)
+    return memory
+
+
+def _stamp(radius_step, key):
+    stamp = _stamps.get((radius_step, key))
+    if stamp is None:
+        stamp = make_stamp(max(key * radius_step, 0.5))
+        _stamps[(radius_step, key)] = stamp
+    return stamp
+
+
+def rasterize_tile(task):
+    disc_name, capacity, count, image_name, width, height, tile, radius_step, background = task
+    x0, y0, x1, y1 = tile
+    tile_width = x1 - x0
+    tile_height = y1 - y0
+    discs = disc_views(_attach("discs", disc_name).buf, capacity)
+    image = np.ndarray((height, width, 3), dtype=np.uint8, buffer=_attach("image", image_name).buf)
+
+    # 只处理印章与图块相交的圆点；圆点已按（批次，半径编号）排好序，筛选后顺序不变
+    px = discs["px"][:count]
+    py = discs["py"][:count]
+    reach = discs["reach"][:count]
+    selected = np.flatnonzero((py + reach >= y0) & (py - reach < y1) & (px + reach >= x0) & (px - reach < x1))
+
+    size = tile_width * tile_height
+    pixels = np.empty((size, 3), dtype=np.float32)
+    pixels[:] = background
+    if len(selected):
+        px = px[selected]
+        py = py[selected]
+        keys = discs["key"][selected]
+        batches = discs["batch"][selected]
+        rgb = discs["rgb"][selected]
+        changed = (keys[1:] != keys[:-1]) | (batches[1:] != batches[:-1])
+        starts = np.flatnonzero(np.concatenate(([True], changed)))
+        ends = np.append(starts[1:], len(selected))
+
+        indices = []
+        weights = []
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            dy, dx, coverage = _stamp(radius_step, int(keys[start]))
+            rows = py[start:end, None] + dy[None, :]
+            cols = px[start:end, None] + dx[None, :]
+            valid = (rows >= y0) & (rows < y1) & (cols >= x0) & (cols < x1)
+            indices.append(((rows - y0) * tile_width + (cols - x0))[valid])
+            weights.append((rgb[start:end, None, :] * coverage[None, :, None])[valid])
+        indices = np.concatenate(indices)
+        weights = np.concatenate(weights)
+        for channel in range(3):
+            pixels[:, channel] += np.bincount(indices, weights[:, channel], minlength=size)
+
+    image[y0:y1, x0:x1] = np.clip(pixels, 0, 255).astype(np.uint8).reshape(tile_height, tile_width, 3)
+    return len(selected)
\ No newline at end of file
@@ -0,0 +1,139 @@
+# 批量提交画布命令
+# 画布元素模式下每个粒子每帧要调用两三次 canvas.move，吸引模式下还有最多三次 canvas.coords，
+# 几千个粒子就是上万次 Python 到 Tcl 的调用，每次都要转换参数、查找命令。
+# CanvasBatch 与画布的用法相同（create_oval / move / coords / itemconfigure / tag_raise / delete），
+# 但 move、coords、itemconfigure、tag_raise、delete 只记录下来，flush() 时一次性交给 Tcl：
+# 相邻的同类命令合并为一段，每段只调用一次预先定义的 Tcl 过程，由它在 Tcl 内部逐条执行。
+# 吸引模式下同一个粒子先 coords 再 move，两种命令交替出现，所以出现 coords 之后
+# 后面的 move 和 coords 都并入同一段（每条记录带上命令类型），避免每个粒子都切成两段。
+# 复用画布元素时 itemconfigure 之后紧接着 tag_raise，同样并入 itemconfigure 的一段。
+# 参数以 Tcl 列表传递，不拼接脚本字符串，数值原样传入，不会损失精度。
+# 命令的执行顺序与逐个调用完全相同。create_oval 需要返回元素编号，仍然立即执行；
+# 执行前先提交已记录的命令，新元素叠放在之前提到最上层的元素之上。
+
+# 在 Tcl 解释器中定义的批量执行过程（每个解释器定义一次）
+TCL_PROCS = """
+namespace eval ::canvas_batch {
+    proc move {w data} {
+        foreach {id dx dy} $data { $w move $id $dx $dy }
+    }
+    proc geometry {w data} {
+        foreach {is_coords id x0 y0 x1 y1} $data {
+            if {$is_coords} { $w coords $id $x0 $y0 $x1 $y1 } else { $w move $id $x0 $y0 }
+        }
+    }
+    proc itemconfigure {w data} {
+        foreach {is_raise id options} $data {
+            if {$is_raise} { $w raise $id } else { $w itemconfigure $id {*}$options }
+        }
+    }
+    proc raise {w data} {
+        foreach id $data { $w raise $id }
+    }
+    proc delete {w data} {
+        $w delete {*}$data
+    }
+}
+"""
+
+MOVE = "::canvas_batch::move"
+GEOMETRY = "::canvas_batch::geometry"
+ITEMCONFIGURE = "::canvas_batch::itemconfigure"
+RAISE = "::canvas_batch::raise"
+DELETE = "::canvas_batch::delete"
+
+
+class CanvasBatch:
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.tk = canvas.tk
+        self.widget = str(canvas)
+        self._runs = []  # [(Tcl 过程名, 参数列表)]，按提交顺序排列
+        self._kind = None  # 最后一段的过程名
+        self._args = None  # 最后一段的参数列表
+        if not self.tk.call("info", "commands", MOVE):
+            self.tk.eval(TCL_PROCS)
+
+        # 统计信息
+        self.commands = 0  # 记录的画布命令数
+        self.flushes = 0
+        self.tcl_calls = 0  # flush 实际发出的 Tcl 调用数
+
+    def _run(self, kind):
+        # 开始新的一段；同类命令连续提交时沿用最后一段
+        self._args = []
+        self._runs.append((kind, self._args))
+        self._kind = kind
+        return self._args
+
+    def create_oval(self, *args, **options):
+        self.flush()
+        return self.canvas.create_oval(*args, **options)
+
+    def move(self, item, dx, dy):
+        kind = self._kind
+        if kind == MOVE:
+            args = self._args
+            args.append(item)
+            args.append(dx)
+            args.append(dy)
+        elif kind == GEOMETRY:
+            self._args.extend((0, item, dx, dy, 0, 0))
+        else:
+            self._run(MOVE).extend((item, dx, dy))
+        self.commands += 1
+
+    def coords(self, item, x0, y0, x1, y1):
+        args = self._args if self._kind == GEOMETRY else self._run(GEOMETRY)
+        args.extend((1, item, x0, y0, x1, y1))
+        self.commands += 1
+
+    def itemconfigure(self, item, **options):
+        args = self._args if self._kind == ITEMCONFIGURE else self._run(ITEMCONFIGURE)
+        flat = []
+        for name, value in options.items():
+            flat.append("-" + name)
+            flat.append(value)
+        args.extend((0, item, tuple(flat)))
+        self.commands += 1
+
+    itemconfig = itemconfigure
+
+    def tag_raise(self, item):
+        kind = self._kind
+        if kind == RAISE:
+            self._args.append(item)
+        elif kind == ITEMCONFIGURE:
+            self._args.extend((1, item, ()))
+        else:
+            self._run(RAISE).append(item)
+        self.commands += 1
+
+    def delete(self, *items):
+        args = self._args if self._kind == DELETE else self._run(DELETE)
+        args.extend(items)
+        self.commands += 1
+
+    def pending(self):
+        return sum(len(args) for _, args in self._runs)
+
+    def flush(self):
+        # 按顺序执行记录下来的命令，每段一次 Tcl 调用
+        runs = self._runs
+        if not runs:
+            return
+        self._runs = []
+        self._kind = None
+        self._args = None
+        for kind, args in runs:
+            self.tk.call(kind, self.widget, tuple(args))
+        self.flushes += 1
+        self.tcl_calls += len(runs)
+
+    def stats(self):
+        return {
+            "commands": self.commands,
+            "flushes": self.flushes,
+            "tcl_calls": self.tcl_calls,
+            "commands_per_call": self.commands / self.tcl_calls if self.tcl_calls else 0.0,
+        }
\ No newline at end of file
@@ -0,0 +1,174 @@
+import math
+
+try:
+    import numpy as np
+except ImportError:  # tkinter 版本可以不安装 numpy，此时飘落粒子仍在 Particle.update 中逐个计算
+    np = None
+
+# 飘落粒子的批量模拟
+# 按 F 键后七成爱心粒子同时开始飘落，原来每个粒子每个 tick 都在 Python 中计算重力、风力、
+# 从底部回到顶部和左右反弹，一万个粒子时这一段就占了大半个 tick。
+# FallingParticles 把正在飘落的粒子的位置和速度保存在 NumPy 数组中（按开始飘落的顺序排列），
+# 每个 tick 用整体的数组运算完成重力、风力、回到顶部和左右反弹，再把新位置写回粒子对象：
+#   - advance(particles, wind_direction)  推进一个 tick；particles 为当前需要更新的粒子列表
+#   - attract(x, y, radius, strength)     （可选）把飘落粒子吸向鼠标
+#   - commit()                            把位置写回粒子，返回每个粒子的移动距离（用于移动画布元素）
+#   - add(started)                        这个 tick 刚开始飘落的粒子（已由 update 移动过）加到末尾
+# 深度层的系数（重力、风力、重新出现时的下落速度）在创建时对每一层算好，
+# 加入粒子时按深度层展开为每个粒子的系数，之后每个 tick 不再计算乘方。
+# 飘落中的粒子的速度只保存在数组中；粒子列表变化（画质调整、重新生成爱心）或
+# invalidate() 之后，先把速度写回粒子对象，再从新的列表中重新收集飘落的粒子。
+# 运算顺序与 Particle.update 中逐个计算的相同，随机数相同时结果也相同。
+
+# 粒子超出窗口多少像素后回到顶部或反弹
+MARGIN = 10
+
+# 左右反弹后保留的水平速度比例
+BOUNCE = 0.8
+
+# 重新出现时的下落速度范围（再乘以深度层的系数）
+RESPAWN_SPEED = (0.1, 0.5)
+
+# 每个粒子的状态数组，按粒子顺序排列
+FIELDS = ("x", "y", "fall_speed", "horizontal_speed", "layer", "gravity", "wind", "speed")
+
+
+class FallingParticles:
+    # gravity、wind_strength 为不乘深度层系数的重力和风力；force_scale、speed_scale 为每个深度层
+    # 重力和风力的系数、重新出现时下落速度的系数；stream 为随机数流（random_stream.RandomStream）
+    def __init__(self, width, height, gravity, wind_strength, force_scale, speed_scale, stream):
+        self.width = width
+        self.height = height
+        self.wind_strength = wind_strength
+        self.layer_gravity = np.array([gravity * scale for scale in force_scale])
+        self.layer_wind = np.array(force_scale, dtype=float)
+        self.layer_speed = np.array(speed_scale, dtype=float)
+        self.stream = stream
+        self.source = None  # 收集飘落粒子时的粒子列表
+        self.particles = []
+        for name, values in zip(FIELDS, self._gather([])):
+            setattr(self, name, values)
+        self.old_x = self.prev_x = self.x  # 这个 tick 开始时的位置和插值用的上一个位置
+        self.old_y = self.prev_y = self.y
+
+        # 统计信息
+        self.ticks = 0
+        self.rebuilds = 0  # 重新收集飘落粒子的次数
+        self.respawned = 0  # 回到顶部的粒子数
+
+    def __len__(self):
+        return len(self.particles)
+
+    def _gather(self, particles):
+        # 从粒子对象收集 FIELDS 中的各数组
+        layers = np.array([p.depth_layer for p in particles], dtype=np.intp)
+        return (
+            np.array([p.x for p in particles], dtype=float),
+            np.array([p.y for p in particles], dtype=float),
+            np.array([p.fall_speed for p in particles], dtype=float),
+            np.array([p.horizontal_speed for p in particles], dtype=float),
+            layers,
+            self.layer_gravity[layers],
+            self.layer_wind[layers],
+            self.layer_speed[layers],
+        )
+
+    def _store(self):
+        # 把速度写回粒子对象
+        for particle, fall_speed, horizontal_speed in zip(
+                self.particles, self.fall_speed.tolist(), self.horizontal_speed.tolist()):
+            particle.fall_speed = fall_speed
+            particle.horizontal_speed = horizontal_speed
+
+    def invalidate(self):
+        # 粒子被外部直接标记为飘落（F 键）之后调用，下一次 advance 重新收集
+        self.source = None
+
+    def add(self, started):
+        # 加入刚开始飘落的粒子
+        if not started:
+            return
+        for name, values in zip(FIELDS, self._gather(started)):
+            setattr(self, name, np.concatenate((getattr(self, name), values)))
+        self.particles = self.particles + started
+
+    def rebuild(self, particles):
+        # 从 particles 中重新收集所有飘落的粒子
+        self._store()
+        self.particles = [p for p in particles if p.is_falling]
+        for name, values in zip(FIELDS, self._gather(self.particles)):
+            setattr(self, name, values)
+        self.source = particles
+        self.rebuilds += 1
+
+    def advance(self, particles, wind_direction):
+        if particles is not self.source:
+            self.rebuild(particles)
+        self.ticks += 1
+        x, y = self.x, self.y
+        self.old_x = self.prev_x = x.copy()
+        self.old_y = self.prev_y = y.copy()
+        if not len(x):
+            return
+
+        # 重力和风力（深层粒子受力更小）
+        self.fall_speed += self.gravity
+        self.horizontal_speed += (math.cos(wind_direction) * self.wind_strength) * self.wind
+        x += self.horizontal_speed
+        y += self.fall_speed
+
+        # 落到底部以下的粒子从顶部随机位置重新出现，不做插值
+        respawn = np.flatnonzero(y > self.height + MARGIN)
+        if len(respawn):
+            r_x, r_speed = np.array(self.stream.take(2 * len(respawn))).reshape(-1, 2).T
+            low, high = RESPAWN_SPEED
+            x[respawn] = np.floor(r_x * (self.width + 1))
+            y[respawn] = -MARGIN
+            self.fall_speed[respawn] = (low + (high - low) * r_speed) * self.speed[respawn]
+            self.horizontal_speed[respawn] = 0.0
+            self.prev_x = self.old_x.copy()
+            self.prev_y = self.old_y.copy()
+            self.prev_x[respawn] = x[respawn]
+            self.prev_y[respawn] = y[respawn]
+            self.respawned += len(respawn)
+
+        # 左右超出窗口时反弹
+        left = x < -MARGIN
+        x[left] = -MARGIN
+        self.horizontal_speed[left] = np.abs(self.horizontal_speed[left]) * BOUNCE
+        right = x > self.width + MARGIN
+        x[right] = self.width + MARGIN
+        self.horizontal_speed[right] = -np.abs(self.horizontal_speed[right]) * BOUNCE
+
+    def attract(self, mouse_x, mouse_y, radius, layer_strength):
+        # 吸引范围内的飘落粒子向鼠标移动，layer_strength 为每个深度层的吸引系数；
+        # 返回每个粒子是否在范围内（列表）
+        dx = mouse_x - self.x
+        dy = mouse_y - self.y
+        distance = np.maximum(np.sqrt(dx*dx + dy*dy), 0.1)
+        inside = distance < radius
+        strength = np.asarray(layer_strength, dtype=float)[self.layer]
+        force = np.where(inside, strength / distance, 0.0)
+        self.x += dx * force
+        self.y += dy * force
+        return inside.tolist()
+
+    def commit(self):
+        # 把位置写回粒子对象，返回这个 tick 的移动距离 (dxs, dys)
+        xs = self.x.tolist()
+        ys = self.y.tolist()
+        for particle, x, y, prev_x, prev_y in zip(self.particles, xs, ys,
+                                                  self.prev_x.tolist(), self.prev_y.tolist()):
+            particle.prev_x = prev_x
+            particle.prev_y = prev_y
+            particle.x = x
+            particle.y = y
+        return (self.x - self.old_x).tolist(), (self.y - self.old_y).tolist()
+
+    def stats(self):
+        return {
+            "falling": len(self.particles),
+            "ticks": self.ticks,
+            "rebuilds": self.rebuilds,
+            "respawned": self.respawned,
+        }
\ No newline at end of file
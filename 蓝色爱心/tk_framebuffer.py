@@ -0,0 +1,95 @@
+import tkinter as tk
+
+from framebuffer import Framebuffer
+from bloom import BloomCompositor
+
+# tkinter 版本的单图像渲染模式
+# 粒子不再各自拥有两三个画布椭圆，而是每帧光栅化到一块 RGB 缓冲区，
+# 再整体推送到画布上唯一的一个 PhotoImage。需要 numpy。
+# TkBloomRenderer 的发光不再逐个光栅化为圆，而是交给泛光合成（bloom.py）整帧模糊一次。
+
+# 发光效果的相对亮度
+GLOW_INTENSITY = 0.25
+OUTER_GLOW_INTENSITY = 0.12
+
+
+class TkFramebufferRenderer:
+    def __init__(self, canvas, width, height, background=(0, 0, 0)):
+        self.canvas = canvas
+        self.framebuffer = Framebuffer(width, height, background)
+        # 画质设置（由自适应画质调整）
+        self.outer_glow = True
+        self.glow_scale = 1.0
+        self.image = tk.PhotoImage(width=width, height=height)
+        # 图像放在最下层，文字等其他画布元素显示在它上面
+        self.item = canvas.create_image(0, 0, anchor="nw", image=self.image)
+        canvas.tag_lower(self.item)
+
+    def draw(self, particles, interpolation=1.0):
+        # interpolation 为上一个 tick 与当前 tick 之间的插值比例
+        add_particles(self.framebuffer, particles, interpolation, self.outer_glow, self.glow_scale)
+        self.image.configure(data=self.framebuffer.render_ppm(), format="PPM")
+
+
+class TkBloomRenderer(TkFramebufferRenderer):
+    # 与 TkFramebufferRenderer 相同，只是发光和外发光改为泛光合成的光源
+    def __init__(self, canvas, width, height, background=(0, 0, 0)):
+        super().__init__(canvas, width, height, background)
+        self.framebuffer = BloomCompositor(width, height, background)
+
+    def draw(self, particles, interpolation=1.0):
+        # 发光半径比例只用于缩小模糊半径，光源亮度不变
+        self.framebuffer.glow_scale = self.glow_scale
+        add_bloom_particles(self.framebuffer, particles, interpolation, self.outer_glow)
+        self.image.configure(data=self.framebuffer.render_ppm(), format="PPM")
+
+
+def particle_attributes(particles, interpolation=1.0, scale=1.0):
+    # 渲染用的位置、半径、颜色和不透明度（0-1）；scale 把窗口坐标缩放到帧缓冲的分辨率（离线导出）
+    if interpolation >= 1.0:
+        xs = [p.x for p in particles]
+        ys = [p.y for p in particles]
+    else:
+        xs = [p.prev_x + (p.x - p.prev_x) * interpolation for p in particles]
+        ys = [p.prev_y + (p.y - p.prev_y) * interpolation for p in particles]
+    sizes = [p.size for p in particles]
+    if scale != 1.0:
+        xs = [x * scale for x in xs]
+        ys = [y * scale for y in ys]
+        sizes = [size * scale for size in sizes]
+    colors = [p.rgb for p in particles]
+    alphas = [p.alpha / 255 for p in particles]
+    return xs, ys, sizes, colors, alphas
+
+
+def add_particles(framebuffer, particles, interpolation=1.0, outer_glow=True, glow_scale=1.0, scale=1.0):
+    # 把粒子本体和发光效果加入帧缓冲
+    xs, ys, sizes, colors, alphas = particle_attributes(particles, interpolation, scale)
+    glow_sizes = [size * (1.3 + 0.1 * p.depth_layer) * glow_scale for size, p in zip(sizes, particles)]
+
+    # 加法混合，绘制顺序不影响结果；外发光只有前两层的爱心粒子才有
+    outer = [i for i, p in enumerate(particles) if p.has_outer_glow] if outer_glow else []
+    if outer:
+        framebuffer.add_discs(
+            [xs[i] for i in outer], [ys[i] for i in outer],
+            [sizes[i] * 2.0 * glow_scale for i in outer], [colors[i] for i in outer],
+            [alphas[i] * OUTER_GLOW_INTENSITY for i in outer],
+        )
+    framebuffer.add_discs(xs, ys, glow_sizes, colors, [a * GLOW_INTENSITY for a in alphas])
+    framebuffer.add_discs(xs, ys, sizes, colors, alphas)
+
+
+def add_bloom_particles(compositor, particles, interpolation=1.0, outer_glow=True):
+    # 把粒子本体和发光光源加入泛光合成器，光源亮度与 add_particles 中完整画质的发光圆相同
+    # （降低画质时由 compositor.glow_scale 缩小模糊半径）
+    xs, ys, sizes, colors, alphas = particle_attributes(particles, interpolation)
+    glow_sizes = [size * (1.3 + 0.1 * p.depth_layer) for size, p in zip(sizes, particles)]
+    outer = [i for i, p in enumerate(particles) if p.has_outer_glow] if outer_glow else []
+    if outer:
+        compositor.add_glow(
+            [xs[i] for i in outer], [ys[i] for i in outer],
+            [sizes[i] * 2.0 for i in outer], [colors[i] for i in outer],
+            [alphas[i] * OUTER_GLOW_INTENSITY for i in outer],
+        )
+    compositor.add_glow(xs, ys, glow_sizes, colors, [a * GLOW_INTENSITY for a in alphas])
+    compositor.add_discs(xs, ys, sizes, colors, alphas)
\ No newline at end of file
@@ -1,7 +1,16 @@
 import tkinter as tk
-import random
 import math
-from colorsys import hsv_to_rgb
+import time
+import logging
+
+from heart_geometry import heart_point_list
+from frame_scheduler import FixedTimestep
+from quality_governor import QualityGovernor, apply_tk_quality
+from frame_profiler import FrameProfiler
+from tk_batch import CanvasBatch
+from color_palette import PALETTE, light_factors
+from random_stream import STREAM
+import tk_falling
 
 # 窗口设置
 WIDTH, HEIGHT = 800, 600
@@ -22,77 +31,138 @@ DEPTH_SCALE = 0.85  # 每层缩小比例
 DEPTH_OPACITY_SCALE = 0.8  # 每层透明度减少比例
 LIGHT_DIRECTION = [0.5, -0.5, 0.7]  # 光源方向 [x, y, z]
 LIGHT_INTENSITY = 1.2  # 光照强度
+LIGHT_FACTORS = light_factors(LIGHT_DIRECTION, LIGHT_INTENSITY)  # 随机表面朝向的光照系数表
+
+# 每个深度层的系数，启动时算好：重力、风力和脉动幅度（深层更小）、
+# 重新出现时的下落速度（深层更慢）、角度变化（深层更大）
+LAYER_FORCE_SCALE = tuple(0.9 ** layer for layer in range(DEPTH_LAYERS))
+LAYER_SPEED_SCALE = tuple(0.8 ** layer for layer in range(DEPTH_LAYERS))
+LAYER_ANGLE_SCALE = tuple(1.1 ** layer for layer in range(DEPTH_LAYERS))
+
+# 模拟频率（每秒 tick 数）
+TICK_RATE = 60
+
+# 自适应画质：帧耗时超出预算时依次去掉外发光、缩小发光半径（仅单图像模式）、减少粒子、减少深度层
+ADAPTIVE_QUALITY = True
+QUALITY_FEATURES = ("outer_glow", "glow_radius", "particle_count", "depth_layers")
+
+# 渲染方式：items（每个粒子两三个画布椭圆）、framebuffer（整帧光栅化为一张图像，需要 numpy）
+# 或 bloom（与 framebuffer 相同，但发光改为整帧一次高斯模糊，见 bloom.py）
+RENDER_MODE = "items"
+
+# 画布元素模式下把每帧的 move / coords 汇总后批量交给 Tcl（见 tk_batch.py）；False 时逐个调用画布方法
+BATCH_CANVAS_UPDATES = True
+
+# 性能剖析：P 键开关性能面板；设为文件名（.csv 或 .jsonl）时启动即开启，并把每帧各阶段耗时写入该文件
+PROFILE_TRACE = None
+
+# 每帧各阶段的耗时统计（默认关闭）和显示它的画布文字元素（在 main 中创建）
+profiler = FrameProfiler()
+profiler_text = None
+
+# 批量提交画布命令（在 main 中创建，不批量提交时为 None）
+canvas_batch = None
+
+# 爱心采样方式：parameter（按参数 t 均匀）或 arc_length（按弧长均匀）
+HEART_SAMPLING = "parameter"
+
+# 飘落粒子的批量模拟（见 tk_falling.py，在 main 中由 create_falling() 创建；为 None 时在 Particle.update 中逐个计算）
+falling = None
+
+# 按当前的 WIDTH、HEIGHT 创建飘落粒子的批量模拟；没有 numpy 时返回 None。
+# 不在导入时创建：离线导出等调用方会在导入后修改 WIDTH、HEIGHT
+def create_falling():
+    if tk_falling.np is None:
+        return None
+    return tk_falling.FallingParticles(WIDTH, HEIGHT, GRAVITY, WIND_STRENGTH,
+                                       LAYER_FORCE_SCALE, LAYER_SPEED_SCALE, STREAM)
 
 class Particle:
+    # 同时存在约六千个粒子：用 __slots__ 代替每个实例的 __dict__
+    __slots__ = (
+        "canvas", "id", "glow_id", "outer_glow_id",  # 画布和画布元素
+        "x", "y", "original_x", "original_y", "prev_x", "prev_y",  # 位置
+        "depth_layer", "size", "original_size", "rgb", "alpha",  # 外观
+        "angle", "distance", "sin_offset", "pulse_speed", "time",  # 运动参数
+        "fall_speed", "horizontal_speed", "is_falling", "fall_delay", "fall_counter",  # 飘落参数
+        "hidden", "outer_glow_hidden", "has_outer_glow",  # 自适应画质的标记
+    )
+    
     def __init__(self, canvas, x, y, depth_layer=0):
         self.canvas = canvas
         self.x = x
         self.y = y
         self.original_x = x
         self.original_y = y
+        self.prev_x = x  # 上一个 tick 的位置，单图像渲染模式用于插值
+        self.prev_y = y
         self.depth_layer = depth_layer  # 深度层 (0是最前面)
         
+        # 这个粒子需要的随机数一次从共用的随机数流中取出，再换算到各参数的范围
+        (r_size, r_hue, r_saturation, r_value, r_light, r_angle,
+         r_distance, r_offset, r_pulse, r_time, r_fall, r_delay) = STREAM.take(12)
+        
         # 根据深度层调整大小
-        base_size = random.uniform(MIN_PARTICLE_SIZE, MAX_PARTICLE_SIZE)
+        base_size = MIN_PARTICLE_SIZE + (MAX_PARTICLE_SIZE - MIN_PARTICLE_SIZE) * r_size
         self.size = base_size * (DEPTH_SCALE ** depth_layer)
         self.original_size = self.size
         
         # 使用HSV色彩空间创建蓝色渐变
         # 根据深度层调整色相，创造深度感
-        base_hue = random.uniform(0.55, 0.65)  # 基础蓝色范围
+        base_hue = 0.55 + 0.1 * r_hue  # 基础蓝色范围
         hue_shift = 0.03 * depth_layer  # 深度层越深，色相偏移越大
         hue = max(0.5, min(0.7, base_hue - hue_shift))  # 限制在蓝色范围内
         
         # 根据深度层调整饱和度和亮度
-        saturation = random.uniform(0.7, 1.0) * (0.9 ** depth_layer)
-        value = random.uniform(0.7, 1.0) * (0.85 ** depth_layer)
+        saturation = (0.7 + 0.3 * r_saturation) * (0.9 ** depth_layer)
+        value = (0.7 + 0.3 * r_value) * (0.85 ** depth_layer)
         
         # 计算光照效果
         if depth_layer < 2:  # 只对前面的层应用高光
-            # 随机生成粒子的法向量 (模拟表面朝向)
-            nx = random.uniform(-1, 1)
-            ny = random.uniform(-1, 1)
-            nz = random.uniform(0.5, 1)  # 主要朝向观察者
-            
-            # 归一化法向量
-            norm = math.sqrt(nx*nx + ny*ny + nz*nz)
-            nx, ny, nz = nx/norm, ny/norm, nz/norm
-            
-            # 计算光照强度 (法向量与光源方向的点积)
-            light_dot = nx*LIGHT_DIRECTION[0] + ny*LIGHT_DIRECTION[1] + nz*LIGHT_DIRECTION[2]
-            light_factor = max(0.2, min(1.0, 0.5 + light_dot * LIGHT_INTENSITY))
+            # 随机的表面朝向对应的光照系数（预先算好，见 color_palette.light_factors）
+            light_factor = LIGHT_FACTORS[int(r_light * len(LIGHT_FACTORS))]
             
             # 应用光照
             value = min(1.0, value * light_factor)
         
-        r, g, b = hsv_to_rgb(hue, saturation, value)
+        # 从调色板查出量化后的颜色和共用的Tkinter颜色字符串
+        # 颜色字符串只在创建画布元素时使用，不保存在粒子上
+        self.rgb, color = PALETTE.lookup(hue, saturation, value)  # rgb 供单图像渲染模式使用
         
         # 根据深度层调整透明度
         alpha = int(255 * (DEPTH_OPACITY_SCALE ** depth_layer))
         
-        # 转换为Tkinter颜色格式
-        self.color = f'#{int(r*255):02x}{int(g*255):02x}{int(b*255):02x}'
         self.alpha = alpha  # 存储透明度值用于发光效果
         
         # 运动参数
-        self.angle = random.uniform(0, 2 * math.pi)
-        self.distance = random.uniform(0.8, 3) * (0.9 ** depth_layer)  # 深层粒子移动距离更小
-        self.sin_offset = random.uniform(0, 2 * math.pi)
-        self.pulse_speed = random.uniform(0.02, 0.05) * (1.1 ** depth_layer)  # 深层粒子脉动更快
-        self.time = random.uniform(0, 100)
+        self.angle = 2 * math.pi * r_angle
+        self.distance = (0.8 + 2.2 * r_distance) * (0.9 ** depth_layer)  # 深层粒子移动距离更小
+        self.sin_offset = 2 * math.pi * r_offset
+        self.pulse_speed = (0.02 + 0.03 * r_pulse) * (1.1 ** depth_layer)  # 深层粒子脉动更快
+        self.time = 100 * r_time
         
         # 飘落参数
-        self.fall_speed = random.uniform(0.1, 0.5) * (0.8 ** depth_layer)  # 深层粒子下落更慢
+        self.fall_speed = (0.1 + 0.4 * r_fall) * (0.8 ** depth_layer)  # 深层粒子下落更慢
         self.horizontal_speed = 0
         self.is_falling = False
-        self.fall_delay = random.randint(100, 500)
+        self.fall_delay = 100 + int(401 * r_delay)  # 100 到 500
         self.fall_counter = 0
         
+        # 为前两层添加额外的发光效果，增强立体感
+        self.hidden = False  # 自适应画质隐藏的粒子
+        self.outer_glow_hidden = False
+        self.has_outer_glow = depth_layer < 2
+        
+        # 单图像渲染模式下粒子没有画布元素
+        if canvas is None:
+            self.id = self.glow_id = self.outer_glow_id = None
+            return
+        
         # 创建粒子
         self.id = canvas.create_oval(
             x - self.size, y - self.size,
             x + self.size, y + self.size,
-            fill=self.color, outline=""
+            fill=color, outline=""
         )
         
         # 创建发光效果
@@ -103,34 +173,49 @@ class Particle:
         self.glow_id = canvas.create_oval(
             x - glow_size, y - glow_size,
             x + glow_size, y + glow_size,
-            fill="", outline=self.color, width=glow_width
+            fill="", outline=color, width=glow_width
         )
         
-        # 为前两层添加额外的发光效果，增强立体感
-        if depth_layer < 2:
+        if self.has_outer_glow:
             outer_glow_size = self.size * 2.0
             self.outer_glow_id = canvas.create_oval(
                 x - outer_glow_size, y - outer_glow_size,
                 x + outer_glow_size, y + outer_glow_size,
-                fill="", outline=self.color, width=0.2
+                fill="", outline=color, width=0.2
             )
         else:
             self.outer_glow_id = None
     
-    def update(self, wind_direction=0):
+    def move_items(self, dx, dy):
+        # 把粒子的画布元素移动 (dx, dy)
+        if self.id is not None:
+            self.canvas.move(self.id, dx, dy)
+            self.canvas.move(self.glow_id, dx, dy)
+            if self.outer_glow_id:
+                self.canvas.move(self.outer_glow_id, dx, dy)
+    
+    # jitter 和 chance 为这个 tick 的两个 [0, 1) 随机数（角度扰动和飘落判定），由调用者批量取出；
+    # 不传入时角度不变、不会开始飘落。返回这个 tick 是否开始飘落
+    def update(self, wind_direction=0, jitter=0.5, chance=1.0):
+        # 记录上一个 tick 的位置
+        self.prev_x = self.x
+        self.prev_y = self.y
+        
         # 更新时间
         self.time += 0.05
         
         # 检查是否开始飘落
+        started = False
         if not self.is_falling:
             self.fall_counter += 1
-            if self.fall_counter > self.fall_delay and random.random() < 0.002:
-                self.is_falling = True
+            if self.fall_counter > self.fall_delay and chance < 0.002:
+                self.is_falling = started = True
         
         if self.is_falling:
             # 飘落效果
-            self.fall_speed += GRAVITY * (0.9 ** self.depth_layer)  # 深层粒子受重力影响更小
-            self.horizontal_speed += math.cos(wind_direction) * WIND_STRENGTH * (0.9 ** self.depth_layer)
+            force_scale = LAYER_FORCE_SCALE[self.depth_layer]
+            self.fall_speed += GRAVITY * force_scale  # 深层粒子受重力影响更小
+            self.horizontal_speed += math.cos(wind_direction) * WIND_STRENGTH * force_scale
             
             # 更新位置
             new_x = self.x + self.horizontal_speed
@@ -139,9 +224,11 @@ class Particle:
             # 边界检查
             if new_y > HEIGHT + 10:
                 new_y = -10
-                new_x = random.randint(0, WIDTH)
-                self.fall_speed = random.uniform(0.1, 0.5) * (0.8 ** self.depth_layer)
+                new_x = STREAM.randint(0, WIDTH)
+                self.fall_speed = STREAM.uniform(0.1, 0.5) * LAYER_SPEED_SCALE[self.depth_layer]
                 self.horizontal_speed = 0
+                # 从顶部重新出现，不做插值
+                self.prev_x, self.prev_y = new_x, new_y
             
             if new_x < -10:
                 new_x = -10
@@ -154,7 +241,7 @@ class Particle:
             pulse = math.sin(self.time * self.pulse_speed + self.sin_offset) * 5
             
             # 根据深度层调整脉动幅度
-            pulse *= (0.9 ** self.depth_layer)
+            pulse *= LAYER_FORCE_SCALE[self.depth_layer]
             
             # 计算新位置
             new_x = self.original_x + math.cos(self.angle) * self.distance * pulse
@@ -165,17 +252,16 @@ class Particle:
         dy = new_y - self.y
         
         # 更新位置
-        self.canvas.move(self.id, dx, dy)
-        self.canvas.move(self.glow_id, dx, dy)
-        if self.outer_glow_id:
-            self.canvas.move(self.outer_glow_id, dx, dy)
+        self.move_items(dx, dy)
         
         # 更新当前位置
         self.x = new_x
         self.y = new_y
         
         # 随机改变角度
-        self.angle += random.uniform(-0.05, 0.05) * (1.1 ** self.depth_layer)  # 深层粒子角度变化更大
+        self.angle += (jitter - 0.5) * 0.1 * LAYER_ANGLE_SCALE[self.depth_layer]  # 深层粒子角度变化更大
+        
+        return started
 
 def create_heart_particles(canvas, center_x, center_y, size):
     particles = []
@@ -192,47 +278,105 @@ def create_heart_particles(canvas, center_x, center_y, size):
         # 减小步长，增加粒子数量
         step = 1 if layer < 2 else 2  # 前两层使用更多粒子
         
-        for t in range(0, 628, step):
-            t = t / 100
-            # 爱心参数方程
-            x = 16 * (math.sin(t) ** 3)
-            y = 13 * math.cos(t) - 5 * math.cos(2*t) - 2 * math.cos(3*t) - math.cos(4*t)
-            
-            # 缩放和定位
-            x = center_x + layer_offset_x + x * layer_size
-            y = center_y + layer_offset_y - y * layer_size  # 注意这里是减号
-            
+        # 缓存的爱心几何表，只做缩放和平移
+        xs, ys = heart_point_list(center_x + layer_offset_x, center_y + layer_offset_y,
+                                  layer_size, step, HEART_SAMPLING)
+        
+        # 每个点的粒子数所需的随机数按层一次取出
+        for x, y, r_count in zip(xs, ys, STREAM.take(len(xs))):
             # 在每个点周围添加多个粒子，使爱心更饱满
             # 前面的层使用更多粒子
-            particle_count = random.randint(2, 5) if layer < 2 else random.randint(1, 3)
+            particle_count = 2 + int(4 * r_count) if layer < 2 else 1 + int(3 * r_count)
             
             for _ in range(particle_count):
                 # 偏移量随深度减小
                 offset_scale = max(0.5, 2 - layer * 0.5)
-                offset_x = random.uniform(-2, 2) * offset_scale
-                offset_y = random.uniform(-2, 2) * offset_scale
+                r_x, r_y = STREAM.take(2)
+                offset_x = (4 * r_x - 2) * offset_scale
+                offset_y = (4 * r_y - 2) * offset_scale
                 
                 particles.append(Particle(canvas, x + offset_x, y + offset_y, layer))
     
     return particles
 
-def update_particles(canvas, particles, wind_direction):
-    for particle in particles:
-        particle.update(wind_direction)
+# 更新一帧，返回新的风向
+def step_particles(particles, wind_direction):
+    # 所有粒子这个 tick 的角度扰动和飘落判定随机数各一次取出
+    count = len(particles)
+    if falling is None:
+        for particle, jitter, chance in zip(particles, STREAM.take(count), STREAM.take(count)):
+            particle.update(wind_direction, jitter, chance)
+    else:
+        # 飘落的粒子整体推进，其余粒子逐个更新；这个 tick 刚开始飘落的粒子从下一个 tick 起整体推进
+        falling.advance(particles, wind_direction)
+        for particle, dx, dy in zip(falling.particles, *falling.commit()):
+            particle.move_items(dx, dy)
+        started = []
+        for particle, jitter, chance in zip(particles, STREAM.take(count), STREAM.take(count)):
+            if not particle.is_falling and particle.update(wind_direction, jitter, chance):
+                started.append(particle)
+        falling.add(started)
     
     # 更新风向
-    new_wind_direction = wind_direction + (random.uniform(-1, 1) * WIND_CHANGE_SPEED)
+    return wind_direction + (STREAM.uniform(-1, 1) * WIND_CHANGE_SPEED)
+
+# active 为按当前画质需要更新和显示的粒子
+def update_particles(canvas, particles, active, wind_direction, renderer, scheduler, governor=None):
+    profiler.begin_frame()
+    frame_start = time.perf_counter()
+    
+    # 执行这一帧累积的模拟步数（画布元素模式下元素随每一步移动）
+    with profiler.span("update"):
+        for _ in range(scheduler.advance()):
+            wind_direction = step_particles(active, wind_direction)
     
-    # 安排下一次更新
-    canvas.after(16, update_particles, canvas, particles, new_wind_direction)  # 约60FPS
+    # 单图像渲染模式：整帧光栅化后推送到画布上的一张图像，位置按插值比例插值
+    if renderer is not None:
+        with profiler.span("draw"):
+            renderer.draw(active, scheduler.interpolation)
+    
+    # 把这一帧记录下来的画布命令交给 Tcl 执行
+    if canvas_batch is not None:
+        with profiler.span("flush"):
+            canvas_batch.flush()
+    
+    # 画布重绘原本在空闲任务中完成；需要测量耗时时在这里完成重绘
+    if governor is not None or profiler.enabled:
+        with profiler.span("redraw"):
+            canvas.update_idletasks()
+    
+    # 按这一帧实际的计算和重绘耗时调整画质（显示状态的修改随下一帧一起提交）
+    if governor is not None and governor.record(time.perf_counter() - frame_start):
+        active = apply_tk_quality(canvas_batch or canvas, particles, governor.settings, renderer)
+    
+    if profiler.enabled:
+        with profiler.span("hud"):
+            canvas.itemconfigure(profiler_text, text="\n".join(profiler.overlay_lines()))
+        profiler.end_frame({
+            "particles": len(active),
+            "canvas_items": profiler.sample("canvas_items", lambda: len(canvas.find_all())),
+        })
+    
+    # 在下一个 tick 到期时更新
+    canvas.after(scheduler.delay_ms(), update_particles,
+                 canvas, particles, active, wind_direction, renderer, scheduler, governor)
+
+def toggle_profiler(event, canvas):
+    # 开关性能面板
+    enabled = profiler.toggle()
+    canvas.itemconfigure(profiler_text, state="normal" if enabled else "hidden")
 
 def trigger_fall(event, particles):
     # 触发所有粒子开始飘落
-    for particle in particles:
-        if random.random() < 0.7:  # 70%的粒子开始飘落
+    for particle, chance in zip(particles, STREAM.take(len(particles))):
+        if chance < 0.7:  # 70%的粒子开始飘落
             particle.is_falling = True
+    if falling is not None:
+        falling.invalidate()
 
-def main():
+def main(render_mode=RENDER_MODE):
+    global profiler_text, canvas_batch, falling
+    falling = create_falling()
     # 创建主窗口
     root = tk.Tk()
     root.title("立体蓝色粒子爱心")
@@ -246,23 +390,50 @@ def main():
     canvas.pack(fill="both", expand=True)
     
     # 创建爱心粒子
-    particles = create_heart_particles(canvas, WIDTH // 2, HEIGHT // 2, 10)
+    if render_mode in ("framebuffer", "bloom"):
+        from tk_framebuffer import TkFramebufferRenderer, TkBloomRenderer
+        renderer_class = TkBloomRenderer if render_mode == "bloom" else TkFramebufferRenderer
+        renderer = renderer_class(canvas, WIDTH, HEIGHT)
+        particles = create_heart_particles(None, WIDTH // 2, HEIGHT // 2, 10)
+    else:
+        renderer = None
+        # 粒子的画布元素通过 CanvasBatch 移动，每帧批量提交
+        if BATCH_CANVAS_UPDATES:
+            canvas_batch = CanvasBatch(canvas)
+        particles = create_heart_particles(canvas_batch or canvas, WIDTH // 2, HEIGHT // 2, 10)
     
     # 创建信息文本
     info_text = canvas.create_text(
         10, HEIGHT - 20, 
-        text="F键: 触发飘落效果", 
+        text="F键: 触发飘落效果 | P键: 性能面板", 
         fill="white", anchor="w"
     )
     
+    # 性能面板（右上角，默认隐藏）
+    if PROFILE_TRACE:
+        profiler.start_trace(PROFILE_TRACE)
+    profiler_text = canvas.create_text(
+        WIDTH - 10, 10, text="", fill="white", anchor="ne", justify="left",
+        font=("Courier", 9), state="normal" if profiler.enabled else "hidden"
+    )
+    
     # 绑定F键触发飘落效果
     root.bind("<KeyPress-f>", lambda event: trigger_fall(event, particles))
+    root.bind("<KeyPress-p>", lambda event: toggle_profiler(event, canvas))
+    
+    # 自适应画质（发光半径只在单图像模式下有效）
+    governor = None
+    if ADAPTIVE_QUALITY:
+        logging.basicConfig(level=logging.INFO, format="%(message)s")
+        features = [f for f in QUALITY_FEATURES if renderer is not None or f != "glow_radius"]
+        governor = QualityGovernor(features, target_fps=TICK_RATE)
     
     # 开始动画
-    update_particles(canvas, particles, 0)  # 初始风向为0
+    update_particles(canvas, particles, list(particles), 0, renderer, FixedTimestep(TICK_RATE), governor)  # 初始风向为0
     
     # 运行主循环
     root.mainloop()
+    profiler.stop_trace()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file